@@ -11,17 +11,130 @@ load_dotenv(dotenv_path=dotenv_path)
 LIBRARY_CARD_NUMBER = os.getenv("LIBRARY_CARD_NUMBER")
 LIBRARY_PIN = os.getenv("LIBRARY_PIN")
 
+# Encryption for cached sessions/credentials; without a key, one is generated in the user's
+# config directory (never next to the cache it protects, where it would decrypt it for anyone)
+CREDENTIAL_ENCRYPTION_KEY = os.getenv("CREDENTIAL_ENCRYPTION_KEY")
+ENCRYPTION_KEY_PATH = os.getenv("ENCRYPTION_KEY_PATH",
+                                os.path.join(os.path.expanduser("~"), ".config", "yorba-linda-booking", "encryption.key"))
+
+# Authenticated-session cache, so repeated runs can skip the login
+SESSION_CACHE_ENABLED = os.getenv("SESSION_CACHE_ENABLED", "True").lower() == "true"
+SESSION_CACHE_PATH = os.getenv("SESSION_CACHE_PATH", "./cache/sessions.enc")
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "1800"))
+
+# Local store of availability grid snapshots, read by the `query` subcommand
+AVAILABILITY_STORE_ENABLED = os.getenv("AVAILABILITY_STORE_ENABLED", "True").lower() == "true"
+AVAILABILITY_STORE_PATH = os.getenv("AVAILABILITY_STORE_PATH", "./cache/availability.db")
+AVAILABILITY_TTL_SECONDS = int(os.getenv("AVAILABILITY_TTL_SECONDS", "300"))  # Older snapshots are refreshed live
+AVAILABILITY_RETENTION_DAYS = int(os.getenv("AVAILABILITY_RETENTION_DAYS", "180"))  # Slots further back are dropped
+
 # Default booking parameters
 DEFAULT_PARTY_SIZE = 6
-MAX_RETRY_ATTEMPTS = 3
+# Failed booking steps are retried on the same session, with jittered exponential backoff
+MAX_RETRY_ATTEMPTS = int(os.getenv("MAX_RETRY_ATTEMPTS", "3"))  # Retries per step; 0 disables
+RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.5"))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "8"))
 TIMEOUT_SECONDS = 30
+# Book all requested slots in one browser session before falling back to one session per slot
+BATCH_BOOKING = os.getenv("BATCH_BOOKING", "True").lower() == "true"
+
+# How many days ahead LibCal takes bookings; --dates ranges and recurrences stop there
+BOOKING_HORIZON_DAYS = int(os.getenv("BOOKING_HORIZON_DAYS", "14"))
+# Grids for several dates are read in parallel before booking
+GRID_PREFETCH_WORKERS = int(os.getenv("GRID_PREFETCH_WORKERS", "4"))
+
+# Booking engine: 'browser' (Selenium) or 'http' (direct LibCal requests)
+BOOKING_ENGINE = os.getenv("BOOKING_ENGINE", "browser").lower()
+
+# HTTP engine settings
+HTTP_TIMEOUT_SECONDS = 10
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 10
+HTTP_BROWSER_FALLBACK = os.getenv("HTTP_BROWSER_FALLBACK", "True").lower() == "true"
+
+# Job file mode (--jobs): bookings run concurrently
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "4"))
+
+# Booking daemon (python main.py daemon): keeps the engine warm and serves a local API;
+# bookings from main.py are forwarded to it while it runs
+DAEMON_HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8765"))
+DAEMON_MAX_WORKERS = int(os.getenv("DAEMON_MAX_WORKERS", "2"))
+DAEMON_QUEUE_SIZE = int(os.getenv("DAEMON_QUEUE_SIZE", "50"))
+DAEMON_CONNECT_TIMEOUT_SECONDS = 0.3  # How long main.py looks for a running daemon
+# Per-run API token, written owner-only at start; every endpoint but /health requires it
+DAEMON_TOKEN_PATH = os.getenv("DAEMON_TOKEN_PATH",
+                              os.path.join(os.path.expanduser("~"), ".config", "yorba-linda-booking", "daemon.token"))
+
+# Release-time scheduling (--at)
+SNIPER_LEAD_SECONDS = 60          # Warm up browser/session this long before release
+SNIPER_SPIN_SECONDS = 0.02        # Busy-wait the final stretch for precise firing
+SNIPER_FIRE_OFFSET_MS = float(os.getenv("SNIPER_FIRE_OFFSET_MS", "0"))  # Negative fires early
+CLOCK_SYNC_MAX_SECONDS = 3
+# Patron login page used to sign in before the release; leave empty to log in during booking
+LIBCAL_LOGIN_URL = os.getenv("LIBCAL_LOGIN_URL", "")
+
+# Availability watch (--watch): poll the grid and book target slots the moment they free up
+WATCH_POLL_SECONDS = float(os.getenv("WATCH_POLL_SECONDS", "30"))
+WATCH_FAST_POLL_SECONDS = float(os.getenv("WATCH_FAST_POLL_SECONDS", "5"))  # Near release times and after changes
+WATCH_RELEASE_TIMES = [t.strip() for t in os.getenv("WATCH_RELEASE_TIMES", "00:00").split(",") if t.strip()]  # Local HH:MM
+WATCH_HOT_WINDOW_MINUTES = float(os.getenv("WATCH_HOT_WINDOW_MINUTES", "5"))
+WATCH_MIN_INTERVAL_SECONDS = float(os.getenv("WATCH_MIN_INTERVAL_SECONDS", "2"))  # Rate limit: never poll faster
+WATCH_MAX_BACKOFF_SECONDS = float(os.getenv("WATCH_MAX_BACKOFF_SECONDS", "300"))
+WATCH_SESSION_MAX_AGE_SECONDS = float(os.getenv("WATCH_SESSION_MAX_AGE_SECONDS", "900"))  # Re-warm older sessions
 
 # WebDriver settings
 HEADLESS_MODE = os.getenv("HEADLESS_MODE", "True").lower() == "true"
-IMPLICIT_WAIT_SECONDS = 10
 PAGE_LOAD_TIMEOUT_SECONDS = 30
 
+# Page waits: each step's timeout is learned from its recent latencies (p99 x factor),
+# between WAIT_MIN_TIMEOUT_SECONDS and TIMEOUT_SECONDS
+WAIT_TIMEOUT_FACTOR = float(os.getenv("WAIT_TIMEOUT_FACTOR", "3"))
+WAIT_MIN_TIMEOUT_SECONDS = 2.0
+WAIT_MIN_SAMPLES = 5              # Use TIMEOUT_SECONDS until a step has this many samples
+WAIT_HISTORY_SIZE = 50
+
+# Browser profile: 'lean' blocks non-essential resources and stops waiting for page loads
+# at DOMContentLoaded; 'full' loads everything and waits for the load event
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "lean").lower()
+LEAN_PAGE_LOAD_STRATEGY = os.getenv("LEAN_PAGE_LOAD_STRATEGY", "eager").lower()  # 'eager' or 'none'
+# Resource types the lean profile blocks: image, font, media, stylesheet
+BLOCKED_RESOURCE_TYPES = [t.strip().lower() for t in os.getenv("BLOCKED_RESOURCE_TYPES", "image,font,media").split(",") if t.strip()]
+# URL patterns the lean profile blocks ('*' is a wildcard): analytics and tracking scripts
+BLOCKED_URL_PATTERNS = [p.strip() for p in os.getenv("BLOCKED_URL_PATTERNS", ",".join([
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*/gtag/js*",
+    "*doubleclick.net*",
+    "*connect.facebook.net*",
+    "*hotjar.com*",
+    "*siteimproveanalytics.com*",
+    "*nr-data.net*",
+])).split(",") if p.strip()]
+
+# Tab mode: book slots in parallel tabs of one browser
+TAB_MODE = os.getenv("TAB_MODE", "False").lower() == "true"
+TAB_GROUPING = os.getenv("TAB_GROUPING", "slot").lower()  # 'slot' (one tab per slot) or 'room'
+TAB_POLL_INTERVAL_SECONDS = 0.05
+
+# WebDriver pool settings (DRIVER_POOL_SIZE=0 disables the pool)
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "0"))
+DRIVER_POOL_WARMUP = os.getenv("DRIVER_POOL_WARMUP", "True").lower() == "true"
+DRIVER_POOL_MAX_USES = int(os.getenv("DRIVER_POOL_MAX_USES", "20"))
+DRIVER_POOL_MAX_HEAP_MB = 512
+DRIVER_POOL_CHECKOUT_TIMEOUT_SECONDS = TIMEOUT_SECONDS
+DRIVER_POOL_PAGE_MAX_AGE_SECONDS = 60
+
 # Logging settings
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOG_FORMAT = os.getenv("LOG_FORMAT", "json") # 'json' or 'text'
-LOG_FILE_PATH = os.getenv("LOG_FILE_PATH", "./logs/booking.log")
\ No newline at end of file
+LOG_FILE_PATH = os.getenv("LOG_FILE_PATH", "./logs/booking.log")
+# Records wait in a bounded queue for a background writer; when it is full, 'drop' discards
+# DEBUG/INFO records (warnings and errors always wait for room) and 'block' waits for all
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_QUEUE_OVERFLOW = os.getenv("LOG_QUEUE_OVERFLOW", "drop").lower() # 'drop' or 'block'
+# Tracing: per-stage spans are logged as structured records (file log only) and summarized by --profile
+TRACE_LOG_SPANS = os.getenv("TRACE_LOG_SPANS", "True").lower() == "true"
+TRACE_MAX_SPANS = 10000  # Spans kept in memory for the summary
+# Directory for a DevTools network/performance log per browser attempt; empty disables it
+DEVTOOLS_TRACE_DIR = os.getenv("DEVTOOLS_TRACE_DIR", "")
@@ -0,0 +1,107 @@
+# In-memory index of the availability grid
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core.date_utils import format_dow_label
+
+@dataclass(frozen=True)
+class AvailabilityTile:
+    aria_label: str
+    room_name: str
+    date: datetime.date
+    time_label: str  # e.g. "10:00am"
+    available: bool
+
+def parse_tile_label(aria_label: str) -> Optional[AvailabilityTile]:
+    """
+    Parse a LibCal tile label like
+    '10:00am Saturday, January 11, 2025 - Adult Rm. 1 - Available'.
+    Returns None for labels that do not follow this layout.
+    """
+    try:
+        time_label, rest = aria_label.strip().split(" ", 1)
+        date_part, rest = rest.split(" - ", 1)
+        room_name, status = rest.rsplit(" - ", 1)
+        date = datetime.datetime.strptime(date_part, "%A, %B %d, %Y").date()
+    except ValueError:
+        return None
+    return AvailabilityTile(
+        aria_label=aria_label,
+        room_name=room_name,
+        date=date,
+        time_label=time_label.lower(),
+        available=status.strip().lower() == "available",
+    )
+
+class AvailabilityIndex:
+    """
+    (room, date, time) -> tile lookup built from a single grid extraction,
+    so availability checks never wait on the page.
+    """
+    def __init__(self, tiles: Iterable[AvailabilityTile] = ()):
+        self._tiles: Dict[Tuple[str, datetime.date, str], AvailabilityTile] = {}
+        self._by_label: Dict[str, AvailabilityTile] = {}
+        for tile in tiles:
+            self.add(tile)
+
+    @classmethod
+    def from_labels(cls, aria_labels: Iterable[str]) -> "AvailabilityIndex":
+        return cls(tile for tile in map(parse_tile_label, aria_labels) if tile is not None)
+
+    @classmethod
+    def from_grid_slots(cls, slots) -> "AvailabilityIndex":
+        """Builds an index from the HTTP engine's GridSlot list."""
+        return cls.from_labels(slot.aria_label for slot in slots)
+
+    @staticmethod
+    def _key(room_name: str, date: datetime.date, time_label: str) -> Tuple[str, datetime.date, str]:
+        return (room_name.strip().lower(), date, time_label.strip().lower())
+
+    def add(self, tile: AvailabilityTile) -> None:
+        self._tiles[self._key(tile.room_name, tile.date, tile.time_label)] = tile
+        self._by_label[tile.aria_label] = tile
+
+    def update(self, other: "AvailabilityIndex") -> None:
+        """Adds every tile of another grid read, e.g. one opened on a later date."""
+        for tile in other._tiles.values():
+            self.add(tile)
+
+    def get(self, room_name: str, date: datetime.date, time_label: str) -> Optional[AvailabilityTile]:
+        return self._tiles.get(self._key(room_name, date, time_label))
+
+    def get_by_label(self, aria_label: str) -> Optional[AvailabilityTile]:
+        return self._by_label.get(aria_label)
+
+    def is_available(self, room_name: str, date: datetime.date, time_label: str) -> bool:
+        tile = self.get(room_name, date, time_label)
+        return tile is not None and tile.available
+
+    def available_tiles(self, room_name: Optional[str] = None, date: Optional[datetime.date] = None) -> List[AvailabilityTile]:
+        room_key = room_name.strip().lower() if room_name else None
+        return [
+            tile for (room, tile_date, _), tile in self._tiles.items()
+            if tile.available
+            and (room_key is None or room == room_key)
+            and (date is None or tile_date == date)
+        ]
+
+    def rooms(self) -> List[str]:
+        return sorted({tile.room_name for tile in self._tiles.values()})
+
+    def dates(self) -> Set[datetime.date]:
+        """Dates with at least one tile on the grid, free or not."""
+        return {tile.date for tile in self._tiles.values()}
+
+    def format_summary(self, room_name: Optional[str] = None) -> List[str]:
+        """One line per room and date, e.g. 'Adult Rm. 1 - Saturday, January 11, 2025: 10:00am, 11:00am'."""
+        grouped: Dict[Tuple[str, datetime.date], List[str]] = {}
+        for tile in self.available_tiles(room_name):
+            grouped.setdefault((tile.room_name, tile.date), []).append(tile.time_label)
+        return [
+            f"{room} - {format_dow_label(date)}: {', '.join(times)}"
+            for (room, date), times in sorted(grouped.items())
+        ]
+
+    def __len__(self) -> int:
+        return len(self._tiles)
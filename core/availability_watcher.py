@@ -0,0 +1,185 @@
+# Watches the availability grid and books target slots as soon as they free up
+import dataclasses
+import datetime
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.availability_index import AvailabilityTile
+from core.base_engine import BaseBookingEngine
+from core.date_utils import format_dow_label, format_time_label
+from core.libcal_client import LibCalClient, LibCalError
+from core.retry import RetryPolicy
+from models.booking_request import BookingRequest
+from models.booking_result import BookingResult
+from utils.logger import log_fields, logger
+from config import settings
+
+TileKey = Tuple[str, datetime.date, str]  # (room name, date, time label), as in AvailabilityIndex
+
+def tile_key(room_name: str, date: datetime.date, time_label: str) -> TileKey:
+    return (room_name.strip().lower(), date, time_label.strip().lower())
+
+def diff_snapshots(previous: Dict[TileKey, bool], current: Dict[TileKey, bool]) -> Dict[TileKey, bool]:
+    """Returns the tiles that are new or changed availability since `previous`."""
+    return {key: available for key, available in current.items() if previous.get(key) != available}
+
+class PollSchedule:
+    """
+    Chooses the delay before the next poll: `fast_seconds` within `hot_window`
+    of a release time or of the last change seen (cancellations cluster),
+    `base_seconds` otherwise, and a jittered exponential backoff after errors.
+    Never less than `min_interval`.
+    """
+
+    def __init__(self, base_seconds: float = settings.WATCH_POLL_SECONDS,
+                 fast_seconds: float = settings.WATCH_FAST_POLL_SECONDS,
+                 release_times: Iterable[str] = settings.WATCH_RELEASE_TIMES,
+                 hot_window_minutes: float = settings.WATCH_HOT_WINDOW_MINUTES,
+                 min_interval: float = settings.WATCH_MIN_INTERVAL_SECONDS,
+                 max_backoff: float = settings.WATCH_MAX_BACKOFF_SECONDS):
+        self.base_seconds = base_seconds
+        self.fast_seconds = fast_seconds
+        self.release_times = [datetime.datetime.strptime(t, "%H:%M").time() for t in release_times]
+        self.hot_window = datetime.timedelta(minutes=hot_window_minutes)
+        self.min_interval = min_interval
+        self.max_backoff = max_backoff
+
+    def is_hot(self, now: datetime.datetime, last_change: Optional[datetime.datetime] = None) -> bool:
+        if last_change and now - last_change <= self.hot_window:
+            return True
+        for release in self.release_times:
+            # Check yesterday's, today's and tomorrow's release so windows wrap around midnight
+            for days in (-1, 0, 1):
+                release_at = datetime.datetime.combine(now.date() + datetime.timedelta(days=days), release)
+                if abs(now - release_at) <= self.hot_window:
+                    return True
+        return False
+
+    def next_delay(self, now: datetime.datetime, errors: int = 0, last_change: Optional[datetime.datetime] = None) -> float:
+        interval = self.fast_seconds if self.is_hot(now, last_change) else self.base_seconds
+        if errors:
+            interval = RetryPolicy(base_delay=interval, max_delay=self.max_backoff).delay(errors)
+        else:
+            interval *= random.uniform(0.9, 1.1)  # Keep several watchers from polling in lockstep
+        return max(self.min_interval, interval)
+
+class AvailabilityWatcher:
+    """
+    Polls the availability grid for a set of target slots with one lightweight
+    HTTP request per date (in parallel), diffs each snapshot against the last, and books
+    targets that turn available on a session warmed up in advance
+    (engine.prepare_session). Runs until every target is booked.
+    """
+
+    def __init__(self, engine: BaseBookingEngine, request: BookingRequest, rooms: List[str],
+                 dates: List[datetime.date], schedule: Optional[PollSchedule] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 session_max_age: float = settings.WATCH_SESSION_MAX_AGE_SECONDS, store=None):
+        self.engine = engine
+        self.store = store  # AvailabilityStore that keeps every polled grid, if given
+        self.request = request  # Party size, credentials and URL for every booking
+        self.pending: Dict[TileKey, Tuple[str, datetime.date, str]] = {
+            tile_key(room, date, time_label): (room, date, time_label)
+            for room in rooms for date in dates for time_label in request.time_slots
+        }
+        self.dates = sorted(set(dates))
+        self.schedule = schedule or PollSchedule()
+        self.sleep = sleep
+        self.session_max_age = session_max_age
+        self.client = LibCalClient(request.booking_url)
+        self.snapshot: Dict[TileKey, bool] = {}
+        self.errors = 0
+        self.polls = 0
+        self.last_change: Optional[datetime.datetime] = None
+        self._session: Any = None
+        self._session_started = 0.0
+
+    def poll(self) -> Dict[TileKey, bool]:
+        """Reads the grid for every watched date: tile -> available."""
+        tiles = [
+            AvailabilityTile(aria_label=slot.aria_label, room_name=slot.room_name, date=slot.start.date(),
+                             time_label=format_time_label(slot.start), available=slot.available)
+            for grid in self.client.fetch_grids(self.dates).values() for slot in grid
+        ]
+        if self.store:
+            try:
+                self.store.record(self.dates, tiles)
+            except Exception as e:
+                logger.warning("Could not store availability snapshot.", extra=log_fields(error=str(e)))
+        return {tile_key(tile.room_name, tile.date, tile.time_label): tile.available for tile in tiles}
+
+    def _warm_session(self, request: BookingRequest) -> Any:
+        """Returns the warm booking session, starting a new one if there is none or it is too old."""
+        if self._session is not None and time.monotonic() - self._session_started > self.session_max_age:
+            self._close_session()
+        if self._session is None:
+            logger.info("Warming up booking session for the watch.")
+            self._session = self.engine.prepare_session(request)
+            self._session_started = time.monotonic()
+        return self._session
+
+    def _close_session(self) -> None:
+        if self._session is not None:
+            self.engine.close_session(self._session)
+            self._session = None
+
+    def _book_released(self, changed: Dict[TileKey, bool]) -> List[BookingResult]:
+        """Books the pending targets that just turned available, one request per room and date."""
+        groups: Dict[Tuple[str, datetime.date], List[TileKey]] = {}
+        for key, (room, date, _) in self.pending.items():
+            if changed.get(key):
+                groups.setdefault((room, date), []).append(key)
+
+        results: List[BookingResult] = []
+        for (room, date), keys in groups.items():
+            times = [self.pending[key][2] for key in keys]
+            logger.info("Slots released; booking now.", extra=log_fields(room=room, date=date.isoformat(), times=times))
+            request = dataclasses.replace(self.request, room_name=room, target_date=date, time_slots=times, slot_labels_to_click=None)
+            try:
+                attempt = self.engine.execute_prepared(self._warm_session(request), request)
+            except Exception as e:
+                logger.error("Watch booking attempt failed.", exc_info=True, extra=log_fields(room=room, date=date.isoformat(), error=str(e)))
+                self._close_session()  # Possibly broken; warm a fresh one next time
+                attempt = [BookingResult(success=False, error_message=f"Booking attempt failed: {e}")]
+            results.extend(attempt)
+
+            booked = {r.details.get("slot") for r in attempt if r.success and r.details}
+            for key in keys:
+                label = f"{self.pending[key][2]} {format_dow_label(date)} - {room} - Available"
+                if label in booked:
+                    del self.pending[key]
+                else:
+                    # Forget the tile so it counts as changed again if it is still free next poll
+                    self.snapshot.pop(key, None)
+        return results
+
+    def run(self, max_polls: Optional[int] = None) -> List[BookingResult]:
+        """Watches until every target is booked (or `max_polls` polls). Returns all booking results."""
+        results: List[BookingResult] = []
+        logger.info("Watching for released slots.", extra=log_fields(slots=len(self.pending), dates=[d.isoformat() for d in self.dates]))
+        try:
+            self._warm_session(self.request)
+            while self.pending and (max_polls is None or self.polls < max_polls):
+                self.polls += 1
+                try:
+                    current = self.poll()
+                except (LibCalError, OSError) as e:
+                    self.errors += 1
+                    logger.warning("Availability poll failed.", extra=log_fields(step="grid", errors_in_a_row=self.errors, error=str(e)))
+                else:
+                    self.errors = 0
+                    changed = diff_snapshots(self.snapshot, current)
+                    if self.snapshot and changed:
+                        self.last_change = datetime.datetime.now()
+                        logger.info("Tiles changed since the last poll.", extra=log_fields(changed=len(changed)))
+                    self.snapshot = current
+                    results.extend(self._book_released(changed))
+
+                if self.pending and (max_polls is None or self.polls < max_polls):
+                    self.sleep(self.schedule.next_delay(datetime.datetime.now(), self.errors, self.last_change))
+        finally:
+            self._close_session()
+            self.client.close()
+        logger.info("Watch finished.", extra=log_fields(polls=self.polls, unbooked=len(self.pending)))
+        return results
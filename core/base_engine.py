@@ -0,0 +1,113 @@
+import datetime
+from abc import ABC, abstractmethod
+from typing import Any, Callable, List
+from models.booking_request import BookingRequest
+from models.booking_result import BookingResult
+from core.date_utils import format_dow_label
+from core.availability_index import AvailabilityIndex
+from services.authentication_service import AuthenticationService
+from utils.logger import log_fields, logger
+
+def generate_slot_labels(request: BookingRequest) -> List[str]:
+    """Generates the aria-labels for clicking time slots."""
+    if request.slot_labels_to_click:
+        return request.slot_labels_to_click
+
+    dow_label = format_dow_label(request.target_date)
+    slot_labels = [
+        f"{t} {dow_label} - {request.room_name} - Available"
+        for t in request.time_slots
+    ]
+    return slot_labels
+
+def validate_booking_parameters(request: BookingRequest, auth_service: AuthenticationService) -> bool:
+    """Validates the booking request parameters."""
+    if not request.target_date:
+        logger.error("Target date is missing.")
+        return False
+    if not request.time_slots:
+        logger.error("Time slots are missing.")
+        return False
+    if not request.room_name:
+        logger.error("Room name is missing.")
+        return False
+    if not (1 <= request.party_size <= 10): # Assuming max 10, adjust as needed
+        logger.error("Invalid party size.", extra=log_fields(party_size=request.party_size))
+        return False
+    if not auth_service.validate_credentials(request.user_credentials):
+        logger.error("Invalid user credentials.")
+        return False
+    logger.info("Booking parameters validated successfully.")
+    return True
+
+class BaseBookingEngine(ABC):
+    """
+    Shared request handling for booking engines.
+    Subclasses implement execute_booking() and list_availability() for a
+    specific transport (browser, HTTP); a missing one fails at construction.
+    """
+    def __init__(self):
+        self.auth_service = AuthenticationService()
+
+    def _generate_slot_labels(self, request: BookingRequest) -> List[str]:
+        return generate_slot_labels(request)
+
+    def validate_booking_parameters(self, request: BookingRequest) -> bool:
+        return validate_booking_parameters(request, self.auth_service)
+
+    def _book_plan(self, plan, request: BookingRequest, book_option: Callable[[BookingRequest], List[BookingResult]]) -> List[BookingResult]:
+        """
+        Books a BookingPlan's options in rank order with `book_option`, moving
+        straight on to the next option when every slot of one was lost at
+        selection. The plan, failed options, alternatives and rejections are
+        added to each result's details.
+        """
+        chosen, failed, results = None, [], []
+        for option in plan.options:
+            planned = option.to_request(request)
+            if not self.validate_booking_parameters(planned):
+                results = [BookingResult(success=False, error_message="Invalid booking parameters.")]
+                break
+            results = book_option(planned)
+            lost_at_selection = results and all((r.details or {}).get("failed_step") == "select" for r in results)
+            if any(r.success for r in results) or not lost_at_selection:
+                chosen = option
+                break
+            logger.warning("Every slot of the option was taken; trying the next option.", extra=log_fields(option=option.describe(), step="select"))
+            failed.append(option)
+        if not plan.options:
+            results = [BookingResult(success=False, error_message="No preferred room, day and time has a free block long enough.")]
+
+        details = plan.details(chosen, failed)
+        for result in results:
+            result.details = {**(result.details or {}), **details}
+        return results
+
+    def execute_bookings(self, requests: List[BookingRequest]) -> List[BookingResult]:
+        """Books several requests, e.g. one per date of --dates, one after another."""
+        results: List[BookingResult] = []
+        for request in requests:
+            results.extend(self.execute_booking(request))
+        return results
+
+    @abstractmethod
+    def list_availability(self, booking_url: str, target_date: datetime.date) -> AvailabilityIndex:
+        """Returns the available tiles for `target_date` without booking anything."""
+
+    @abstractmethod
+    def execute_booking(self, request: BookingRequest) -> List[BookingResult]:
+        """Books the request's slots and returns one result per slot."""
+
+    def prepare_session(self, request: BookingRequest) -> Any:
+        """
+        Warms up whatever execute_prepared() needs (browser, connections, login)
+        ahead of a timed booking. Engines without warm-up return None.
+        """
+        return None
+
+    def execute_prepared(self, session: Any, request: BookingRequest) -> List[BookingResult]:
+        """Books using a session from prepare_session()."""
+        return self.execute_booking(request)
+
+    def close_session(self, session: Any) -> None:
+        pass
@@ -0,0 +1,291 @@
+# Long-running booking service: a warm engine behind a local HTTP API
+import datetime
+import hmac
+import itertools
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from core.base_engine import BaseBookingEngine
+from core.job_runner import BookingJob, JobRunner, parse_job
+from models.booking_request import BookingRequest
+from services.authentication_service import AuthenticationService
+from utils.logger import log_fields, logger
+from config import settings
+
+@dataclass
+class BookingTicket:
+    """A queued job and the events streamed back to the client that submitted it."""
+    job: BookingJob
+    events: "queue.Queue[Optional[dict]]" = field(default_factory=queue.Queue)  # None ends the stream
+
+    def emit(self, event: str, **payload) -> None:
+        self.events.put({"event": event, "job_id": self.job.job_id, **payload})
+
+class BookingDaemon:
+    """
+    Keeps one engine (with its browser pool and session cache) and the
+    availability store warm across bookings, and serves them on a local
+    HTTP API:
+
+        GET  /health                       queue and worker state
+        GET  /availability?date=&room=     free slots, from the store while fresh
+        POST /bookings                     a job as in --jobs files; streams JSON lines
+        POST /shutdown
+
+    Jobs wait in a bounded queue for one of `max_workers` workers. Jobs for
+    the same room and date run one at a time, so overlapping requests never
+    race each other for the same slots.
+
+    Every endpoint but /health needs the per-run token written to
+    `token_path` (owner-only), and POSTs must be JSON, so neither other
+    users nor cross-site requests from a browser can book or stop it.
+    """
+
+    def __init__(self, engine: BaseBookingEngine, host: str = settings.DAEMON_HOST, port: int = settings.DAEMON_PORT,
+                 max_workers: int = settings.DAEMON_MAX_WORKERS, queue_size: int = settings.DAEMON_QUEUE_SIZE,
+                 store=None, auth_service: Optional[AuthenticationService] = None,
+                 booking_url: str = BookingRequest.booking_url, token_path: str = settings.DAEMON_TOKEN_PATH):
+        self.engine = engine
+        self.booking_url = booking_url  # Every job books here; jobs cannot choose another site
+        self.token = secrets.token_urlsafe(32)
+        self.token_path = Path(token_path).expanduser()
+        self.store = store  # AvailabilityStore, if enabled
+        self.runner = JobRunner(engine)
+        self.auth_service = auth_service or AuthenticationService()
+        self.max_workers = max(1, max_workers)
+        self.queue: "queue.Queue[Optional[BookingTicket]]" = queue.Queue(maxsize=queue_size)
+        self.active = 0
+        self.completed = 0
+        self.started_at = time.time()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._room_locks: Dict[Tuple[str, datetime.date], threading.Lock] = {}
+        self._credentials: dict = {}  # Profile -> Credentials, loaded once
+        self._workers = []
+        self._stopped = threading.Event()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._server_thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _write_token(self) -> None:
+        self.token_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        try:
+            self.token_path.unlink()  # Recreated below, so it is never briefly readable by others
+        except FileNotFoundError:
+            pass
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(self.token)
+
+    def authorized(self, header: Optional[str]) -> bool:
+        """Whether an Authorization header carries this run's token."""
+        scheme, _, token = (header or "").partition(" ")
+        return scheme == "Bearer" and hmac.compare_digest(token.strip().encode(), self.token.encode())
+
+    def start(self) -> "BookingDaemon":
+        """Writes the API token, starts the workers and serves the API in the background."""
+        self._write_token()
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f"daemon-worker-{i + 1}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        self._server_thread = threading.Thread(target=self.server.serve_forever, name="daemon-api", daemon=True)
+        self._server_thread.start()
+        logger.info("Booking daemon listening.", extra=log_fields(url=self.url, workers=self.max_workers))
+        return self
+
+    def wait(self) -> None:
+        """Blocks until /shutdown or stop()."""
+        self._stopped.wait()
+
+    def stop(self) -> None:
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self.server.shutdown()
+        self.server.server_close()
+        for _ in self._workers:
+            self.queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=settings.TIMEOUT_SECONDS)
+        try:
+            if self.token_path.read_text() == self.token:
+                self.token_path.unlink()
+        except OSError:
+            pass
+        logger.info("Booking daemon stopped.", extra=log_fields(completed=self.completed))
+
+    def __enter__(self) -> "BookingDaemon":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "engine": type(self.engine).__name__,
+            "queued": self.queue.qsize(),
+            "active": self.active,
+            "completed": self.completed,
+            "workers": self.max_workers,
+            "uptime_s": round(time.time() - self.started_at, 1),
+        }
+
+    def submit(self, raw: dict) -> BookingTicket:
+        """
+        Queues a job mapping. Raises ValueError for an invalid job and
+        queue.Full when the queue is at capacity.
+        """
+        job_id = str(raw.get("id") or f"request-{next(self._ids)}")
+        with self._lock:
+            job = parse_job(raw, job_id, self.auth_service, self._credentials, booking_url=self.booking_url)
+        ticket = BookingTicket(job)
+        ticket.emit("queued", position=self.queue.qsize() + 1)  # Before a worker can emit "started"
+        self.queue.put_nowait(ticket)
+        return ticket
+
+    def _room_lock(self, job: BookingJob) -> threading.Lock:
+        with self._lock:
+            return self._room_locks.setdefault(job.slot_key, threading.Lock())
+
+    def _work(self) -> None:
+        while True:
+            ticket = self.queue.get()
+            if ticket is None:
+                return
+            with self._lock:
+                self.active += 1
+            try:
+                with self._room_lock(ticket.job):
+                    ticket.emit("started")
+                    outcome = self.runner.run_job(ticket.job)
+                for result in outcome.results:
+                    ticket.emit("result", **result.to_dict())
+                ticket.emit("done", status=outcome.status, message=outcome.message,
+                            latency_ms=round(outcome.latency_seconds * 1000, 1))
+            except Exception as e:
+                logger.error("Daemon job crashed.", exc_info=True, extra=log_fields(job_id=ticket.job.job_id, error=str(e)))
+                ticket.emit("done", status="error", message=str(e))
+            finally:
+                ticket.events.put(None)
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+    def availability(self, target_date: datetime.date, room_name: Optional[str] = None) -> dict:
+        """Free slots for a date: from the store while fresh, else read live over HTTP and stored."""
+        if self.store and self.store.is_fresh(target_date):
+            index = self.store.available(target_date, room_name)
+            age = self.store.age_seconds(target_date)
+        else:
+            from core.http_booking_engine import HttpBookingEngine
+
+            index = HttpBookingEngine(browser_fallback=False).list_availability(self.booking_url, target_date)
+            if self.store:
+                self.store.record([target_date], index.available_tiles())
+            age = 0.0
+        return {"date": target_date.isoformat(), "age_s": round(age or 0.0, 1), "slots": index.format_summary(room_name)}
+
+    def _handler_class(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug("Daemon API request.", extra=log_fields(request=format % args))
+
+            def _send_json(self, status: int, payload) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorized(self) -> bool:
+                if daemon.authorized(self.headers.get("Authorization")):
+                    return True
+                self._send_json(401, {"error": "Missing or wrong daemon token."})
+                return False
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                if parsed.path == "/health":
+                    self._send_json(200, daemon.health())
+                elif not self._authorized():
+                    return
+                elif parsed.path == "/availability":
+                    try:
+                        target_date = datetime.date.fromisoformat(query["date"][0])
+                        payload = daemon.availability(target_date, query.get("room", [None])[0])
+                    except (KeyError, ValueError) as e:
+                        self._send_json(400, {"error": f"Need ?date=YYYY-MM-DD: {e}"})
+                        return
+                    except Exception as e:
+                        self._send_json(502, {"error": f"Could not read availability: {e}"})
+                        return
+                    self._send_json(200, payload)
+                else:
+                    self._send_json(404, {"error": "Not found"})
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                if not self._authorized():
+                    return
+                # Only JSON: a browser cannot send it cross-site without a preflight this server never answers
+                if self.headers.get("Content-Type", "").split(";")[0].strip().lower() != "application/json":
+                    self._send_json(415, {"error": "Expected Content-Type: application/json."})
+                    return
+                if parsed.path == "/shutdown":
+                    self._send_json(200, {"status": "stopping"})
+                    threading.Thread(target=daemon.stop, daemon=True).start()
+                elif parsed.path == "/bookings":
+                    self._post_booking()
+                else:
+                    self._send_json(404, {"error": "Not found"})
+
+            def _post_booking(self):
+                try:
+                    raw = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    if not isinstance(raw, dict):
+                        raise ValueError("Expected a JSON object.")
+                    ticket = daemon.submit(raw)
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                except queue.Full:
+                    self._send_json(503, {"error": "Booking queue is full; try again shortly."})
+                    return
+
+                # One JSON line per event, flushed as it happens; the stream ends when the connection closes
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                while True:
+                    event = ticket.events.get()
+                    if event is None:
+                        break
+                    try:
+                        self.wfile.write((json.dumps(event) + "\n").encode())
+                        self.wfile.flush()
+                    except OSError:
+                        break  # Client went away; the booking still completes
+                self.close_connection = True
+
+        return Handler
@@ -1,53 +1,119 @@
-from typing import List
+import dataclasses
+import datetime
+import os
+import re
+from typing import List, Optional, Set, Tuple
 from models.booking_request import BookingRequest, Credentials
 from models.booking_result import BookingResult
 from core.web_driver import WebDriverService
-from core.date_utils import format_dow_label
-from services.authentication_service import AuthenticationService
-from utils.logger import logger
+from core.web_driver_pool import WebDriverPool
+from core.base_engine import BaseBookingEngine
+from core.availability_index import AvailabilityIndex
+from core.retry import SLOT_STEPS, StepRetrier
+from services.session_cache import SessionCache
+from utils.logger import log_fields, logger
+from utils.tracing import tracer
+from utils.urls import date_url
 from config import settings
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-
-class BookingEngine:
-    def __init__(self):
-        self.auth_service = AuthenticationService()
-
-    def _generate_slot_labels(self, request: BookingRequest) -> List[str]:
-        """Generates the aria-labels for clicking time slots."""
-        if request.slot_labels_to_click:
-            return request.slot_labels_to_click
-        
-        dow_label = format_dow_label(request.target_date)
-        slot_labels = [
-            f"{t} {dow_label} - {request.room_name} - Available"
-            for t in request.time_slots
-        ]
-        return slot_labels
-
-    def validate_booking_parameters(self, request: BookingRequest) -> bool:
-        """Validates the booking request parameters."""
-        if not request.target_date:
-            logger.error("Target date is missing.")
-            return False
-        if not request.time_slots:
-            logger.error("Time slots are missing.")
-            return False
-        if not request.room_name:
-            logger.error("Room name is missing.")
-            return False
-        if not (1 <= request.party_size <= 10): # Assuming max 10, adjust as needed
-            logger.error(f"Invalid party size: {request.party_size}")
-            return False
-        if not self.auth_service.validate_credentials(request.user_credentials):
-            logger.error("Invalid user credentials.")
+
+class BookingEngine(BaseBookingEngine):
+    def __init__(self, batch_mode: bool = settings.BATCH_BOOKING, driver_pool: Optional[WebDriverPool] = None,
+                 tab_mode: bool = settings.TAB_MODE, session_cache: Optional[SessionCache] = None):
+        super().__init__()
+        # Restores authenticated sessions from earlier runs so login can be skipped
+        self.session_cache = session_cache
+        # Batch mode books every slot in one browser session, falling back to one session per slot
+        self.batch_mode = batch_mode
+        # Tab mode books slots in parallel tabs of one browser; takes precedence over batch mode
+        self.tab_mode = tab_mode
+        self.driver_pool = driver_pool
+
+    def _acquire_driver(self, url: str, credentials: Optional[Credentials] = None) -> WebDriverService:
+        """
+        Returns a driver on `url`, from the pool when one is configured.
+        With credentials and a session cache, a cached session is restored first.
+        """
+        cached_state = self.session_cache.get(credentials.card_number) if self.session_cache and credentials else None
+        if self.driver_pool:
+            # Restored ahead of the checkout's page load, so the cached session costs no extra navigation
+            restore = (lambda service: service.import_session(cached_state)) if cached_state else None
+            return self.driver_pool.checkout(url, before_navigate=restore)
+        driver_service = WebDriverService(headless=settings.HEADLESS_MODE)
+        try:
+            if cached_state:
+                driver_service.import_session(cached_state)
+            driver_service.navigate_to_page(url)
+        except Exception:
+            try:
+                driver_service.close_driver()  # Otherwise the Chrome process outlives the failed booking
+            except Exception as e:
+                logger.debug("Error closing WebDriver after a failed page load.", extra=log_fields(error=str(e)))
+            raise
+        return driver_service
+
+    def _login(self, driver_service: WebDriverService, credentials: Credentials) -> bool:
+        """perform_login, dropping the cached session if LibCal asked for a login anyway."""
+        if not driver_service.perform_login(credentials):
             return False
-        logger.info("Booking parameters validated successfully.")
+        if self.session_cache and driver_service.session_restored and not driver_service.login_skipped:
+            self.session_cache.invalidate(credentials.card_number)
         return True
 
+    def _remember_session(self, driver_service: WebDriverService, credentials: Credentials) -> None:
+        """Caches the session once a fresh login has reached the booking form."""
+        if not self.session_cache or driver_service.login_skipped:
+            return
+        try:
+            self.session_cache.save(credentials.card_number, driver_service.export_session())
+        except Exception as e:
+            logger.warning("Could not cache authenticated session.", extra=log_fields(step="login", error=str(e)))
+
+    def _dump_devtools_trace(self, driver_service: WebDriverService) -> None:
+        """Saves the current attempt's DevTools log when DEVTOOLS_TRACE_DIR is set."""
+        trace = tracer.current_trace
+        if settings.DEVTOOLS_TRACE_DIR and trace:
+            filename = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{trace.trace_id}.json"
+            driver_service.dump_devtools_trace(os.path.join(settings.DEVTOOLS_TRACE_DIR, filename))
+
+    def _release_driver(self, driver_service: WebDriverService) -> None:
+        # Before a pooled driver is reset for the next attempt
+        self._dump_devtools_trace(driver_service)
+        if self.driver_pool:
+            self.driver_pool.checkin(driver_service)
+        else:
+            driver_service.close_driver()
+
+    @staticmethod
+    def _trace_attempt(request: BookingRequest, mode: str, slot_labels: List[str]):
+        return tracer.trace(engine="browser", mode=mode, room=request.room_name,
+                            date=request.target_date.isoformat(), slots=slot_labels)
+
+    def _resume_booking_form(self, driver_service: WebDriverService, credentials: Credentials) -> None:
+        """Reloads before the booking form is retried, logging in again if the reload shows the login form."""
+        login_skipped = driver_service.login_skipped
+        driver_service.reload_page()
+        self._login(driver_service, credentials)
+        # Only a login skipped both times means the session came from the cache
+        driver_service.login_skipped = login_skipped and driver_service.login_skipped
+
+    def _load_availability(self, driver_service: WebDriverService) -> AvailabilityIndex:
+        """Waits for the grid once, then indexes every tile in a single script call."""
+        driver_service.wait_for_grid()
+        logger.info("Available time tiles have loaded on booking page.")
+        return driver_service.build_availability_index()
+
+    def list_availability(self, booking_url: str, target_date: datetime.date) -> AvailabilityIndex:
+        driver_service = self._acquire_driver(date_url(booking_url, target_date))
+        try:
+            index = self._load_availability(driver_service)
+        finally:
+            self._release_driver(driver_service)
+        return AvailabilityIndex(tile for tile in index.available_tiles(date=target_date))
+
     def execute_booking(self, request: BookingRequest) -> List[BookingResult]:
         # Execute booking for the requested slots
+        if request.preferences:
+            return self._book_planned(request)
         if not self.validate_booking_parameters(request):
             return [BookingResult(success=False, error_message="Invalid booking parameters.")]
 
@@ -56,54 +122,346 @@ class BookingEngine:
              return [BookingResult(success=False, error_message="Could not generate slot labels for booking.")]
 
         results: List[BookingResult] = []
+        remaining_labels = all_slot_labels
+
+        if self.tab_mode and len(all_slot_labels) > 1:
+            results, remaining_labels = self._book_slots_in_tabs(request, all_slot_labels)
+            if remaining_labels:
+                logger.warning("Tab booking failed; falling back to one session per slot.", extra=log_fields(room=request.room_name, slots=len(remaining_labels)))
+        elif self.batch_mode and len(all_slot_labels) > 1:
+            results, remaining_labels = self._book_slots_batch(request, all_slot_labels)
+            if remaining_labels:
+                logger.warning("Batch booking failed; falling back to one session per slot.", extra=log_fields(room=request.room_name, slots=len(remaining_labels)))
 
-        for slot_label in all_slot_labels:
-            # Attempt to book this slot
-            driver_service = None  # Initialize to None for finally block
+        for slot_label in remaining_labels:
+            results.append(self._book_single_slot(request, slot_label))
+
+        # All booking attempts completed
+        return results
+
+    def execute_bookings(self, requests: List[BookingRequest]) -> List[BookingResult]:
+        """
+        Books one request per date, each on its own date's grid. The grids for
+        all dates are read over HTTP in parallel first, so slots that are
+        already taken fail straight away instead of costing a browser session.
+        """
+        available = self._prefetch_available_labels(requests)
+        results: List[BookingResult] = []
+        for request in requests:
+            if available is None or request.preferences:
+                results.extend(self.execute_booking(request))
+                continue
+            labels = self._generate_slot_labels(request)
+            free = [label for label in labels if label in available]
+            for label in labels:
+                if label not in free:
+                    logger.warning("Slot not available on the prefetched grid.", extra=log_fields(slot=label, room=request.room_name, step="grid"))
+                    results.append(BookingResult(success=False, error_message=f"Slot not available: {label}", details={"slot": label}))
+            if free:
+                results.extend(self.execute_booking(dataclasses.replace(request, slot_labels_to_click=free)))
+        return results
+
+    def _prefetch_available_labels(self, requests: List[BookingRequest]) -> Optional[Set[str]]:
+        """Aria-labels of the available tiles on every requested date, or None if the grids could not be read."""
+        if len(requests) < 2:
+            return None
+        from core.libcal_client import LibCalClient, LibCalError
+
+        client = LibCalClient(requests[0].booking_url)
+        try:
+            grids = client.fetch_grids(request.target_date for request in requests)
+        except (LibCalError, OSError) as e:
+            logger.warning("Grid prefetch failed; checking each date in the browser.", extra=log_fields(step="grid", error=str(e)))
+            return None
+        finally:
+            client.close()
+        return {slot.aria_label for grid in grids.values() for slot in grid if slot.available}
+
+    def _book_planned(self, request: BookingRequest) -> List[BookingResult]:
+        """
+        Plans request.preferences from the grid of every preferred date, then books
+        the best option in the same browser; when all of an option's slots are lost,
+        the next option is tried without reloading if its date is on the page.
+        """
+        from core.booking_planner import BookingPlanner
+
+        driver_service = None
+        with self._trace_attempt(request, "planned", []):
             try:
-                driver_service = WebDriverService(headless=settings.HEADLESS_MODE)
-                driver_service.navigate_to_page(request.booking_url)
+                dates = sorted(request.preferences.dates)
+                driver_service = self._acquire_driver(date_url(request.booking_url, dates[0]), request.user_credentials)
+                index, loaded_dates, page_dates = self._load_preferred_dates(driver_service, request.booking_url, dates)
+                plan = BookingPlanner(request.preferences).plan(index, loaded_dates=loaded_dates)
 
-                WebDriverWait(driver_service.driver, settings.TIMEOUT_SECONDS).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "a.s-lc-eq-avail"))
-                )
-                logger.info("Available time tiles have loaded on booking page.")
+                def book_option(planned: BookingRequest) -> List[BookingResult]:
+                    nonlocal page_dates
+                    if planned.target_date not in page_dates:
+                        driver_service.navigate_to_page(date_url(request.booking_url, planned.target_date))
+                        page_dates = {planned.target_date}
+                    results, remaining = self._run_batch_on_session(driver_service, planned, planned.slot_labels_to_click)
+                    return results + [self._book_single_slot(planned, label) for label in remaining]
 
-                if not driver_service.select_time_slot(slot_label):
-                    logger.warning(f"Failed to select time slot: {slot_label}")
-                    results.append(BookingResult(success=False, error_message=f"Failed to select time slot: {slot_label}", details={"slot": slot_label}))
-                    continue # Try next slot
+                return self._book_plan(plan, request, book_option)
+            except Exception as e:
+                logger.error("An unexpected error occurred during planned booking.", exc_info=True, extra=log_fields(error=str(e)))
+                return [BookingResult(success=False, error_message=f"Unexpected error during planned booking: {str(e)}")]
+            finally:
+                if driver_service:
+                    self._release_driver(driver_service)
+
+    def _load_preferred_dates(self, driver_service: WebDriverService, booking_url: str,
+                              dates: List[datetime.date]) -> Tuple[AvailabilityIndex, Set[datetime.date], Set[datetime.date]]:
+        """
+        Reads the grid the driver is on (opened on dates[0]), then opens the grid on
+        each date it did not show. Returns every tile read, the dates whose grid was
+        read and the dates shown on the page the driver is left on.
+        """
+        index = self._load_availability(driver_service)
+        page_dates = index.dates() | {dates[0]}
+        loaded_dates = set(page_dates)
+        for date in dates[1:]:
+            if date in loaded_dates:
+                continue
+            try:
+                driver_service.navigate_to_page(date_url(booking_url, date))
+                loaded = self._load_availability(driver_service)
+            except Exception as e:
+                logger.warning("Could not load the grid for a preferred date.", extra=log_fields(date=date.isoformat(), step="grid", error=str(e)))
+                page_dates = set()  # The page is in an unknown state; navigate before booking
+                continue
+            index.update(loaded)
+            page_dates = loaded.dates() | {date}
+            loaded_dates |= page_dates
+        return index, loaded_dates, page_dates
+
+    def prepare_session(self, request: BookingRequest) -> WebDriverService:
+        """Starts a browser on the booking page, signed in when LIBCAL_LOGIN_URL is set."""
+        driver_service = self._acquire_driver(request.grid_url, request.user_credentials)
+        if not settings.LIBCAL_LOGIN_URL:
+            logger.info("LIBCAL_LOGIN_URL not set; login will happen during booking.")
+        elif driver_service.pre_authenticate(settings.LIBCAL_LOGIN_URL, request.user_credentials):
+            self._remember_session(driver_service, request.user_credentials)
+            driver_service.navigate_to_page(request.grid_url)
+        else:
+            logger.warning("Pre-authentication failed; login will happen during booking.")
+        return driver_service
+
+    def execute_prepared(self, session: WebDriverService, request: BookingRequest) -> List[BookingResult]:
+        """Books on a session from prepare_session(), reloading the grid first to pick up released tiles."""
+        if not self.validate_booking_parameters(request):
+            return [BookingResult(success=False, error_message="Invalid booking parameters.")]
 
-                if not driver_service.submit_times():
-                    results.append(BookingResult(success=False, error_message="Failed to submit selected times.", details={"slot": slot_label}))
-                    continue
+        all_slot_labels = self._generate_slot_labels(request)
+        with self._trace_attempt(request, "prepared", all_slot_labels):
+            session.navigate_to_page(request.grid_url)
+            results, remaining_labels = self._run_batch_on_session(session, request, all_slot_labels)
+            self._dump_devtools_trace(session)
+        for slot_label in remaining_labels:
+            results.append(self._book_single_slot(request, slot_label))
+        return results
 
-                if not driver_service.perform_login(request.user_credentials):
-                    results.append(BookingResult(success=False, error_message="Login failed.", details={"slot": slot_label}))
-                    continue
+    def close_session(self, session: WebDriverService) -> None:
+        self._release_driver(session)
 
-                if not driver_service.fill_booking_form(request.party_size):
-                    results.append(BookingResult(success=False, error_message="Failed to fill booking form details.", details={"slot": slot_label}))
-                    continue
+    def _book_slots_batch(self, request: BookingRequest, slot_labels: List[str]) -> Tuple[List[BookingResult], List[str]]:
+        """
+        Books all slots in one browser session with a single Submit Times pass.
+        Returns the per-slot results and the labels that should be retried
+        through the one-slot-per-session fallback.
+        """
+        driver_service = None
+        with self._trace_attempt(request, "batch", slot_labels):
+            try:
+                driver_service = self._acquire_driver(request.grid_url, request.user_credentials)
+                return self._run_batch_on_session(driver_service, request, slot_labels)
+            except Exception as e:
+                logger.error("Could not start batch booking session.", exc_info=True, extra=log_fields(room=request.room_name, error=str(e)))
+                return [], slot_labels
+            finally:
+                if driver_service:
+                    self._release_driver(driver_service)
 
-                if not driver_service.submit_final_booking():
-                    results.append(BookingResult(success=False, error_message="Failed to submit final booking.", details={"slot": slot_label}))
-                    continue
+    def _run_batch_on_session(self, driver_service: WebDriverService, request: BookingRequest, slot_labels: List[str]) -> Tuple[List[BookingResult], List[str]]:
+        """
+        Runs the batch flow on a driver already on the booking page. See _book_slots_batch.
+        Failed steps are retried on this session; see StepRetrier.
+        """
+        results: List[BookingResult] = []
+        selected_labels: List[str] = []
+        final_submitted = False
+        retrier = StepRetrier()
+        last_error = lambda: driver_service.last_error
+        try:
+            if not retrier.run("grid", lambda: self._load_availability(driver_service) is not None,
+                               recover=driver_service.reload_page):
+                return [], slot_labels
 
-                if driver_service.check_booking_confirmation():
-                    # Booking confirmed successfully
-                    results.append(BookingResult(success=True, booking_id=f"CONFIRMED_VIA_UI_{slot_label.replace(' ', '_')}", details={"slot": slot_label}))
+            for slot_label in slot_labels:
+                if retrier.run("select", lambda: driver_service.select_time_slot(slot_label), last_error=last_error):
+                    selected_labels.append(slot_label)
                 else:
-                    logger.warning(f"Booking submitted for slot {slot_label} but confirmation screen not found.")
-                    results.append(BookingResult(success=False, error_message="Booking submitted but confirmation not verified.", details={"slot": slot_label}))
+                    logger.warning("Failed to select time slot.", extra=log_fields(slot=slot_label, room=request.room_name, step="select"))
+                    results.append(BookingResult(success=False, error_message=f"Failed to select time slot: {slot_label}", details={"slot": slot_label}))
+
+            if not selected_labels:
+                return retrier.add_details(results), []
+            logger.info("Selected time slots for batch booking.", extra=log_fields(room=request.room_name, slots=len(selected_labels), step="select"))
 
+            if not (retrier.run("submit_times", driver_service.submit_times, last_error=last_error)
+                    and retrier.run("login", lambda: self._login(driver_service, request.user_credentials),
+                                    recover=driver_service.reload_page, last_error=last_error)
+                    and retrier.run("form_fill", lambda: driver_service.fill_booking_form(request.party_size),
+                                    recover=lambda: self._resume_booking_form(driver_service, request.user_credentials),
+                                    last_error=last_error)):
+                return self._end_failed_batch(results, selected_labels, retrier)
+            self._remember_session(driver_service, request.user_credentials)
+
+            # From the click on, the booking may exist: a failure is never retried or re-booked elsewhere
+            final_submitted = True
+            if not (retrier.run("final_submit", driver_service.submit_final_booking, last_error=last_error)
+                    and driver_service.check_booking_confirmation()):
+                logger.warning("Batch booking submitted but confirmation screen not found.")
+                results.extend(
+                    BookingResult(success=False, error_message="Booking submitted but confirmation not verified.", details={"slot": label, "batch": True})
+                    for label in selected_labels
+                )
+                return retrier.add_details(results), []
+
+            results.extend(self._results_from_confirmation(driver_service.get_confirmation_text(), selected_labels))
+            return retrier.add_details(results), []
+
+        except Exception as e:
+            logger.error("An unexpected error occurred during batch booking.", exc_info=True, extra=log_fields(room=request.room_name, final_submitted=final_submitted, error=str(e)))
+            if final_submitted:
+                results.extend(
+                    BookingResult(success=False, error_message=f"Unexpected error after batch submission: {str(e)}", details={"slot": label, "batch": True})
+                    for label in selected_labels
+                )
+                return retrier.add_details(results), []
+            # Slots never selected in this session still deserve a per-slot attempt
+            attempted = {r.details["slot"] for r in results if r.details}
+            return retrier.add_details(results), [label for label in slot_labels if label not in attempted]
+
+    def _end_failed_batch(self, results: List[BookingResult], selected_labels: List[str], retrier: StepRetrier) -> Tuple[List[BookingResult], List[str]]:
+        """
+        Ends a batch whose step failed after retries. A fatal failure past slot
+        selection (e.g. a rejected card) would fail every other session too, so it
+        fails the selected slots; anything else falls back to one session per slot.
+        """
+        checkpoint = retrier.checkpoint
+        if retrier.fatal and checkpoint.failed_step not in SLOT_STEPS:
+            results.extend(
+                BookingResult(success=False, error_message=f"Booking failed at {checkpoint.failed_step}: {checkpoint.last_error or 'no details'}",
+                              details={"slot": label, "batch": True})
+                for label in selected_labels
+            )
+            return retrier.add_details(results), []
+        return retrier.add_details(results), selected_labels
+
+    def _book_slots_in_tabs(self, request: BookingRequest, slot_labels: List[str]) -> Tuple[List[BookingResult], List[str]]:
+        """
+        Books slots in parallel tabs of one browser (see TabbedBookingRunner).
+        Returns the per-slot results and the labels to retry one session per slot.
+        """
+        from core.tabbed_booking import TabbedBookingRunner, group_slot_labels
+
+        driver_service = None
+        with self._trace_attempt(request, "tabs", slot_labels):
+            try:
+                driver_service = self._acquire_driver(request.grid_url, request.user_credentials)
+                runner = TabbedBookingRunner(
+                    driver_service, request,
+                    results_from_confirmation=self._results_from_confirmation,
+                    login=lambda credentials: self._login(driver_service, credentials),
+                    on_authenticated=lambda: self._remember_session(driver_service, request.user_credentials),
+                )
+                tasks = runner.run(group_slot_labels(slot_labels))
             except Exception as e:
-                logger.error(f"An unexpected error occurred during booking for slot {slot_label}: {e}", exc_info=True)
-                results.append(BookingResult(success=False, error_message=f"Unexpected error for slot {slot_label}: {str(e)}", details={"slot": slot_label}))
+                logger.error("An unexpected error occurred during tab booking.", exc_info=True, extra=log_fields(room=request.room_name, error=str(e)))
+                # Per-tab progress is lost; slots that did get booked will simply fail to select on retry
+                return [], slot_labels
             finally:
                 if driver_service:
-                    driver_service.close_driver()
+                    self._release_driver(driver_service)
+
+        results = [result for task in tasks for result in task.results]
+        fallback = [label for task in tasks for label in task.fallback]
+        return results, fallback
+
+    def _results_from_confirmation(self, confirmation_text: str, slot_labels: List[str]) -> List[BookingResult]:
+        """
+        Maps a batch confirmation page back to per-slot results.
+        A slot counts as listed when its start time appears on the confirmation page.
+        If the page lists none of the times (layout change), the confirmation is trusted for every slot.
+        """
+        page_text = confirmation_text.lower()
+        listed = {
+            # Guard the match so "1:00pm" is not found inside "11:00pm"
+            label: re.search(r"(?<![\d:])" + re.escape(label.split(" ", 1)[0].lower()), page_text) is not None
+            for label in slot_labels
+        }
+        trust_all = not any(listed.values())
+        if trust_all:
+            logger.debug("Confirmation page does not list slot times; trusting batch confirmation for all slots.")
+
+        results: List[BookingResult] = []
+        for label in slot_labels:
+            details = {"slot": label, "batch": True, "listed_on_confirmation": listed[label]}
+            if listed[label] or trust_all:
+                results.append(BookingResult(success=True, booking_id=f"CONFIRMED_VIA_UI_{label.replace(' ', '_')}", details=details))
+            else:
+                logger.warning("Slot missing from batch confirmation page.", extra=log_fields(slot=label, step="confirmation"))
+                results.append(BookingResult(success=False, error_message="Slot not listed on booking confirmation.", details=details))
+        return results
+
+    def _book_single_slot(self, request: BookingRequest, slot_label: str) -> BookingResult:
+        """Books one slot in its own browser session (fallback path). Failed steps are retried on this session."""
+        driver_service = None  # Initialize to None for finally block
+        retrier = StepRetrier()
+        with self._trace_attempt(request, "single", [slot_label]):
+            try:
+                driver_service = self._acquire_driver(request.grid_url, request.user_credentials)
+                return retrier.add_details([self._run_single_slot(driver_service, request, slot_label, retrier)])[0]
+
+            except Exception as e:
+                logger.error("An unexpected error occurred during single-slot booking.", exc_info=True, extra=log_fields(slot=slot_label, error=str(e)))
+                result = BookingResult(success=False, error_message=f"Unexpected error for slot {slot_label}: {str(e)}", details={"slot": slot_label})
+                return retrier.add_details([result])[0]
+            finally:
+                if driver_service:
+                    self._release_driver(driver_service)
                 # Slot booking attempt completed
-        
-        # All booking attempts completed
-        return results
\ No newline at end of file
+
+    def _run_single_slot(self, driver_service: WebDriverService, request: BookingRequest, slot_label: str, retrier: StepRetrier) -> BookingResult:
+        """The one-slot flow on a driver already on the booking page."""
+        last_error = lambda: driver_service.last_error
+        details = {"slot": slot_label}
+
+        if not retrier.run("grid", lambda: self._load_availability(driver_service) is not None, recover=driver_service.reload_page):
+            return BookingResult(success=False, error_message="Availability grid did not load.", details=details)
+
+        if not retrier.run("select", lambda: driver_service.select_time_slot(slot_label), last_error=last_error):
+            logger.warning("Failed to select time slot.", extra=log_fields(slot=slot_label, room=request.room_name, step="select"))
+            return BookingResult(success=False, error_message=f"Failed to select time slot: {slot_label}", details=details)
+
+        if not retrier.run("submit_times", driver_service.submit_times, last_error=last_error):
+            return BookingResult(success=False, error_message="Failed to submit selected times.", details=details)
+
+        if not retrier.run("login", lambda: self._login(driver_service, request.user_credentials),
+                           recover=driver_service.reload_page, last_error=last_error):
+            return BookingResult(success=False, error_message="Login failed.", details=details)
+
+        if not retrier.run("form_fill", lambda: driver_service.fill_booking_form(request.party_size),
+                           recover=lambda: self._resume_booking_form(driver_service, request.user_credentials),
+                           last_error=last_error):
+            return BookingResult(success=False, error_message="Failed to fill booking form details.", details=details)
+        self._remember_session(driver_service, request.user_credentials)
+
+        # Not retried, and a failure is not reported as unbooked: the click may have gone through
+        if (retrier.run("final_submit", driver_service.submit_final_booking, last_error=last_error)
+                and driver_service.check_booking_confirmation()):
+            # Booking confirmed successfully
+            return BookingResult(success=True, booking_id=f"CONFIRMED_VIA_UI_{slot_label.replace(' ', '_')}", details=details)
+
+        logger.warning("Booking submitted but confirmation screen not found.", extra=log_fields(slot=slot_label, step="confirmation"))
+        return BookingResult(success=False, error_message="Booking submitted but confirmation not verified.", details=details)
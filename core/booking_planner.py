@@ -0,0 +1,160 @@
+# Picks the best bookable block among ranked rooms, days and a time window
+import dataclasses
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.availability_index import AvailabilityIndex
+from core.date_utils import format_dow_label, format_time_label, time_label_minutes
+from models.booking_request import BookingPreferences, BookingRequest
+from utils.logger import log_fields, logger
+
+def _minutes_label(minutes: int) -> str:
+    return format_time_label(datetime.datetime.combine(datetime.date.min, datetime.time(minutes // 60, minutes % 60)))
+
+@dataclass
+class PlanOption:
+    """One bookable assignment: back-to-back slots on one date, in one room if possible."""
+    date: datetime.date
+    slots: List[Tuple[str, str]]  # (room, time label), in time order
+    rank: tuple = field(default=(), compare=False)
+
+    @property
+    def rooms(self) -> List[str]:
+        return list(dict.fromkeys(room for room, _ in self.slots))
+
+    def slot_labels(self) -> List[str]:
+        dow_label = format_dow_label(self.date)
+        return [f"{time_label} {dow_label} - {room} - Available" for room, time_label in self.slots]
+
+    def describe(self) -> str:
+        times = f"{self.slots[0][1]} ({len(self.slots)} slot{'s' if len(self.slots) != 1 else ''})"
+        if len(self.rooms) == 1:
+            return f"{self.rooms[0]} on {self.date.isoformat()} from {times}"
+        return f"{' / '.join(self.rooms)} on {self.date.isoformat()} from {times}, changing rooms"
+
+    def to_request(self, base: BookingRequest) -> BookingRequest:
+        """The concrete request booking this option."""
+        return dataclasses.replace(
+            base, target_date=self.date, room_name=self.slots[0][0],
+            time_slots=[time_label for _, time_label in self.slots],
+            slot_labels_to_click=self.slot_labels(), preferences=None,
+        )
+
+@dataclass
+class BookingPlan:
+    options: List[PlanOption]  # Feasible, best first
+    rejected: List[str]        # Why the other rooms/days did not work
+
+    def details(self, chosen: Optional[PlanOption], failed: List[PlanOption] = ()) -> dict:
+        """Plan summary for BookingResult.details."""
+        return {
+            "plan": chosen.describe() if chosen else None,
+            "failed_options": [option.describe() for option in failed],
+            "alternatives": [option.describe() for option in self.options if option is not chosen and option not in failed][:5],
+            "rejected": self.rejected,
+        }
+
+class BookingPlanner:
+    """
+    Builds a (date, room) x time availability matrix from the grid reads and
+    ranks every feasible block: preferred date first, then blocks in a single
+    room over ones that change rooms, then longer blocks (up to max_slots),
+    then preferred room, then earlier start.
+    """
+
+    def __init__(self, preferences: BookingPreferences):
+        self.preferences = preferences
+        self.window_start = time_label_minutes(preferences.window_start)
+        self.window_end = time_label_minutes(preferences.window_end)
+        self.min_slots = max(1, preferences.min_slots)
+        self.max_slots = max(self.min_slots, preferences.max_slots or self.min_slots)
+
+    def _free_starts(self, index: AvailabilityIndex, room: str, date: datetime.date) -> List[int]:
+        step = self.preferences.slot_minutes
+        return sorted(
+            minutes for minutes in (time_label_minutes(tile.time_label) for tile in index.available_tiles(room, date))
+            if self.window_start <= minutes and minutes + step <= self.window_end
+        )
+
+    def _runs(self, starts: List[int]) -> List[List[int]]:
+        """Splits sorted start times into back-to-back runs."""
+        runs: List[List[int]] = []
+        for minutes in starts:
+            if runs and minutes - runs[-1][-1] == self.preferences.slot_minutes:
+                runs[-1].append(minutes)
+            else:
+                runs.append([minutes])
+        return runs
+
+    def plan(self, index: AvailabilityIndex, loaded_dates: Optional[Set[datetime.date]] = None) -> BookingPlan:
+        """
+        Ranks the feasible blocks in `index`. Preferred dates missing from
+        `loaded_dates` (when given) are reported as not loaded, not as fully booked.
+        """
+        prefs = self.preferences
+        options: List[PlanOption] = []
+        rejected: List[str] = []
+        grid_dates = {tile.date for tile in index.available_tiles()}
+
+        for date_rank, date in enumerate(prefs.dates):
+            if loaded_dates is not None and date not in loaded_dates:
+                rejected.append(f"{date.isoformat()}: availability grid could not be loaded")
+                continue
+            if date not in grid_dates:
+                rejected.append(f"{date.isoformat()}: no free slots on the grid")
+                continue
+            free: Dict[str, List[int]] = {room: self._free_starts(index, room, date) for room in prefs.rooms}
+
+            date_options = []
+            for room_rank, room in enumerate(prefs.rooms):
+                runs = [run for run in self._runs(free[room]) if len(run) >= self.min_slots]
+                if not runs:
+                    longest = max((len(run) for run in self._runs(free[room])), default=0)
+                    rejected.append(f"{room} on {date.isoformat()}: longest free block in the window is {longest} slot(s), need {self.min_slots}")
+                    continue
+                for run in runs:
+                    block = run[:self.max_slots]
+                    date_options.append(PlanOption(
+                        date=date, slots=[(room, _minutes_label(m)) for m in block],
+                        rank=(date_rank, 0, -len(block), room_rank, block[0]),
+                    ))
+
+            if not date_options:
+                date_options = self._cross_room_options(date, date_rank, free)
+            options.extend(date_options)
+
+        options.sort(key=lambda option: option.rank)
+        plan = BookingPlan(options=options, rejected=rejected)
+        if options:
+            logger.info("Booking plan chosen.", extra=log_fields(plan=options[0].describe(), alternatives=len(options) - 1))
+        else:
+            logger.warning("No room, day and time in the preferences has a free block long enough.")
+        for reason in rejected:
+            logger.info("Option rejected.", extra=log_fields(reason=reason))
+        return plan
+
+    def _cross_room_options(self, date: datetime.date, date_rank: int, free: Dict[str, List[int]]) -> List[PlanOption]:
+        """Back-to-back blocks that change rooms, staying in the current room while it is free."""
+        room_rank = {room: rank for rank, room in enumerate(self.preferences.rooms)}
+        rooms_at: Dict[int, List[str]] = {}
+        for room in self.preferences.rooms:
+            for minutes in free[room]:
+                rooms_at.setdefault(minutes, []).append(room)
+
+        options = []
+        for run in self._runs(sorted(rooms_at)):
+            if len(run) < self.min_slots:
+                continue
+            block = run[:self.max_slots]
+            slots, room = [], None
+            for minutes in block:
+                if room not in rooms_at[minutes]:
+                    room = rooms_at[minutes][0]  # Most preferred free room
+                slots.append((room, _minutes_label(minutes)))
+            switches = sum(1 for a, b in zip(slots, slots[1:]) if a[0] != b[0])
+            options.append(PlanOption(
+                date=date, slots=slots,
+                rank=(date_rank, 1, -len(block), switches, sum(room_rank[r] for r, _ in slots), block[0]),
+            ))
+        return options
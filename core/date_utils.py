@@ -1,5 +1,8 @@
 # Date utility functions
 import datetime
+import functools
+import re
+from typing import List, Optional, Tuple
 
 def day_to_weekday_index(day_name: str) -> int:
     """
@@ -38,6 +41,7 @@ def get_next_day_of_week(day_name: str) -> datetime.date:
     
     return today + datetime.timedelta(days=offset)
 
+@functools.lru_cache(maxsize=1024)
 def format_dow_label(dt: datetime.date) -> str:
     """
     Return a string like 'Saturday, January 11, 2025'
@@ -46,4 +50,71 @@ def format_dow_label(dt: datetime.date) -> str:
     # The day part needs to be handled carefully to avoid leading zeros for single-digit days
     # when not using platform-specific '#' or '-' format codes (which are not universally supported).
     day_str = str(dt.day)
-    return dt.strftime(f"%A, %B {day_str}, %Y")
\ No newline at end of file
+    return dt.strftime(f"%A, %B {day_str}, %Y")
+
+def format_time_label(dt: datetime.datetime) -> str:
+    """
+    Return a time string like '10:00am' or '1:30pm', matching the
+    times used in LibCal tile aria-labels and on the command line.
+    """
+    return dt.strftime("%I:%M%p").lstrip("0").lower()
+
+def time_label_minutes(time_label: str) -> int:
+    """
+    Return minutes after midnight for a time label like '10:30am' (630),
+    for ordering slots and checking that they are back to back.
+    """
+    parsed = datetime.datetime.strptime(time_label.strip().upper(), "%I:%M%p")
+    return parsed.hour * 60 + parsed.minute
+
+_RANGE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})\s*\.\.\s*(\d{4}-\d{2}-\d{2})$")
+_EVERY_RE = re.compile(r"^every\s+([a-z]+)(?:\s+for\s+(\d+)\s+weeks?)?$")
+
+def expand_dates(spec: str, today: Optional[datetime.date] = None, horizon_days: Optional[int] = None) -> List[datetime.date]:
+    """
+    Return the sorted dates described by a comma-separated `spec`, e.g.
+    "Saturday", "2025-01-11", "2025-01-11..2025-01-18", "every Saturday"
+    or "every Saturday for 3 weeks". Ranges and recurrences stop at
+    today + `horizon_days` (how far ahead LibCal takes bookings);
+    "every <day>" without "for N weeks" runs up to it.
+    """
+    today = today or datetime.date.today()
+    return list(_expand_dates(spec.strip().lower(), today, horizon_days))
+
+@functools.lru_cache(maxsize=256)
+def _expand_dates(spec: str, today: datetime.date, horizon_days: Optional[int]) -> Tuple[datetime.date, ...]:
+    last = today + datetime.timedelta(days=horizon_days) if horizon_days is not None else None
+    dates = set()
+    for term in (t.strip() for t in spec.split(",")):
+        if not term:
+            continue
+        range_match = _RANGE_RE.match(term)
+        every_match = _EVERY_RE.match(term)
+        if range_match:
+            start, end = (datetime.date.fromisoformat(d) for d in range_match.groups())
+            if end < start:
+                raise ValueError(f"Date range ends before it starts: {term}")
+            start, end = max(start, today), min(end, last) if last else end
+            dates.update(start + datetime.timedelta(days=i) for i in range((end - start).days + 1))
+        elif every_match:
+            first = today + datetime.timedelta(days=(day_to_weekday_index(every_match.group(1)) - today.weekday()) % 7)
+            if every_match.group(2):
+                weeks = int(every_match.group(2))
+            elif last:
+                weeks = (last - first).days // 7 + 1
+            else:
+                raise ValueError(f'"{term}" needs "for N weeks" when there is no booking horizon')
+            dates.update(d for d in (first + datetime.timedelta(weeks=i) for i in range(weeks)) if not last or d <= last)
+        elif re.match(r"^\d{4}-\d{2}-\d{2}$", term):
+            date = datetime.date.fromisoformat(term)
+            if date < today:
+                raise ValueError(f"Date is in the past: {term}")
+            if last and date > last:
+                raise ValueError(f"Date is past the booking horizon ({horizon_days} days): {term}")
+            dates.add(date)
+        else:
+            offset = (day_to_weekday_index(term) - today.weekday()) % 7
+            dates.add(today + datetime.timedelta(days=offset))
+    if not dates:
+        raise ValueError(f"No bookable dates in: {spec}")
+    return tuple(sorted(dates))
@@ -0,0 +1,246 @@
+import dataclasses
+import datetime
+from typing import List, Optional
+from models.booking_request import BookingRequest
+from models.booking_result import BookingResult
+from core.base_engine import BaseBookingEngine
+from core.availability_index import AvailabilityIndex
+from core.libcal_client import GridSlot, LibCalClient, LibCalError
+from core.retry import StepRetrier
+from services.session_cache import SessionCache
+from utils.logger import log_fields, logger
+from utils.tracing import tracer
+from config import settings
+
+class HttpBookingEngine(BaseBookingEngine):
+    """
+    Books slots by talking to the LibCal endpoints directly instead of driving Chrome.
+    All wanted slots go into one cart and are booked with a single form submission.
+    """
+    def __init__(self, browser_fallback: bool = settings.HTTP_BROWSER_FALLBACK, session_cache: Optional[SessionCache] = None):
+        super().__init__()
+        # Fall back to the Selenium engine when the HTTP flow breaks before anything is submitted
+        self.browser_fallback = browser_fallback
+        # Restores authenticated sessions from earlier runs so login can be skipped
+        self.session_cache = session_cache
+
+    def _new_client(self, request: BookingRequest) -> LibCalClient:
+        client = LibCalClient(request.booking_url)
+        cached_state = self.session_cache.get(request.user_credentials.card_number) if self.session_cache else None
+        if cached_state:
+            client.import_session(cached_state)
+        return client
+
+    def _login(self, client: LibCalClient, request: BookingRequest) -> bool:
+        """Logs in and caches the new session."""
+        if not client.login(request.user_credentials):
+            return False
+        if self.session_cache:
+            self.session_cache.save(request.user_credentials.card_number, client.export_session())
+        return True
+
+    def list_availability(self, booking_url: str, target_date: datetime.date) -> AvailabilityIndex:
+        client = LibCalClient(booking_url)
+        try:
+            return AvailabilityIndex.from_grid_slots(slot for slot in client.fetch_grid(target_date) if slot.available)
+        finally:
+            client.close()
+
+    def execute_booking(self, request: BookingRequest) -> List[BookingResult]:
+        if request.preferences:
+            return self._book_planned(request)
+        if not self.validate_booking_parameters(request):
+            return [BookingResult(success=False, error_message="Invalid booking parameters.")]
+
+        client = self._new_client(request)
+        try:
+            with self._trace_attempt(request):
+                return self._book_with_client(client, request)
+        finally:
+            client.close()
+
+    def execute_bookings(self, requests: List[BookingRequest]) -> List[BookingResult]:
+        """
+        Books one request per date on a single client, with every date's grid
+        fetched in parallel up front. Requests that differ in anything but
+        date and slots are booked one after another instead.
+        """
+        first = requests[0] if requests else None
+        if len(requests) < 2 or any(
+            r.preferences or r.booking_url != first.booking_url or r.user_credentials != first.user_credentials for r in requests
+        ):
+            return super().execute_bookings(requests)
+
+        client = self._new_client(first)
+        try:
+            try:
+                grids = client.fetch_grids(request.target_date for request in requests)
+            except (LibCalError, OSError) as e:
+                logger.warning("Grid prefetch failed; reading each date's grid while booking.", extra=log_fields(step="grid", error=str(e)))
+                grids = {}
+            results: List[BookingResult] = []
+            for request in requests:
+                if not self.validate_booking_parameters(request):
+                    results.append(BookingResult(success=False, error_message="Invalid booking parameters."))
+                    continue
+                with self._trace_attempt(request):
+                    results.extend(self._book_with_client(client, request, grids.get(request.target_date)))
+            return results
+        finally:
+            client.close()
+
+    def _book_planned(self, request: BookingRequest) -> List[BookingResult]:
+        """
+        Reads the grid once per preferred date, plans request.preferences and
+        books the best option, moving on to the next when all its slots are lost.
+        """
+        from core.booking_planner import BookingPlanner
+
+        client = self._new_client(request)
+        try:
+            with self._trace_attempt(request):
+                try:
+                    grids = client.fetch_grids(request.preferences.dates)
+                except (LibCalError, OSError) as e:
+                    logger.error("Could not read availability for planning.", extra=log_fields(step="grid", error=str(e)))
+                    return [BookingResult(success=False, error_message=f"Could not read availability: {e}")]
+                index = AvailabilityIndex.from_grid_slots(slot for grid in grids.values() for slot in grid if slot.available)
+                plan = BookingPlanner(request.preferences).plan(index)
+                return self._book_plan(plan, request, lambda planned: self._book_with_client(client, planned, grids[planned.target_date]))
+        finally:
+            client.close()
+
+    def prepare_session(self, request: BookingRequest) -> LibCalClient:
+        """Opens pooled connections, reads the room list and signs in ahead of a timed booking."""
+        client = self._new_client(request)
+        try:
+            client.load_rooms()
+            if client.authenticated:
+                pass  # Restored from the session cache; verified when the booking form is opened
+            elif not self._login(client, request):
+                logger.warning("Pre-authentication failed; login will happen during booking.")
+        except (LibCalError, OSError) as e:
+            logger.warning("Could not fully prepare HTTP session.", extra=log_fields(step="prepare", error=str(e)))
+        return client
+
+    def execute_prepared(self, session: LibCalClient, request: BookingRequest) -> List[BookingResult]:
+        if not self.validate_booking_parameters(request):
+            return [BookingResult(success=False, error_message="Invalid booking parameters.")]
+        with self._trace_attempt(request):
+            return self._book_with_client(session, request)
+
+    def close_session(self, session: LibCalClient) -> None:
+        session.close()
+
+    def _trace_attempt(self, request: BookingRequest):
+        return tracer.trace(engine="http", room=request.room_name, date=request.target_date.isoformat(),
+                            slots=self._generate_slot_labels(request))
+
+    def _open_booking_form(self, client: LibCalClient, request: BookingRequest) -> Optional[str]:
+        """
+        Returns the booking form's session token, logging in first unless the
+        client is already authenticated. Returns None when the login is rejected.
+        """
+        if client.authenticated:
+            try:
+                return client.fetch_booking_form()
+            except LibCalError:
+                logger.warning("Pre-authenticated session no longer valid; logging in again.")
+                client.authenticated = False
+                if self.session_cache and client.session_restored:
+                    self.session_cache.invalidate(request.user_credentials.card_number)
+
+        if not self._login(client, request):
+            return None
+        return client.fetch_booking_form()
+
+    def _book_with_client(self, client: LibCalClient, request: BookingRequest, grid: Optional[List[GridSlot]] = None) -> List[BookingResult]:
+        """Books the request's slots; `grid` is a grid already read for its date (else it is fetched)."""
+        all_slot_labels = self._generate_slot_labels(request)
+        if not all_slot_labels:
+            return [BookingResult(success=False, error_message="Could not generate slot labels for booking.")]
+
+        results: List[BookingResult] = []
+        selected_labels: List[str] = []
+        final_submitted = False
+        # Retries failed requests on this client; the final submission is never retried
+        retrier = StepRetrier()
+        try:
+            if not client.rooms:
+                retrier.call("navigate", client.load_rooms)  # Separately, so the page load is not timed as part of the grid
+            if grid is None:
+                grid = retrier.call("grid", client.fetch_grid, request.target_date)
+            slots_by_label = {slot.aria_label: slot for slot in grid}
+
+            cart: List[dict] = []
+            for slot_label in all_slot_labels:
+                slot = slots_by_label.get(slot_label)
+                if slot is None:
+                    logger.warning("Slot NOT found/available. Possibly unavailable.", extra=log_fields(slot=slot_label, room=request.room_name, step="select"))
+                    results.append(BookingResult(success=False, error_message=f"Failed to select time slot: {slot_label}", details={"slot": slot_label}))
+                    continue
+                try:
+                    cart = retrier.call("select", client.add_to_cart, slot)
+                except LibCalError as e:
+                    # Taken since the grid was read; the other slots can still be booked
+                    logger.warning("Slot NOT added to cart.", extra=log_fields(slot=slot_label, room=request.room_name, step="select", error=str(e)))
+                    results.append(BookingResult(success=False, error_message=f"Failed to select time slot: {slot_label}", details={"slot": slot_label}))
+                    continue
+                selected_labels.append(slot_label)
+
+            if not selected_labels:
+                return retrier.add_details(results)
+
+            retrier.call("submit_times", client.submit_times, cart)
+
+            form_session = retrier.call("login", self._open_booking_form, client, request)
+            if form_session is None:
+                results.extend(
+                    BookingResult(success=False, error_message="Login failed.", details={"slot": label})
+                    for label in selected_labels
+                )
+                return retrier.add_details(results)
+
+            final_submitted = True
+            confirmation = client.submit_booking(form_session, request.party_size, cart)
+
+            booking_id = confirmation.get("bookId")
+            results.extend(
+                BookingResult(
+                    success=True,
+                    booking_id=booking_id or f"CONFIRMED_VIA_HTTP_{label.replace(' ', '_')}",
+                    details={"slot": label, "engine": "http"},
+                )
+                for label in selected_labels
+            )
+            return retrier.add_details(results)
+
+        except (LibCalError, OSError) as e:
+            # requests' exceptions derive from OSError (IOError)
+            logger.error("HTTP booking flow failed.", extra=log_fields(step=retrier.checkpoint.failed_step, room=request.room_name,
+                                                                 final_submitted=final_submitted, error=str(e)))
+            if final_submitted:
+                results.extend(
+                    BookingResult(success=False, error_message=f"Booking submission failed: {str(e)}", details={"slot": label, "engine": "http"})
+                    for label in selected_labels
+                )
+                return retrier.add_details(results)
+            attempted = {r.details["slot"] for r in results if r.details}
+            remaining = [label for label in all_slot_labels if label not in attempted]
+            return retrier.add_details(results) + self._fallback_to_browser(request, remaining, str(e))
+
+    def _fallback_to_browser(self, request: BookingRequest, slot_labels: List[str], reason: str) -> List[BookingResult]:
+        """Retries the given slots with the Selenium engine, if enabled and installed."""
+        if self.browser_fallback:
+            try:
+                from core.booking_engine import BookingEngine
+            except ImportError:
+                logger.error("Selenium is not installed; browser fallback unavailable.")
+            else:
+                logger.warning("Falling back to browser booking.", extra=log_fields(slots=len(slot_labels), room=request.room_name, reason=reason))
+                return BookingEngine().execute_booking(dataclasses.replace(request, slot_labels_to_click=slot_labels))
+
+        return [
+            BookingResult(success=False, error_message=f"HTTP booking failed: {reason}", details={"slot": label, "engine": "http"})
+            for label in slot_labels
+        ]
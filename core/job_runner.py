@@ -0,0 +1,213 @@
+# Runs many booking requests from a job file under a bounded worker pool
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, List, Optional, Tuple
+
+from core.base_engine import BaseBookingEngine
+from core.date_utils import get_next_day_of_week
+from models.booking_request import BookingRequest
+from services.authentication_service import AuthenticationService
+from utils.logger import correlation, log_fields, logger
+from utils.stats import percentile
+from config import settings
+
+@dataclass
+class BookingJob:
+    job_id: str
+    request: BookingRequest
+    profile: Optional[str] = None
+
+    @property
+    def slot_key(self) -> Tuple[str, datetime.date]:
+        return (self.request.room_name.strip().lower(), self.request.target_date)
+
+@dataclass
+class JobOutcome:
+    job: BookingJob
+    status: str  # "booked", "partial", "failed", "duplicate", "conflict", "error"
+    results: list = field(default_factory=list)
+    latency_seconds: float = 0.0
+    message: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        request = self.job.request
+        return {
+            "job_id": self.job.job_id,
+            "status": self.status,
+            "room": request.room_name,
+            "date": request.target_date.isoformat(),
+            "times": request.time_slots,
+            "profile": self.job.profile,
+            "latency_ms": round(self.latency_seconds * 1000, 1),
+            "message": self.message,
+            "results": [r.to_dict() for r in self.results],
+        }
+
+def _read_job_file(path: Path) -> list:
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML job files need PyYAML (pip install pyyaml); use JSON otherwise.")
+        data = yaml.safe_load(text)
+    else:
+        data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("jobs", [])
+    if not isinstance(data, list):
+        raise ValueError("Job file must contain a list of jobs or a {\"jobs\": [...]} mapping.")
+    return data
+
+def parse_job(raw: dict, job_id: str, auth_service: AuthenticationService, credentials_by_profile: Optional[dict] = None,
+              booking_url: Optional[str] = None) -> BookingJob:
+    """
+    Builds a BookingJob from one job mapping (see load_jobs). Credentials are
+    loaded once per profile into `credentials_by_profile`, when given.
+    A fixed `booking_url` is used for every job, and a job naming its own is
+    refused: the card would be sent to whatever site that URL points at.
+    """
+    credentials_by_profile = {} if credentials_by_profile is None else credentials_by_profile
+    if booking_url is not None and raw.get("booking_url"):
+        raise ValueError(f"Job {job_id} may not set booking_url.")
+    try:
+        if raw.get("date"):
+            target_date = datetime.date.fromisoformat(str(raw["date"]))
+        else:
+            target_date = get_next_day_of_week(raw["day"])
+        times = raw["times"]
+        if isinstance(times, str):
+            times = [t.strip() for t in times.split(",")]
+        profile = raw.get("profile")
+        if profile not in credentials_by_profile:
+            credentials_by_profile[profile] = auth_service.load_credentials(profile)
+        request = BookingRequest(
+            target_date=target_date,
+            time_slots=[str(t).strip().lower() for t in times],
+            room_name=raw["room"],
+            party_size=int(raw.get("party_size", settings.DEFAULT_PARTY_SIZE)),
+            user_credentials=credentials_by_profile[profile],
+        )
+        if booking_url is not None:
+            request.booking_url = booking_url
+        elif raw.get("booking_url"):
+            request.booking_url = raw["booking_url"]
+    except KeyError as e:
+        raise ValueError(f"Job {job_id} is missing field {e}.")
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError(f"Job {job_id} is invalid: {e}")
+    return BookingJob(job_id=job_id, request=request, profile=profile)
+
+def load_jobs(path: str, auth_service: Optional[AuthenticationService] = None) -> List[BookingJob]:
+    """
+    Reads booking jobs from a JSON or YAML file. Each job looks like:
+        {"day": "Saturday", "times": "10:00am,11:00am", "room": "Adult Rm. 1",
+         "party_size": 4, "profile": "robotics"}
+    "date": "YYYY-MM-DD" may be given instead of "day". "profile" selects
+    LIBRARY_CARD_NUMBER_<PROFILE>/LIBRARY_PIN_<PROFILE>; omit it for the default card.
+    """
+    auth_service = auth_service or AuthenticationService()
+    credentials_by_profile = {}
+    return [
+        parse_job(raw, str(raw.get("id", f"job-{i}")), auth_service, credentials_by_profile)
+        for i, raw in enumerate(_read_job_file(Path(path)), start=1)
+    ]
+
+def deduplicate_jobs(jobs: List[BookingJob]) -> Tuple[List[BookingJob], List[JobOutcome]]:
+    """
+    Drops exact duplicates and rejects jobs whose times overlap an earlier job
+    for the same room and date. Jobs for different times in the same room/date are kept.
+    Returns the jobs to run and outcomes for the rejected ones.
+    """
+    accepted: List[BookingJob] = []
+    rejected: List[JobOutcome] = []
+    claimed = {}  # (room, date) -> list of (job, set of times)
+    for job in jobs:
+        times = set(job.request.time_slots)
+        conflict = None
+        for other, other_times in claimed.get(job.slot_key, []):
+            if times == other_times:
+                rejected.append(JobOutcome(job, "duplicate", message=f"Same room, date and times as {other.job_id}."))
+                conflict = other
+                break
+            overlap = times & other_times
+            if overlap:
+                rejected.append(JobOutcome(job, "conflict", message=f"Overlaps {other.job_id} at {', '.join(sorted(overlap))}."))
+                conflict = other
+                break
+        if conflict is None:
+            claimed.setdefault(job.slot_key, []).append((job, times))
+            accepted.append(job)
+    for outcome in rejected:
+        logger.warning("Skipping job.", extra=log_fields(job_id=outcome.job.job_id, reason=outcome.message))
+    return accepted, rejected
+
+class JobRunner:
+    """Runs jobs concurrently on a shared engine and streams outcomes as JSON lines."""
+
+    def __init__(self, engine: BaseBookingEngine, max_workers: int = settings.JOB_MAX_WORKERS, output: Optional[IO[str]] = None):
+        self.engine = engine
+        self.max_workers = max(1, max_workers)
+        self.output = output
+        self._output_lock = threading.Lock()
+
+    def _emit(self, outcome: JobOutcome) -> None:
+        if self.output is None:
+            return
+        with self._output_lock:
+            self.output.write(json.dumps(outcome.to_dict()) + "\n")
+            self.output.flush()
+
+    def run_job(self, job: BookingJob) -> JobOutcome:
+        """Books one job and classifies the outcome (booked, partial, failed or error)."""
+        started = time.monotonic()
+        with correlation(job.job_id):
+            try:
+                results = self.engine.execute_booking(job.request)
+            except Exception as e:
+                logger.error("Job crashed.", exc_info=True, extra=log_fields(job_id=job.job_id, error=str(e)))
+                return JobOutcome(job, "error", latency_seconds=time.monotonic() - started, message=str(e))
+        booked = sum(1 for r in results if r.success)
+        if results and booked == len(results):
+            status = "booked"
+        elif booked:
+            status = "partial"
+        else:
+            status = "failed"
+        return JobOutcome(job, status, results=results, latency_seconds=time.monotonic() - started)
+
+    def run(self, jobs: List[BookingJob]) -> List[JobOutcome]:
+        accepted, outcomes = deduplicate_jobs(jobs)
+        for outcome in outcomes:
+            self._emit(outcome)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="booking-job") as executor:
+            futures = [executor.submit(self.run_job, job) for job in accepted]
+            for future in as_completed(futures):
+                outcome = future.result()
+                self._emit(outcome)
+                outcomes.append(outcome)
+        elapsed = time.monotonic() - started
+
+        accepted_ids = {id(job) for job in accepted}
+        self.log_throughput([o for o in outcomes if id(o.job) in accepted_ids], elapsed)
+        return outcomes
+
+    def log_throughput(self, outcomes: List[JobOutcome], elapsed_seconds: float) -> dict:
+        latencies = [o.latency_seconds * 1000 for o in outcomes]
+        report = {
+            "jobs": len(outcomes),
+            "workers": self.max_workers,
+            "elapsed_s": round(elapsed_seconds, 2),
+            "jobs_per_min": round(len(outcomes) / elapsed_seconds * 60, 1) if elapsed_seconds > 0 else 0.0,
+            "p50_latency_ms": round(percentile(latencies, 50), 1),
+            "p95_latency_ms": round(percentile(latencies, 95), 1),
+        }
+        logger.info("Job run finished.", extra=log_fields(**report))
+        return report
@@ -0,0 +1,287 @@
+# HTTP client for the LibCal spaces booking endpoints
+import datetime
+import json
+import re
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.date_utils import format_dow_label, format_time_label
+from models.booking_request import Credentials
+from utils.logger import log_fields, logger
+from utils.tracing import traced
+from config import settings
+
+class LibCalError(Exception):
+    """Raised when a LibCal endpoint returns something the booking flow does not expect."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code  # HTTP status of the response, when one was read
+
+@dataclass
+class GridSlot:
+    item_id: int
+    room_name: str
+    start: datetime.datetime
+    end: datetime.datetime
+    checksum: str
+    available: bool
+
+    @property
+    def aria_label(self) -> str:
+        """The aria-label LibCal renders on this slot's tile in the browser."""
+        status = "Available" if self.available else "Unavailable"
+        return f"{format_time_label(self.start)} {format_dow_label(self.start.date())} - {self.room_name} - {status}"
+
+_adapter_lock = threading.Lock()
+_shared_adapter: Optional[HTTPAdapter] = None
+
+def get_shared_adapter() -> HTTPAdapter:
+    """
+    Returns the process-wide HTTP adapter. Sessions mounting it share
+    keep-alive connections to LibCal while keeping their own cookies.
+    """
+    global _shared_adapter
+    with _adapter_lock:
+        if _shared_adapter is None:
+            _shared_adapter = HTTPAdapter(
+                pool_connections=settings.HTTP_POOL_CONNECTIONS,
+                pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+            )
+        return _shared_adapter
+
+class LibCalClient:
+    """
+    Speaks the LibCal spaces endpoints used by the browser flow:
+    availability grid, add-to-cart, submit times, patron login and the booking form.
+    """
+    GRID_PATH = "/spaces/availability/grid"
+    ADD_TO_CART_PATH = "/spaces/availability/booking/add"
+    SUBMIT_TIMES_PATH = "/ajax/space/times"
+    LOGIN_PATH = "/spaces/auth"
+    BOOKING_FORM_PATH = "/spaces/booking/form"
+    BOOK_PATH = "/ajax/space/book"
+
+    PARTY_SIZE_FIELD = "q16700"
+    AGREEMENT_FIELD = "q14992[]"
+    AGREEMENT_VALUE = "I agree"
+
+    _RESOURCE_RE = re.compile(r'id:\s*"eid_(\d+)",\s*title:\s*"([^"]+)"')
+    _SESSION_RE = re.compile(r'<input[^>]*name="session"[^>]*value="([^"]*)"')
+
+    def __init__(self, booking_url: str, timeout: float = settings.HTTP_TIMEOUT_SECONDS):
+        parsed = urlparse(booking_url)
+        query = parse_qs(parsed.query)
+        self.booking_url = booking_url
+        self.base_url = f"{parsed.scheme}://{parsed.netloc}"
+        self.lid = query.get("lid", [""])[0]
+        self.gid = query.get("gid", [""])[0]
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = get_shared_adapter()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"X-Requested-With": "XMLHttpRequest"})
+
+        self.rooms: Dict[int, str] = {}
+        self.authenticated = False
+        self.session_restored = False
+        # Monotonic time of the first add-to-cart, for release-time latency reporting
+        self.first_action_at: Optional[float] = None
+        self._form_html: Optional[str] = None
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def _post_json(self, path: str, data) -> dict:
+        response = self.session.post(self._url(path), data=data, timeout=self.timeout)
+        try:
+            payload = response.json()
+        except ValueError:
+            raise LibCalError(f"{path} returned non-JSON response (HTTP {response.status_code}).",
+                              status_code=response.status_code)
+        if response.status_code >= 400 or (isinstance(payload, dict) and payload.get("error")):
+            message = payload.get("error") if isinstance(payload, dict) else None
+            raise LibCalError(f"{path} failed (HTTP {response.status_code}): {message or 'no details'}",
+                              status_code=response.status_code)
+        return payload
+
+    @staticmethod
+    def _encode_bookings(cart: List[dict]) -> Dict[str, str]:
+        """Encodes cart entries the way LibCal's jQuery forms do: bookings[0][id]=..."""
+        fields = {}
+        for i, entry in enumerate(cart):
+            for key, value in entry.items():
+                fields[f"bookings[{i}][{key}]"] = str(value)
+        return fields
+
+    @traced("navigate")
+    def load_rooms(self) -> Dict[int, str]:
+        """Loads the spaces page and reads the room (eid -> name) list embedded in it."""
+        response = self.session.get(self.booking_url, timeout=self.timeout)
+        response.raise_for_status()
+        self.rooms = {int(eid): title for eid, title in self._RESOURCE_RE.findall(response.text)}
+        if not self.rooms:
+            raise LibCalError("No rooms found on the spaces page; the page layout may have changed.")
+        logger.info("Loaded rooms from spaces page.", extra=log_fields(rooms=len(self.rooms), step="navigate"))
+        return self.rooms
+
+    @traced("grid")
+    def fetch_grid(self, target_date: datetime.date) -> List[GridSlot]:
+        """Fetches the availability grid for one day."""
+        if not self.rooms:
+            self.load_rooms()
+        payload = self._post_json(self.GRID_PATH, {
+            "lid": self.lid,
+            "gid": self.gid,
+            "eid": -1,
+            "seat": 0,
+            "seatId": 0,
+            "zone": 0,
+            "start": target_date.isoformat(),
+            "end": (target_date + datetime.timedelta(days=1)).isoformat(),
+            "pageIndex": 0,
+            "pageSize": 18,
+        })
+        slots = []
+        try:
+            for raw in payload.get("slots", []):
+                room_name = self.rooms.get(int(raw["itemId"]))
+                if room_name is None:
+                    continue
+                slots.append(GridSlot(
+                    item_id=int(raw["itemId"]),
+                    room_name=room_name,
+                    start=datetime.datetime.strptime(raw["start"], "%Y-%m-%d %H:%M:%S"),
+                    end=datetime.datetime.strptime(raw["end"], "%Y-%m-%d %H:%M:%S"),
+                    checksum=raw.get("checksum", ""),
+                    # Booked or closed slots carry a className such as "s-lc-eq-checkout"
+                    available=not raw.get("className"),
+                ))
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            # Callers fall back (or retry the poll) on LibCalError; a malformed grid is one too
+            raise LibCalError(f"Malformed availability grid for {target_date}: {e!r}")
+        logger.info("Availability grid loaded.", extra=log_fields(slots=len(slots), step="grid"))
+        return slots
+
+    def fetch_grids(self, dates: Iterable[datetime.date], max_workers: int = settings.GRID_PREFETCH_WORKERS) -> Dict[datetime.date, List[GridSlot]]:
+        """
+        Fetches the grids for several days in parallel over the shared
+        connection pool. Raises the first failure, like fetch_grid.
+        """
+        dates = list(dict.fromkeys(dates))
+        if not self.rooms:
+            self.load_rooms()
+        if len(dates) <= 1 or max_workers <= 1:
+            return {date: self.fetch_grid(date) for date in dates}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(dates)), thread_name_prefix="grid-prefetch") as executor:
+            # Each fetch runs in a copy of this context so its span joins the current trace
+            futures = [executor.submit(contextvars.copy_context().run, self.fetch_grid, date) for date in dates]
+            return {date: future.result() for date, future in zip(dates, futures)}
+
+    @traced("select", lambda self, slot: {"slot": slot.aria_label})
+    def add_to_cart(self, slot: GridSlot) -> List[dict]:
+        """Adds a slot to the server-side cart and returns the full cart."""
+        if self.first_action_at is None:
+            self.first_action_at = time.monotonic()
+        payload = self._post_json(self.ADD_TO_CART_PATH, {
+            "add[eid]": slot.item_id,
+            "add[gid]": self.gid,
+            "add[lid]": self.lid,
+            "add[start]": slot.start.strftime("%Y-%m-%d %H:%M"),
+            "add[checksum]": slot.checksum,
+            "lid": self.lid,
+            "gid": self.gid,
+            "start": slot.start.date().isoformat(),
+            "end": (slot.start.date() + datetime.timedelta(days=1)).isoformat(),
+        })
+        return payload.get("bookings", [])
+
+    @traced("submit_times")
+    def submit_times(self, cart: List[dict]) -> None:
+        """Equivalent of the "Submit Times" button."""
+        fields = {"patron": "", "patronHash": "", "returnUrl": self.booking_url}
+        fields.update(self._encode_bookings(cart))
+        self._post_json(self.SUBMIT_TIMES_PATH, fields)
+        self._form_html = None  # A form fetched before this point belongs to an older cart
+        logger.info("Submit Times posted.")
+
+    @traced("login")
+    def login(self, credentials: Credentials) -> bool:
+        """Posts the patron login form. Returns False when LibCal rejects the credentials."""
+        response = self.session.post(self._url(self.LOGIN_PATH), data={
+            "username": credentials.card_number,
+            "password": credentials.pin,
+        }, timeout=self.timeout)
+        if response.status_code >= 500:
+            raise LibCalError(f"Login failed with HTTP {response.status_code}.", status_code=response.status_code)
+        if f'id="{self.PARTY_SIZE_FIELD}"' not in response.text:
+            logger.error("Login rejected or booking form not shown after login.")
+            return False
+        self._form_html = response.text
+        self.authenticated = True
+        logger.info("Login submitted.")
+        return True
+
+    @traced("form_fill")
+    def fetch_booking_form(self) -> str:
+        """Returns the booking form's session token, loading the form if login did not already."""
+        html = self._form_html
+        if html is None:
+            response = self.session.get(self._url(self.BOOKING_FORM_PATH), timeout=self.timeout)
+            response.raise_for_status()
+            html = response.text
+        match = self._SESSION_RE.search(html)
+        if not match or f'id="{self.PARTY_SIZE_FIELD}"' not in html:
+            raise LibCalError("Booking form not found or missing session token.")
+        logger.info("Booking form details page loaded.")
+        return match.group(1)
+
+    @traced("final_submit")
+    def submit_booking(self, form_session: str, party_size: int, cart: List[dict]) -> dict:
+        """Submits the booking form (party size and agreement) and returns LibCal's confirmation."""
+        fields = {
+            "session": form_session,
+            f"formData[{self.PARTY_SIZE_FIELD}]": str(party_size),
+            f"formData[{self.AGREEMENT_FIELD}]": self.AGREEMENT_VALUE,
+            "returnUrl": self.booking_url,
+        }
+        fields.update(self._encode_bookings(cart))
+        payload = self._post_json(self.BOOK_PATH, fields)
+        if "s-lc-eq-success-title" not in payload.get("html", "") and not payload.get("bookId"):
+            raise LibCalError(f"Unexpected booking response: {json.dumps(payload)[:200]}")
+        logger.info("Final booking form submitted.")
+        return payload
+
+    def export_session(self) -> dict:
+        """Captures the session cookies after a successful login."""
+        return {
+            "cookies": [
+                {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expiry": c.expires}
+                for c in self.session.cookies
+            ],
+        }
+
+    def import_session(self, state: dict) -> None:
+        """
+        Restores cookies from export_session(). The client is treated as logged in
+        until LibCal shows otherwise (see HttpBookingEngine._open_booking_form).
+        """
+        for cookie in state.get("cookies", []):
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        self.authenticated = True
+        self.session_restored = True
+        logger.info("Restored cached LibCal session.")
+
+    def close(self) -> None:
+        # Closing the session would close the shared adapter's connections too
+        self.session.cookies.clear()
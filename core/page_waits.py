@@ -0,0 +1,154 @@
+# Event-driven page waits with per-step timeouts learned from observed latencies
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+
+from utils.logger import log_fields, logger
+from utils.stats import percentile
+from config import settings
+
+Locator = Tuple[str, str]  # (By.ID | By.CSS_SELECTOR | By.XPATH, value)
+
+# Visible LibCal error banners (rejected login, slot taken, form errors)
+ERROR_LOCATORS: List[Locator] = [(By.CSS_SELECTOR, ".alert-danger")]
+
+# Resolves with the first ready/error element, re-checking on every DOM mutation
+# instead of polling. Runs under execute_async_script; the last argument is the callback.
+_WAIT_JS = """
+var ready = arguments[0], errors = arguments[1], mode = arguments[2], timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+
+function find(loc) {
+    if (loc[0] === 'xpath') {
+        return document.evaluate(loc[1], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    if (loc[0] === 'id') { return document.getElementById(loc[1]); }
+    return document.querySelector(loc[1]);
+}
+function visible(el) { return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length); }
+function check() {
+    for (var i = 0; i < errors.length; i++) {
+        var err = find(errors[i]);
+        if (err && visible(err)) { return {state: 'error', text: (err.textContent || '').trim().slice(0, 300)}; }
+    }
+    if (mode === 'absent') {
+        return ready.every(function (loc) { var el = find(loc); return !el || !visible(el); }) ? {state: 'ready', element: null} : null;
+    }
+    for (var j = 0; j < ready.length; j++) {
+        var el = find(ready[j]);
+        if (el && (mode !== 'clickable' || (visible(el) && !el.disabled))) { return {state: 'ready', element: el}; }
+    }
+    return null;
+}
+
+var result = check();
+if (result) { done(result); return; }
+var timer;
+var observer = new MutationObserver(function () {
+    var result = check();
+    if (result) { observer.disconnect(); clearTimeout(timer); done(result); }
+});
+observer.observe(document.documentElement || document, {childList: true, subtree: true, attributes: true, characterData: true});
+timer = setTimeout(function () { observer.disconnect(); done({state: 'timeout'}); }, timeoutMs);
+"""
+
+class PageErrorState(Exception):
+    """Raised when the page shows an error banner while waiting for a step."""
+
+    def __init__(self, step: str, text: str):
+        super().__init__(f"Page reported an error during '{step}': {text or 'no details'}")
+        self.step = step
+        self.text = text
+
+class AdaptiveTimeouts:
+    """
+    Per-step timeouts learned from recent step latencies: p99 x `factor`, clamped
+    to [min_seconds, max_seconds]. Steps with too few samples use `max_seconds`.
+    """
+
+    def __init__(self, factor: float = settings.WAIT_TIMEOUT_FACTOR, min_seconds: float = settings.WAIT_MIN_TIMEOUT_SECONDS,
+                 max_seconds: float = settings.TIMEOUT_SECONDS, min_samples: int = settings.WAIT_MIN_SAMPLES,
+                 history_size: int = settings.WAIT_HISTORY_SIZE):
+        self.factor = factor
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.min_samples = min_samples
+        self.history_size = history_size
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, step: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(step, deque(maxlen=self.history_size)).append(seconds)
+
+    def timeout_for(self, step: str) -> float:
+        with self._lock:
+            samples = list(self._latencies.get(step, ()))
+        if len(samples) < self.min_samples:
+            return self.max_seconds
+        return min(self.max_seconds, max(self.min_seconds, percentile(samples, 99) * self.factor))
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current learned timeout and sample count per step, for logging."""
+        with self._lock:
+            steps = {step: len(samples) for step, samples in self._latencies.items()}
+        return {step: {"samples": count, "timeout_s": round(self.timeout_for(step), 2)} for step, count in steps.items()}
+
+# Shared by every driver in the process, so pooled and job-mode sessions learn together
+step_timeouts = AdaptiveTimeouts()
+
+class PageWaiter:
+    """
+    Waits for page states with an in-page MutationObserver (one WebDriver call per
+    wait, resolved on the DOM change itself) instead of implicit waits or polling.
+    Error banners end the wait at once with PageErrorState; misses raise TimeoutException.
+    """
+
+    def __init__(self, driver, timeouts: Optional[AdaptiveTimeouts] = None):
+        self.driver = driver
+        self.timeouts = timeouts or step_timeouts
+        # Must outlast the longest in-page timeout so the page, not WebDriver, ends the wait
+        self.driver.set_script_timeout(self.timeouts.max_seconds + 5)
+
+    def _wait(self, step: str, ready: Union[Locator, Sequence[Locator]], mode: str,
+              errors: Sequence[Locator], timeout: Optional[float]):
+        locators = [ready] if isinstance(ready, tuple) else list(ready)
+        timeout = timeout if timeout is not None else self.timeouts.timeout_for(step)
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                result = self.driver.execute_async_script(
+                    _WAIT_JS, [list(l) for l in locators], [list(l) for l in errors], mode, int(remaining * 1000)
+                )
+            except WebDriverException as e:
+                # A navigation destroyed the page the observer lived in; wait on the new one
+                if "unload" not in str(e).lower() and "context" not in str(e).lower():
+                    raise
+                time.sleep(0.01)
+                continue
+            if result["state"] == "ready":
+                self.timeouts.record(step, time.monotonic() - started)
+                return result.get("element")
+            if result["state"] == "error":
+                raise PageErrorState(step, result.get("text", ""))
+            break
+        logger.debug("Step timed out.", extra=log_fields(step=step, timeout_s=round(timeout, 1), learned_timeouts=self.timeouts.snapshot()))
+        raise TimeoutException(f"Step '{step}' not ready after {timeout:.1f}s.")
+
+    def wait_for(self, step: str, ready: Union[Locator, Sequence[Locator]], clickable: bool = False,
+                 errors: Sequence[Locator] = ERROR_LOCATORS, timeout: Optional[float] = None):
+        """Returns the first element matching any of `ready` (visible and enabled if `clickable`)."""
+        return self._wait(step, ready, "clickable" if clickable else "present", errors, timeout)
+
+    def wait_for_absence(self, step: str, gone: Union[Locator, Sequence[Locator]],
+                         errors: Sequence[Locator] = ERROR_LOCATORS, timeout: Optional[float] = None) -> None:
+        """Waits until none of `gone` is shown any more."""
+        self._wait(step, gone, "absent", errors, timeout)
@@ -0,0 +1,148 @@
+# Fires a prepared booking at an exact release time
+import datetime
+import email.utils
+import statistics
+import time
+from typing import List, Optional
+
+import requests
+
+from core.base_engine import BaseBookingEngine
+from models.booking_request import BookingRequest
+from models.booking_result import BookingResult
+from utils.logger import log_fields, logger
+from config import settings
+
+def _server_epoch(response: requests.Response) -> Optional[float]:
+    date_header = response.headers.get("Date")
+    if not date_header:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(date_header).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def measure_clock_offset(url: str, max_seconds: float = settings.CLOCK_SYNC_MAX_SECONDS) -> float:
+    """
+    Estimates server clock minus local clock, in seconds, from HTTP Date headers.
+
+    Date headers only have one-second resolution, so this polls until the
+    server's second ticks over: the tick happened between the two requests,
+    which pins the offset down to roughly one round trip. If no tick is seen
+    within `max_seconds`, the median of the coarse samples is used.
+    Returns 0.0 when the server cannot be reached.
+    """
+    session = requests.Session()
+    coarse_offsets: List[float] = []
+    previous: Optional[tuple] = None  # (server_second, local time after response)
+    deadline = time.monotonic() + max_seconds
+    try:
+        while time.monotonic() < deadline:
+            sent = time.time()
+            try:
+                response = session.head(url, timeout=settings.HTTP_TIMEOUT_SECONDS, allow_redirects=False)
+            except requests.RequestException as e:
+                logger.warning("Clock sync request failed.", extra=log_fields(error=str(e)))
+                break
+            received = time.time()
+            server_second = _server_epoch(response)
+            if server_second is None:
+                logger.warning("Server did not send a Date header; assuming clocks agree.")
+                break
+
+            # The server second [s, s+1) was stamped somewhere within [sent, received]
+            coarse_offsets.append(server_second + 0.5 - (sent + received) / 2)
+            if previous is not None and server_second > previous[0]:
+                # The tick to `server_second` happened after the previous response and before this reply
+                tick_local = (previous[1] + received) / 2
+                offset = server_second - tick_local
+                logger.info("Measured server clock offset.", extra=log_fields(offset_ms=round(offset * 1000, 1), error_ms=round((received - previous[1]) * 500, 1)))
+                return offset
+            previous = (server_second, received)
+    finally:
+        session.close()
+
+    if coarse_offsets:
+        offset = statistics.median(coarse_offsets)
+        logger.info("Measured server clock offset (coarse).", extra=log_fields(offset_ms=round(offset * 1000, 1), error_ms=500))
+        return offset
+    return 0.0
+
+def wait_until(deadline: float, spin_seconds: float = settings.SNIPER_SPIN_SECONDS) -> None:
+    """
+    Blocks until time.perf_counter() reaches `deadline`: sleeps for the bulk of
+    the wait, then busy-waits the last `spin_seconds` to avoid sleep overshoot.
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > spin_seconds:
+            time.sleep(min(remaining - spin_seconds, 1.0))
+
+class ReleaseScheduler:
+    """
+    Prepares a booking session ahead of `release_at` (local wall time), then
+    fires the booking at the release instant as seen by the LibCal server clock.
+    """
+    def __init__(
+        self,
+        release_at: datetime.datetime,
+        lead_seconds: float = settings.SNIPER_LEAD_SECONDS,
+        fire_offset_ms: float = settings.SNIPER_FIRE_OFFSET_MS,
+    ):
+        self.release_at = release_at
+        self.lead_seconds = lead_seconds
+        self.fire_offset_ms = fire_offset_ms
+
+    def _seconds_until(self, epoch: float) -> float:
+        return epoch - time.time()
+
+    def run(self, engine: BaseBookingEngine, request: BookingRequest) -> List[BookingResult]:
+        release_epoch = self.release_at.timestamp()
+
+        warm_at = release_epoch - self.lead_seconds
+        if self._seconds_until(warm_at) > 0:
+            logger.info("Waiting to warm up for the release.", extra=log_fields(warm_at=f"{datetime.datetime.fromtimestamp(warm_at):%H:%M:%S}", release_at=self.release_at.isoformat()))
+            wait_until(time.perf_counter() + self._seconds_until(warm_at))
+
+        logger.info("Warming up booking session.")
+        try:
+            session = engine.prepare_session(request)
+        except Exception as e:
+            logger.error("Could not warm up booking session.", exc_info=True, extra=log_fields(step="prepare", error=str(e)))
+            return [BookingResult(success=False, error_message=f"Could not prepare booking session: {e}")]
+        try:
+            offset = measure_clock_offset(request.booking_url)
+            # Server reaches the release time when local time = release - offset
+            fire_delay = self._seconds_until(release_epoch - offset) + self.fire_offset_ms / 1000
+            if fire_delay < 0:
+                logger.warning("Release time already passed; booking now.", extra=log_fields(late_s=round(-fire_delay, 1)))
+            else:
+                logger.info("Session ready; firing at release.", extra=log_fields(fire_in_s=round(fire_delay, 3)))
+            release_mono = time.monotonic() + fire_delay
+            wait_until(time.perf_counter() + fire_delay)
+
+            fired_mono = time.monotonic()
+            try:
+                results = engine.execute_prepared(session, request)
+            except Exception as e:
+                logger.error("Prepared booking attempt failed.", exc_info=True, extra=log_fields(room=request.room_name, error=str(e)))
+                results = [BookingResult(success=False, error_message=f"Booking attempt failed: {e}")]
+            done_mono = time.monotonic()
+        finally:
+            engine.close_session(session)
+
+        timing = {
+            "clock_offset_ms": round(offset * 1000, 1),
+            "fire_lateness_ms": round((fired_mono - release_mono) * 1000, 1),
+            "confirmation_ms": round((done_mono - release_mono) * 1000, 1),
+        }
+        first_action_at = getattr(session, "first_action_at", None)
+        if first_action_at is not None:
+            timing["first_click_ms"] = round((first_action_at - release_mono) * 1000, 1)
+        logger.info("Release timing.", extra=log_fields(**timing))
+
+        for result in results:
+            result.details = {**(result.details or {}), "release_timing": timing}
+        return results
@@ -0,0 +1,184 @@
+# Step-level retries that resume a booking on its live session
+import functools
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.logger import log_fields, logger
+from config import settings
+
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# Page/server messages that no retry can fix: the slot is gone or the card was rejected
+FATAL_MESSAGES = (
+    "no longer available",
+    "not available",
+    "invalid slot",
+    "invalid library card",
+    "invalid pin",
+    "invalid username",
+    "booking limit",
+    "limit exceeded",
+)
+# Never retried: once the final submit is clicked the booking may already exist
+UNRETRIABLE_STEPS = {"final_submit", "confirmation"}
+# Steps whose fatal failures concern single slots; the other slots can still be booked on their own
+SLOT_STEPS = {"grid", "select", "submit_times"}
+
+class FatalStepError(Exception):
+    """Raised by a step action for a failure that must not be retried."""
+
+@functools.lru_cache(maxsize=1)
+def _transient_types() -> Tuple[type, ...]:
+    """Connection errors and timeouts, from whichever of requests and Selenium is installed."""
+    types: List[type] = []
+    try:
+        from requests.exceptions import ConnectionError, Timeout
+        types += [ConnectionError, Timeout]
+    except ImportError:
+        pass
+    try:
+        from selenium.common.exceptions import TimeoutException
+        types.append(TimeoutException)
+    except ImportError:
+        pass
+    return tuple(types)
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # LibCalError carries it directly; requests.HTTPError on its response
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def classify_failure(step: str, error: Optional[BaseException]) -> str:
+    """
+    Returns FATAL for failures a retry cannot fix, TRANSIENT otherwise.
+    Connection errors, timeouts and HTTP 5xx responses are always transient,
+    whatever their message says.
+    """
+    if step in UNRETRIABLE_STEPS or isinstance(error, FatalStepError):
+        return FATAL
+    if error is not None:
+        if isinstance(error, _transient_types()):
+            return TRANSIENT
+        status = _status_code(error)
+        if status is not None and status >= 500:
+            return TRANSIENT
+    message = str(error).lower() if error is not None else ""
+    if any(text in message for text in FATAL_MESSAGES):
+        return FATAL
+    return TRANSIENT
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = settings.MAX_RETRY_ATTEMPTS
+    base_delay: float = settings.RETRY_BASE_DELAY_SECONDS
+    max_delay: float = settings.RETRY_MAX_DELAY_SECONDS
+
+    def delay(self, retry: int) -> float:
+        """Exponential backoff with equal jitter: half the step is fixed, half random."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+@dataclass
+class StepCheckpoint:
+    """How far one booking attempt has got, and what retrying cost and saved."""
+    started: float = field(default_factory=time.monotonic)
+    completed: List[str] = field(default_factory=list)
+    retries: Dict[str, int] = field(default_factory=dict)
+    time_saved_seconds: float = 0.0
+    failed_step: Optional[str] = None
+    failure_kind: Optional[str] = None
+    last_error: Optional[str] = None
+
+    def as_details(self) -> dict:
+        return {
+            "checkpoint": self.completed[-1] if self.completed else None,
+            "retries": sum(self.retries.values()),
+            "retried_steps": dict(self.retries),
+            "time_saved_s": round(self.time_saved_seconds, 2),
+            "failed_step": self.failed_step,
+            "failure_kind": self.failure_kind,
+        }
+
+class StepRetrier:
+    """
+    Runs booking steps in order, recording each completed step. A transient
+    failure is retried on the same live session after a jittered backoff,
+    optionally running `recover` first (e.g. reload the page); a fatal one
+    stops at once. Each retry saves the time a cold rerun would need to get
+    back to the failed step.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None, sleep: Callable[[float], None] = time.sleep):
+        self.policy = policy or RetryPolicy()
+        self.sleep = sleep
+        self.checkpoint = StepCheckpoint()
+        self.last_exception: Optional[BaseException] = None
+
+    def add_details(self, results: list) -> list:
+        """Adds the checkpoint summary to each BookingResult's details."""
+        for result in results:
+            result.details = {**(result.details or {}), **self.checkpoint.as_details()}
+        return results
+
+    @property
+    def fatal(self) -> bool:
+        return self.checkpoint.failure_kind == FATAL
+
+    def run(self, step: str, action: Callable[[], bool], recover: Optional[Callable[[], None]] = None,
+            last_error: Optional[Callable[[], Optional[BaseException]]] = None) -> bool:
+        """
+        Runs `action` until it returns True, fails fatally or runs out of retries.
+        `last_error` supplies the cause when `action` reports failure by returning False.
+        """
+        checkpoint = self.checkpoint
+        retry = 0
+        while True:
+            step_started = time.monotonic()
+            error: Optional[BaseException] = None
+            try:
+                ok = action()
+            except Exception as e:
+                ok, error = False, e
+            if ok:
+                checkpoint.completed.append(step)
+                checkpoint.failed_step = checkpoint.failure_kind = None
+                return True
+            if error is None and last_error is not None:
+                error = last_error()
+            self.last_exception = error
+
+            kind = classify_failure(step, error)
+            checkpoint.failed_step, checkpoint.failure_kind = step, kind
+            checkpoint.last_error = str(error) if error is not None else None
+            if kind == FATAL or retry >= self.policy.max_retries:
+                logger.warning("Step failed.", extra=log_fields(step=step, kind=kind, retries=retry, error=str(error) if error else None))
+                return False
+
+            retry += 1
+            checkpoint.retries[step] = checkpoint.retries.get(step, 0) + 1
+            delay = self.policy.delay(retry)
+            logger.info("Retrying step.", extra=log_fields(step=step, retry=retry, max_retries=self.policy.max_retries,
+                                                         delay_s=round(delay, 2), error=str(error) if error else None))
+            self.sleep(delay)
+            if recover is not None:
+                try:
+                    recover()
+                except Exception as e:
+                    logger.warning("Could not recover before retrying.", extra=log_fields(step=step, error=str(e)))
+            # A cold rerun would repeat everything this attempt did before the failed step
+            checkpoint.time_saved_seconds += step_started - checkpoint.started
+
+    def call(self, step: str, func: Callable, *args, **kwargs):
+        """
+        run() for functions that return a value and raise on failure: returns
+        func's result, or re-raises its last exception once retrying stops.
+        """
+        result = []
+        if self.run(step, lambda: result.append(func(*args, **kwargs)) or True):
+            return result[0]
+        raise self.last_exception
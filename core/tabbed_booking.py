@@ -0,0 +1,237 @@
+# Interleaved booking across several tabs of one logged-in browser
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from selenium.webdriver.common.by import By
+
+from core.availability_index import parse_tile_label
+from core.page_waits import AdaptiveTimeouts, step_timeouts
+from core.web_driver import WebDriverService
+from models.booking_request import BookingRequest, Credentials
+from models.booking_result import BookingResult
+from utils.logger import log_fields, logger
+from utils.tracing import tracer
+from config import settings
+
+@dataclass
+class TabTask:
+    labels: List[str]
+    handle: Optional[str] = None
+    step: str = "grid"
+    step_started: float = 0.0
+    selected: List[str] = field(default_factory=list)
+    results: List[BookingResult] = field(default_factory=list)
+    fallback: List[str] = field(default_factory=list)
+    login_retried: bool = False
+    login_attempted: bool = False
+    final_submitted: bool = False
+    done: bool = False
+
+def group_slot_labels(slot_labels: List[str], grouping: str = settings.TAB_GROUPING) -> List[List[str]]:
+    """Splits labels into one group per tab: one per slot, or one per room."""
+    if grouping != "room":
+        return [[label] for label in slot_labels]
+    groups: Dict[str, List[str]] = {}
+    for label in slot_labels:
+        tile = parse_tile_label(label)
+        groups.setdefault(tile.room_name if tile else "", []).append(label)
+    return list(groups.values())
+
+class TabbedBookingRunner:
+    """
+    Drives one TabTask per tab through grid -> select -> submit times -> login ->
+    form -> final submit -> confirm. Every step is a non-blocking readiness check,
+    and the runner round-robins across tabs so page loads in one tab overlap with
+    actions in another. Only one tab logs in; the others wait for it and reuse the
+    session cookies, since all tabs share one browser profile.
+    """
+    STEPS = ["grid", "select", "submit_times", "login", "form", "final_submit", "confirm", "done"]
+
+    def __init__(self, driver_service: WebDriverService, request: BookingRequest,
+                 step_timeout: Optional[float] = None, poll_interval: float = settings.TAB_POLL_INTERVAL_SECONDS,
+                 results_from_confirmation: Optional[Callable[[str, List[str]], List[BookingResult]]] = None,
+                 login: Optional[Callable[[Credentials], bool]] = None,
+                 on_authenticated: Optional[Callable[[], None]] = None):
+        self.service = driver_service
+        self.driver = driver_service.driver
+        self.request = request
+        # A fixed step timeout, or None to use the timeouts learned from earlier runs
+        self.step_timeout = step_timeout
+        self.timeouts: AdaptiveTimeouts = step_timeouts
+        self.poll_interval = poll_interval
+        self.results_from_confirmation = results_from_confirmation or self._trust_confirmation
+        self.login = login or driver_service.perform_login
+        self.on_authenticated = on_authenticated
+        self.login_owner: Optional[TabTask] = None
+        self.logged_in = False
+
+    @staticmethod
+    def _trust_confirmation(confirmation_text: str, labels: List[str]) -> List[BookingResult]:
+        return [BookingResult(success=True, booking_id=f"CONFIRMED_VIA_UI_{label.replace(' ', '_')}", details={"slot": label}) for label in labels]
+
+    def _present(self, by: str, value: str) -> bool:
+        return bool(self.driver.find_elements(by, value))
+
+    def _open_tabs(self, tasks: List[TabTask]) -> None:
+        main_handle = self.driver.current_window_handle
+        tasks[0].handle = main_handle
+        for task in tasks[1:]:
+            before = set(self.driver.window_handles)
+            if self.service.lean:
+                # Network blocking is per tab, so it must be in place before the tab loads
+                self.driver.execute_script("window.open('about:blank', '_blank');")
+                task.handle = (set(self.driver.window_handles) - before).pop()
+                self.driver.switch_to.window(task.handle)
+                self.service.apply_network_blocking()
+                # Assigning location returns at once, so the new tabs still load in parallel
+                self.driver.execute_script("window.location.href = arguments[0];", self.request.grid_url)
+            else:
+                # window.open returns at once, so the new tabs load in parallel
+                self.driver.execute_script("window.open(arguments[0], '_blank');", self.request.grid_url)
+                task.handle = (set(self.driver.window_handles) - before).pop()
+        self.driver.switch_to.window(main_handle)
+        now = time.monotonic()
+        for task in tasks:
+            task.step_started = now
+        logger.info("Opened booking tabs.", extra=log_fields(tabs=len(tasks)))
+
+    def run(self, label_groups: List[List[str]]) -> List[TabTask]:
+        tasks = [TabTask(labels=labels) for labels in label_groups]
+        if not tasks:
+            return tasks
+
+        main_handle = self.driver.current_window_handle
+        try:
+            self._open_tabs(tasks)
+            while not all(task.done for task in tasks):
+                progressed = False
+                for task in tasks:
+                    if task.done:
+                        continue
+                    self.driver.switch_to.window(task.handle)
+                    progressed |= self._advance(task)
+                if not progressed:
+                    time.sleep(self.poll_interval)
+        finally:
+            self._close_tabs(tasks, main_handle)
+        return tasks
+
+    def _close_tabs(self, tasks: List[TabTask], main_handle: str) -> None:
+        for task in tasks:
+            if task.handle and task.handle != main_handle:
+                try:
+                    self.driver.switch_to.window(task.handle)
+                    self.driver.close()
+                except Exception as e:
+                    logger.debug("Could not close booking tab.", extra=log_fields(error=str(e)))
+        self.driver.switch_to.window(main_handle)
+
+    def _advance(self, task: TabTask) -> bool:
+        """Runs the task's current step once. Returns True if the step made progress."""
+        try:
+            outcome = getattr(self, f"_step_{task.step}")(task)
+        except Exception as e:
+            logger.error("Tab step failed.", extra=log_fields(step=task.step, slots=task.labels, error=str(e)))
+            outcome = False
+
+        if task.done:
+            return True
+        elapsed = time.monotonic() - task.step_started
+        if outcome is None:
+            timeout = self.step_timeout if self.step_timeout is not None else self.timeouts.timeout_for(f"tab_{task.step}")
+            if elapsed > timeout:
+                logger.error("Tab step timed out.", extra=log_fields(step=task.step, slots=task.labels, timeout_s=round(timeout, 2)))
+                tracer.record(f"tab_{task.step}", elapsed * 1000, status="error", slots=task.labels)
+                self._fail(task, f"Timed out at step '{task.step}'.")
+                return True
+            return False
+        if outcome is False:
+            tracer.record(f"tab_{task.step}", elapsed * 1000, status="failed", slots=task.labels)
+            self._fail(task, f"Failed at step '{task.step}'.")
+            return True
+
+        self.timeouts.record(f"tab_{task.step}", elapsed)
+        tracer.record(f"tab_{task.step}", elapsed * 1000, slots=task.labels)
+        task.step = self.STEPS[self.STEPS.index(task.step) + 1]
+        task.step_started = time.monotonic()
+        task.done = task.step == "done"
+        return True
+
+    def _fail(self, task: TabTask, reason: str) -> None:
+        if self.login_owner is task and not self.logged_in:
+            self.login_owner = None  # Let another tab try to log in
+        if task.final_submitted:
+            # The booking may have gone through; re-booking could double book
+            task.results.extend(
+                BookingResult(success=False, error_message=f"Booking submitted but confirmation not verified. {reason}", details={"slot": label, "tab": True})
+                for label in task.selected
+            )
+        else:
+            attempted = {r.details["slot"] for r in task.results}
+            task.fallback.extend(label for label in task.labels if label not in attempted)
+        task.done = True
+
+    # -- Steps: None = not ready yet, True = done, False = failed --
+
+    def _step_grid(self, task: TabTask) -> Optional[bool]:
+        return self._present(By.CSS_SELECTOR, "a.s-lc-eq-avail") or None
+
+    def _step_select(self, task: TabTask) -> Optional[bool]:
+        self.service.build_availability_index()  # The index belongs to this tab's page
+        for label in task.labels:
+            if self.service.select_time_slot(label):
+                task.selected.append(label)
+            else:
+                task.results.append(BookingResult(success=False, error_message=f"Failed to select time slot: {label}", details={"slot": label, "tab": True}))
+        if not task.selected:
+            task.done = True  # Nothing to book in this tab; not a failure to fall back on
+        return True
+
+    def _step_submit_times(self, task: TabTask) -> Optional[bool]:
+        buttons = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'Submit Times')]")
+        if not buttons or not buttons[0].is_enabled():
+            return None
+        buttons[0].click()
+        return True
+
+    def _step_login(self, task: TabTask) -> Optional[bool]:
+        if self._present(By.ID, "q16700"):
+            if self.login_owner is task:
+                self.logged_in = True
+                logger.info("Logged in once for all booking tabs.")
+                if self.on_authenticated:
+                    self.on_authenticated()
+            return True
+        if not self._present(By.ID, "username"):
+            return None
+        if self.logged_in and not task.login_retried:
+            # This tab asked for login before another tab finished logging in
+            task.login_retried = True
+            self.driver.refresh()
+            return None
+        if self.login_owner not in (None, task) and not self.logged_in:
+            return None  # Another tab is logging in for the whole session
+        self.login_owner = self.login_owner or task
+
+        username_value = self.driver.find_elements(By.ID, "username")[0].get_attribute("value")
+        if task.login_attempted:
+            # A filled form is still submitting; an emptied one means the login was rejected
+            return None if username_value else False
+        task.login_attempted = True
+        if not self.login(self.request.user_credentials):
+            return False
+        return None  # Advances once the booking form shows up
+
+    def _step_form(self, task: TabTask) -> Optional[bool]:
+        return self.service.fill_booking_form(self.request.party_size)
+
+    def _step_final_submit(self, task: TabTask) -> Optional[bool]:
+        task.final_submitted = True  # Before the click: if it lands and then raises, the booking may exist
+        return self.service.submit_final_booking()
+
+    def _step_confirm(self, task: TabTask) -> Optional[bool]:
+        if not self._present(By.XPATH, "//h1[contains(@class, 's-lc-eq-success-title')]"):
+            return None
+        task.results.extend(self.results_from_confirmation(self.service.get_confirmation_text(), task.selected))
+        return True
@@ -2,17 +2,62 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from selenium.webdriver.chrome.options import Options
-from typing import List
+from typing import List, Optional
+from urllib.parse import urlparse
+import json
+import os
+import time
 
-from utils.logger import logger
+from utils.logger import log_fields, logger
+from utils.tracing import traced, tracer
 from config import settings
 from models.booking_request import Credentials
+from core.availability_index import AvailabilityIndex
+from core.page_waits import PageErrorState, PageWaiter
+
+# Any rendered grid tile; a grid with nothing free still has booked/unavailable tiles
+GRID_TILES = (By.CSS_SELECTOR, "a.s-lc-eq-avail, a.s-lc-eq-checkout, a.fc-timeline-event")
+SUBMIT_TIMES_BUTTON = (By.XPATH, "//button[contains(text(), 'Submit Times')]")
+LOGIN_FORM = (By.ID, "username")
+BOOKING_FORM = (By.ID, "q16700")  # Number of people dropdown
+SUBMIT_BOOKING_BUTTON = (By.XPATH, "//button[contains(text(), 'Submit my Booking')]")
+CONFIRMATION_TITLE = (By.XPATH, "//h1[contains(@class, 's-lc-eq-success-title')]")
+
+# Reads every available tile's aria-label in one round trip
+_EXTRACT_TILES_JS = """
+return Array.from(document.querySelectorAll('a.s-lc-eq-avail'))
+    .map(function (el) { return el.getAttribute('aria-label') || ''; });
+"""
+
+# Finds a tile by exact aria-label without an XPath wait
+_FIND_TILE_JS = """
+var label = arguments[0];
+return Array.from(document.querySelectorAll('a.s-lc-eq-avail'))
+    .find(function (el) { return el.getAttribute('aria-label') === label; }) || null;
+"""
+
+# URL patterns for resource types the lean profile blocks. Chrome's URL blocklist
+# matches on URLs only, so types are approximated by file extension.
+_RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*"],
+    "stylesheet": ["*.css*"],
+}
+
+def lean_blocked_urls(resource_types: List[str] = settings.BLOCKED_RESOURCE_TYPES,
+                      url_patterns: List[str] = settings.BLOCKED_URL_PATTERNS) -> List[str]:
+    """Returns the URL patterns the lean profile blocks."""
+    blocked = list(url_patterns)
+    for resource_type in resource_types:
+        blocked.extend(_RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+    return blocked
 
 class WebDriverService:
-    def __init__(self, headless: bool = settings.HEADLESS_MODE):
+    def __init__(self, headless: bool = settings.HEADLESS_MODE, profile: str = settings.BROWSER_PROFILE):
+        self.lean = profile == "lean"
         chrome_options = Options()
         if headless:
             chrome_options.add_argument("--headless")
@@ -20,50 +65,214 @@ class WebDriverService:
             chrome_options.add_argument("--disable-gpu") # Also common for headless
             chrome_options.add_argument("--no-sandbox") # If running as root/in Docker
             chrome_options.add_argument("--disable-dev-shm-usage") # Overcome limited resource problems
+        else:
+            chrome_options.add_argument("--start-maximized") # Once, instead of after every navigation
+        if self.lean:
+            # Return from get() at DOMContentLoaded (or at once); callers wait for the elements they need
+            chrome_options.page_load_strategy = settings.LEAN_PAGE_LOAD_STRATEGY
+            if "image" in settings.BLOCKED_RESOURCE_TYPES:
+                # Catches images the URL patterns miss (no extension, data served by scripts)
+                chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+        if settings.DEVTOOLS_TRACE_DIR:
+            # Buffers DevTools Network/Page events for dump_devtools_trace()
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
 
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.implicitly_wait(settings.IMPLICIT_WAIT_SECONDS)
+        with tracer.span("driver_start"):
+            self.driver = webdriver.Chrome(options=chrome_options)
+        # No implicit wait: element lookups answer at once, and every wait goes through PageWaiter
         self.driver.set_page_load_timeout(settings.PAGE_LOAD_TIMEOUT_SECONDS)
+        self.waits = PageWaiter(self.driver)
+        if self.lean:
+            self.apply_network_blocking()
+        if settings.DEVTOOLS_TRACE_DIR:
+            self.driver.execute_cdp_cmd("Performance.enable", {})
+        # Last page loaded and when, so pooled drivers can skip a redundant reload
+        self.current_page_url: Optional[str] = None
+        self.page_loaded_at: Optional[float] = None
+        self.availability_index: Optional[AvailabilityIndex] = None
+        # Monotonic time of the first slot click, for release-time latency reporting
+        self.first_action_at: Optional[float] = None
+        # Session cache bookkeeping: whether cookies were restored, and whether login was skipped
+        self.session_restored = False
+        self.login_skipped = False
+        self._storage_script_id: Optional[str] = None
+        # Cause of the last failed step, so retries can tell transient failures from fatal ones
+        self.last_error: Optional[Exception] = None
         # WebDriver initialized
 
+    def apply_network_blocking(self) -> bool:
+        """
+        Blocks the lean profile's URL patterns in the current tab through DevTools.
+        New tabs need their own call.
+        """
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": lean_blocked_urls()})
+            return True
+        except Exception as e:
+            logger.warning("Could not enable network blocking.", extra=log_fields(step="driver_start", error=str(e)))
+            return False
+
+    def wait_until_interactive(self) -> None:
+        """Waits for the DOM to be parsed; get() no longer does with the 'none' page load strategy."""
+        WebDriverWait(self.driver, settings.PAGE_LOAD_TIMEOUT_SECONDS).until(
+            lambda d: d.execute_script("return document.readyState;") != "loading"
+        )
+
+    @traced("navigate")
     def navigate_to_page(self, url: str) -> None:
         # Navigate to booking page
         self.driver.get(url)
-        self.driver.maximize_window() # Maximize after navigation
+        if self.lean and settings.LEAN_PAGE_LOAD_STRATEGY == "none":
+            self.wait_until_interactive()
+        self.current_page_url = url
+        self.page_loaded_at = time.monotonic()
+        self.availability_index = None  # Grid must be re-read for the new page
 
-    def select_time_slot(self, slot_label: str) -> bool:
-        # Select time slot
+    def reload_page(self) -> None:
+        """Loads the current URL again (a GET, so a posted form is not resubmitted)."""
+        self.navigate_to_page(self.driver.current_url)
+
+    def is_alive(self) -> bool:
+        """Returns True if the browser still responds to WebDriver commands."""
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def get_js_heap_mb(self) -> Optional[float]:
+        """Returns the page's used JS heap in MB, or None if Chrome does not report it."""
         try:
-            slot_element = WebDriverWait(self.driver, settings.TIMEOUT_SECONDS).until(
-                EC.element_to_be_clickable((By.XPATH, f"//a[@aria-label='{slot_label}']"))
+            used_bytes = self.driver.execute_script(
+                "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null;"
             )
+            return used_bytes / (1024 * 1024) if used_bytes else None
+        except Exception:
+            return None
+
+    def reset_session(self) -> bool:
+        """Clears cookies and web storage so the browser can be reused for another booking."""
+        try:
+            if self._storage_script_id:
+                # Otherwise a restored session's storage would be injected for the next user
+                self.driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": self._storage_script_id})
+                self._storage_script_id = None
+            self.driver.delete_all_cookies()
+            self.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            self.current_page_url = None
+            self.page_loaded_at = None
+            self.first_action_at = None
+            self.session_restored = False
+            self.login_skipped = False
+            return True
+        except Exception as e:
+            logger.warning("Failed to reset browser session.", extra=log_fields(step="reset", error=str(e)))
+            return False
+
+    def export_session(self) -> dict:
+        """Captures cookies and local storage of the current (authenticated) page."""
+        parsed = urlparse(self.driver.current_url)
+        return {
+            "cookies": self.driver.get_cookies(),
+            "local_storage": self.driver.execute_script("return Object.assign({}, window.localStorage);") or {},
+            "origin": f"{parsed.scheme}://{parsed.netloc}",
+        }
+
+    def import_session(self, state: dict) -> bool:
+        """
+        Restores exported session state through DevTools, so it applies to the
+        next navigation without loading the site first.
+        """
+        try:
+            for cookie in state.get("cookies", []):
+                params = {k: cookie[k] for k in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite") if k in cookie}
+                if "expiry" in cookie:
+                    params["expires"] = cookie["expiry"]
+                self.driver.execute_cdp_cmd("Network.setCookie", params)
+            if state.get("local_storage"):
+                source = (
+                    f"if (location.origin === {json.dumps(state.get('origin'))}) {{"
+                    f" var items = {json.dumps(state['local_storage'])};"
+                    " for (var k in items) { window.localStorage.setItem(k, items[k]); } }"
+                )
+                result = self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+                self._storage_script_id = result.get("identifier")
+            self.session_restored = True
+            logger.info("Restored cached LibCal session.")
+            return True
+        except Exception as e:
+            logger.warning("Could not restore cached session.", extra=log_fields(step="navigate", error=str(e)))
+            return False
+
+    @traced("grid")
+    def wait_for_grid(self) -> None:
+        """Waits until the availability grid has rendered. Raises TimeoutException or PageErrorState."""
+        self.waits.wait_for("grid", GRID_TILES)
+
+    def build_availability_index(self) -> AvailabilityIndex:
+        """Reads the whole availability grid in one script call and indexes it."""
+        labels = self.driver.execute_script(_EXTRACT_TILES_JS) or []
+        self.availability_index = AvailabilityIndex.from_labels(labels)
+        logger.info("Indexed available time tiles.", extra=log_fields(tiles=len(self.availability_index), step="grid"))
+        return self.availability_index
+
+    @traced("select", lambda self, slot_label: {"slot": slot_label})
+    def select_time_slot(self, slot_label: str) -> bool:
+        # Select time slot; unavailable slots fail at once from the index instead of waiting
+        index = self.availability_index or self.build_availability_index()
+        tile = index.get_by_label(slot_label)
+        if tile is None or not tile.available:
+            logger.warning("Slot NOT found/clickable. Possibly unavailable.", extra=log_fields(slot=slot_label, step="select"))
+            self.last_error = LookupError(f"Slot not available: {slot_label}")
+            return False
+        try:
+            slot_element = self.driver.execute_script(_FIND_TILE_JS, slot_label)
+            if slot_element is None:
+                logger.warning("Slot disappeared from grid. Possibly just taken.", extra=log_fields(slot=slot_label, step="select"))
+                self.last_error = LookupError(f"Slot no longer available: {slot_label}")
+                return False
             slot_element.click()
+            if self.first_action_at is None:
+                self.first_action_at = time.monotonic()
             # Time slot selected successfully
             return True
-        except (NoSuchElementException, TimeoutException):
-            logger.warning(f"Slot NOT found/clickable: {slot_label}. Possibly unavailable.")
+        except Exception as e:
+            logger.warning("Slot NOT clickable.", extra=log_fields(slot=slot_label, step="select", error=str(e)))
+            self.last_error = e
             return False
 
+    @traced("submit_times")
     def submit_times(self) -> bool:
         try:
-            submit_times_btn = WebDriverWait(self.driver, settings.TIMEOUT_SECONDS).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Submit Times')]"))
-            )
+            submit_times_btn = self.waits.wait_for("submit_times", SUBMIT_TIMES_BUTTON, clickable=True)
             submit_times_btn.click()
             logger.info("Submit Times button clicked.")
             return True
-        except TimeoutException:
-            logger.error("Submit Times button not found or clickable.")
+        except TimeoutException as e:
+            logger.error("Submit Times button not found or clickable.", extra=log_fields(step="submit_times"))
+            self.last_error = e
+            return False
+        except PageErrorState as e:
+            logger.error("Page showed an error.", extra=log_fields(step="submit_times", error=str(e)))
+            self.last_error = e
             return False
         except Exception as e:
-            logger.error(f"Unexpected error clicking Submit Times button: {e}")
+            logger.error("Unexpected error clicking Submit Times button.", extra=log_fields(step="submit_times", error=str(e)))
+            self.last_error = e
             return False
 
+    @traced("login")
     def perform_login(self, credentials: Credentials) -> bool:
         try:
-            WebDriverWait(self.driver, settings.TIMEOUT_SECONDS).until(
-                EC.presence_of_element_located((By.ID, "username"))
-            )
+            # An already authenticated session goes straight to the booking form
+            form_field = self.waits.wait_for("login_form", [LOGIN_FORM, BOOKING_FORM])
+            if form_field.get_attribute("id") != "username":
+                logger.info("Already authenticated; skipping login.")
+                self.login_skipped = True
+                return True
+            self.login_skipped = False
             logger.info("Login form loaded.")
 
             cardnum_field = self.driver.find_element(By.ID, "username")
@@ -78,21 +287,40 @@ class WebDriverService:
             login_btn.click()
             logger.info("Login submitted.")
             return True
-        except (NoSuchElementException, TimeoutException) as e:
-            logger.error(f"Error during login: {e}")
+        except (NoSuchElementException, TimeoutException, PageErrorState) as e:
+            logger.error("Error during login.", extra=log_fields(step="login", error=str(e)))
+            self.last_error = e
             return False
         except Exception as e:
-            logger.error(f"Unexpected error during login: {e}")
+            logger.error("Unexpected error during login.", extra=log_fields(step="login", error=str(e)))
+            self.last_error = e
+            return False
+
+    def pre_authenticate(self, login_url: str, credentials: Credentials) -> bool:
+        """Signs in ahead of time so the booking flow can skip the login round trip."""
+        self.driver.get(login_url)
+        if self.lean and settings.LEAN_PAGE_LOAD_STRATEGY == "none":
+            self.wait_until_interactive()
+        if not self.perform_login(credentials):
+            return False
+        try:
+            self.waits.wait_for_absence("pre_authenticate", LOGIN_FORM)
+        except TimeoutException:
+            logger.error("Login form still shown after pre-authentication.")
             return False
+        except PageErrorState as e:
+            logger.error("Pre-authentication rejected.", extra=log_fields(step="pre_authenticate", error=str(e)))
+            return False
+        logger.info("Pre-authenticated with LibCal.")
+        return True
 
+    @traced("form_fill")
     def fill_booking_form(self, party_size: int) -> bool:
         try:
-            WebDriverWait(self.driver, settings.TIMEOUT_SECONDS).until(
-                EC.presence_of_element_located((By.ID, "q16700")) # Number of people dropdown
-            )
+            # A rejected login shows an error banner instead, which ends the wait at once
+            people_select_el = self.waits.wait_for("booking_form", BOOKING_FORM)
             logger.info("Booking form details page loaded.")
 
-            people_select_el = self.driver.find_element(By.ID, "q16700")
             select_people = Select(people_select_el)
             select_people.select_by_visible_text(str(party_size))
             # Party size selected
@@ -104,41 +332,74 @@ class WebDriverService:
                 agree_checkbox.click()
             logger.info("Checked 'I agree' box.")
             return True
-        except (NoSuchElementException, TimeoutException) as e:
-            logger.error(f"Error filling booking form: {e}")
+        except (NoSuchElementException, TimeoutException, PageErrorState) as e:
+            logger.error("Error filling booking form.", extra=log_fields(step="form_fill", error=str(e)))
+            self.last_error = e
             return False
         except Exception as e:
-            logger.error(f"Unexpected error filling booking form: {e}")
+            logger.error("Unexpected error filling booking form.", extra=log_fields(step="form_fill", error=str(e)))
+            self.last_error = e
             return False
 
+    @traced("final_submit")
     def submit_final_booking(self) -> bool:
         try:
-            submit_booking_btn = self.driver.find_element(
-                By.XPATH, "//button[contains(text(), 'Submit my Booking')]"
-            )
+            submit_booking_btn = self.waits.wait_for("final_submit", SUBMIT_BOOKING_BUTTON, clickable=True)
             submit_booking_btn.click()
             logger.info("Final booking form submitted.")
             return True
-        except NoSuchElementException:
-            logger.error("Submit My Booking button not found.")
+        except TimeoutException as e:
+            logger.error("Submit My Booking button not found.", extra=log_fields(step="final_submit"))
+            self.last_error = e
+            return False
+        except PageErrorState as e:
+            logger.error("Page showed an error.", extra=log_fields(step="final_submit", error=str(e)))
+            self.last_error = e
             return False
         except Exception as e:
-            logger.error(f"Unexpected error submitting final booking: {e}")
+            logger.error("Unexpected error submitting final booking.", extra=log_fields(step="final_submit", error=str(e)))
+            self.last_error = e
             return False
 
+    @traced("confirmation")
     def check_booking_confirmation(self) -> bool:
         try:
-            success_h1 = WebDriverWait(self.driver, settings.TIMEOUT_SECONDS).until(
-                EC.presence_of_element_located((
-                    By.XPATH,
-                    "//h1[contains(@class, 's-lc-eq-success-title')]"
-                ))
-            )
-            actual_text = success_h1.text.strip()
+            self.waits.wait_for("confirmation", CONFIRMATION_TITLE)
             # Booking confirmation detected
             return True
-        except TimeoutException:
-            logger.warning("No booking confirmation found. Booking might have failed or UI changed.")
+        except TimeoutException as e:
+            logger.warning("No booking confirmation found. Booking might have failed or UI changed.", extra=log_fields(step="confirmation"))
+            self.last_error = e
+            return False
+        except PageErrorState as e:
+            logger.warning("Booking was not confirmed.", extra=log_fields(step="confirmation", error=str(e)))
+            self.last_error = e
+            return False
+
+    def get_confirmation_text(self) -> str:
+        """Returns the visible text of the booking confirmation page, or '' if unavailable."""
+        try:
+            return self.driver.find_element(By.TAG_NAME, "body").text
+        except Exception as e:
+            logger.warning("Could not read booking confirmation text.", extra=log_fields(step="confirmation", error=str(e)))
+            return ""
+
+    def dump_devtools_trace(self, path: str) -> bool:
+        """
+        Writes the DevTools Network/Page events buffered since the last dump, plus
+        Chrome's performance metrics, to `path` as JSON. Needs DEVTOOLS_TRACE_DIR set
+        when the driver was started.
+        """
+        try:
+            events = [json.loads(entry["message"])["message"] for entry in self.driver.get_log("performance")]
+            metrics = self.driver.execute_cdp_cmd("Performance.getMetrics", {}).get("metrics", [])
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"metrics": metrics, "events": events}, f)
+            logger.info("DevTools trace written.", extra=log_fields(path=path, events=len(events)))
+            return True
+        except Exception as e:
+            logger.warning("Could not write DevTools trace.", extra=log_fields(path=path, error=str(e)))
             return False
 
     def close_driver(self):
@@ -0,0 +1,244 @@
+# Pool of pre-warmed WebDriver instances shared across booking requests
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from core.web_driver import WebDriverService
+from utils.logger import log_fields, logger
+from config import settings
+
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    hits: int = 0           # Served by an already running browser
+    misses: int = 0         # Had to launch a new browser
+    recycled: int = 0       # Browsers quit because they crashed, leaked or hit max uses
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.checkouts if self.checkouts else 0.0
+
+    @property
+    def avg_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.checkouts if self.checkouts else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "recycled": self.recycled,
+            "hit_rate": round(self.hit_rate, 3),
+            "avg_wait_ms": round(self.avg_wait_seconds * 1000, 1),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+        }
+
+
+class WebDriverPool:
+    """
+    Keeps up to `size` headless Chrome instances running and parked on `warm_url`.
+    Drivers are handed out with checkout() and must be returned with checkin(),
+    which resets cookies/storage and recycles unhealthy or worn-out browsers.
+    """
+
+    def __init__(
+        self,
+        warm_url: str,
+        size: int = settings.DRIVER_POOL_SIZE,
+        max_uses: int = settings.DRIVER_POOL_MAX_USES,
+        warmup: bool = settings.DRIVER_POOL_WARMUP,
+        headless: bool = settings.HEADLESS_MODE,
+        driver_factory: Optional[Callable[[], WebDriverService]] = None,
+    ):
+        if size < 1:
+            raise ValueError(f"Pool size must be at least 1, got {size}")
+        self.warm_url = warm_url
+        self.size = size
+        self.max_uses = max_uses
+        self.warmup = warmup
+        self.metrics = PoolMetrics()
+        self._driver_factory = driver_factory or (lambda: WebDriverService(headless=headless))
+        self._idle: Deque[WebDriverService] = deque()
+        self._uses: Dict[int, int] = {}
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        if warmup:
+            self._warm_up()
+
+    def _warm_up(self) -> None:
+        """Starts every browser in parallel and parks it on the warm URL."""
+        with self._cond:
+            to_start = self.size - self._created
+            self._created += to_start
+        threads = [threading.Thread(target=self._start_idle_driver, daemon=True) for _ in range(to_start)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logger.info("WebDriver pool warmed.", extra=log_fields(browsers=len(self._idle)))
+
+    def _start_idle_driver(self) -> None:
+        try:
+            service = self._launch()
+            service.navigate_to_page(self.warm_url)
+        except Exception as e:
+            logger.error("Failed to start pooled WebDriver.", extra=log_fields(step="driver_start", error=str(e)))
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            if self._closed:
+                service.close_driver()
+                return
+            self._idle.append(service)
+            self._cond.notify()
+
+    def _launch(self) -> WebDriverService:
+        service = self._driver_factory()
+        self._uses[id(service)] = 0
+        return service
+
+    def checkout(self, url: Optional[str] = None, timeout: float = settings.DRIVER_POOL_CHECKOUT_TIMEOUT_SECONDS,
+                 before_navigate: Optional[Callable[[WebDriverService], object]] = None) -> WebDriverService:
+        """
+        Returns a driver loaded on `url` (defaults to the warm URL).
+        Blocks up to `timeout` seconds when every browser is in use.
+        `before_navigate` runs on the driver ahead of its page load (e.g. to
+        restore a cached session), and the page is then loaded even if fresh.
+        A parked browser that crashed or fails to load the page is recycled
+        and another one tried, so a dead browser never costs the pool a slot.
+        """
+        url = url or self.warm_url
+        started = time.monotonic()
+        while True:
+            service, launch_new = self._take(started, timeout)
+            if not launch_new and not service.is_alive():
+                self._recycle(service, "browser not responding")
+                continue
+            try:
+                if before_navigate is not None:
+                    before_navigate(service)
+                    service.navigate_to_page(url)
+                elif not self._is_page_fresh(service, url):
+                    service.navigate_to_page(url)
+            except Exception as e:
+                self._recycle(service, f"page load failed: {e}")
+                if launch_new:
+                    raise  # A brand-new browser failing too is not something another try will fix
+                continue
+            break
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self.metrics.checkouts += 1
+            if launch_new:
+                self.metrics.misses += 1
+            else:
+                self.metrics.hits += 1
+            self.metrics.total_wait_seconds += waited
+            self.metrics.max_wait_seconds = max(self.metrics.max_wait_seconds, waited)
+        logger.debug("WebDriver checked out.", extra=log_fields(hit=not launch_new, wait_ms=round(waited * 1000, 1)))
+        return service
+
+    def _take(self, started: float, timeout: float) -> Tuple[WebDriverService, bool]:
+        """An idle driver, or a newly launched one while under `size`; True when launched."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WebDriver pool is shut down.")
+            while not self._idle and self._created >= self.size:
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise TimeoutError(f"No pooled WebDriver available within {timeout}s.")
+                if self._closed:
+                    raise RuntimeError("WebDriver pool is shut down.")
+            if self._idle:
+                return self._idle.popleft(), False
+            self._created += 1
+
+        try:
+            return self._launch(), True
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _is_page_fresh(self, service: WebDriverService, url: str) -> bool:
+        if service.current_page_url != url or service.page_loaded_at is None:
+            return False
+        return time.monotonic() - service.page_loaded_at <= settings.DRIVER_POOL_PAGE_MAX_AGE_SECONDS
+
+    def checkin(self, service: WebDriverService) -> None:
+        """Returns a driver to the pool, recycling it if it is no longer healthy."""
+        uses = self._uses.get(id(service), 0) + 1
+        self._uses[id(service)] = uses
+
+        reason = None
+        if self._closed:
+            reason = "pool shut down"
+        elif uses >= self.max_uses:
+            reason = f"reached {uses} uses"
+        elif not service.is_alive():
+            reason = "browser not responding"
+        else:
+            heap_mb = service.get_js_heap_mb()
+            if heap_mb is not None and heap_mb > settings.DRIVER_POOL_MAX_HEAP_MB:
+                reason = f"JS heap at {heap_mb:.0f} MB"
+            elif not service.reset_session():
+                reason = "session reset failed"
+
+        if reason:
+            self._recycle(service, reason)
+            return
+
+        if self.warmup:
+            try:
+                service.navigate_to_page(self.warm_url)
+            except Exception as e:
+                self._recycle(service, f"re-warm failed: {e}")
+                return
+
+        with self._cond:
+            self._idle.append(service)
+            self._cond.notify()
+
+    def _recycle(self, service: WebDriverService, reason: str) -> None:
+        logger.info("Recycling pooled WebDriver.", extra=log_fields(reason=reason))
+        self._uses.pop(id(service), None)
+        try:
+            service.close_driver()
+        except Exception as e:
+            logger.debug("Error closing recycled WebDriver.", extra=log_fields(error=str(e)))
+        with self._cond:
+            self._created -= 1
+            self.metrics.recycled += 1
+            replace = self.warmup and not self._closed
+            if replace:
+                self._created += 1
+            self._cond.notify()
+        if replace:
+            # Replace in the background so the returning booking is not held up
+            threading.Thread(target=self._start_idle_driver, daemon=True).start()
+
+    def shutdown(self) -> None:
+        """Quits all idle browsers; drivers still checked out are quit on checkin."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+            self._cond.notify_all()
+        for service in idle:
+            try:
+                service.close_driver()
+            except Exception as e:
+                logger.debug("Error closing pooled WebDriver.", extra=log_fields(error=str(e)))
+        logger.info("WebDriver pool shut down.", extra=log_fields(**self.metrics.as_dict()))
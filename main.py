@@ -1,51 +1,543 @@
-from core.booking_engine import BookingEngine
-from core.date_utils import get_next_day_of_week
-from models.booking_request import BookingRequest
-from services.authentication_service import AuthenticationService
-from utils.logger import logger
-from config import settings
+# Only the standard library is imported up front, so --help, argument errors and
+# --dry-run start fast; settings, the logger and the engines load when a command needs them
 import argparse
+import datetime
+import sys
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from models.booking_request import BookingPreferences, BookingRequest
+
+def build_engine(engine_name: str, batch_mode: bool, booking_url: str, tab_mode: bool = False,
+                 pool_size: Optional[int] = None):
+    """
+    Creates the requested booking engine. Selenium is only imported for the
+    browser engine so the HTTP engine runs without it installed.
+    Returns the engine and the WebDriver pool to shut down (if any).
+    """
+    from config import settings
+
+    pool_size = settings.DRIVER_POOL_SIZE if pool_size is None else pool_size
+    session_cache = None
+    if settings.SESSION_CACHE_ENABLED:
+        from services.session_cache import SessionCache
+        session_cache = SessionCache()
+
+    if engine_name == "http":
+        from core.http_booking_engine import HttpBookingEngine
+        return HttpBookingEngine(session_cache=session_cache), None
+
+    from core.booking_engine import BookingEngine
+    from core.web_driver_pool import WebDriverPool
+    driver_pool = None
+    if pool_size > 0:
+        driver_pool = WebDriverPool(warm_url=booking_url, size=pool_size)
+    engine = BookingEngine(batch_mode=batch_mode, driver_pool=driver_pool, tab_mode=tab_mode, session_cache=session_cache)
+    return engine, driver_pool
+
+def shutdown_engine(engine, driver_pool) -> None:
+    """Releases pooled browsers and reports session cache usage."""
+    from utils.logger import logger
+
+    if driver_pool:
+        driver_pool.shutdown()
+    session_cache = getattr(engine, "session_cache", None)
+    if session_cache:
+        logger.info(f"Session cache: {session_cache.stats()}")
+
+def target_dates(args) -> list:
+    """The dates to book: every date of --dates, else the upcoming --day."""
+    from core.date_utils import expand_dates, get_next_day_of_week
+    from config import settings
+
+    if args.dates:
+        return expand_dates(args.dates, horizon_days=settings.BOOKING_HORIZON_DAYS)
+    return [get_next_day_of_week(args.day)]
+
+def build_preferences(args) -> "BookingPreferences":
+    """
+    Ranked alternatives from --room and --day (comma-separated, best first),
+    --window and --duration. With --dates, its dates are ranked earliest first.
+    """
+    from core.date_utils import expand_dates, get_next_day_of_week, time_label_minutes
+    from models.booking_request import BookingPreferences
+    from config import settings
+
+    start, separator, end = args.window.partition("-")
+    if not separator:
+        raise ValueError('--window must look like "10:00am-4:00pm"')
+    for label in (start, end):
+        time_label_minutes(label)  # Raises ValueError for a malformed time
+    return BookingPreferences(
+        rooms=[room.strip() for room in args.room.split(",") if room.strip()],
+        dates=expand_dates(args.dates, horizon_days=settings.BOOKING_HORIZON_DAYS) if args.dates
+        else [get_next_day_of_week(day) for day in args.day.split(",") if day.strip()],
+        window_start=start.strip().lower(),
+        window_end=end.strip().lower(),
+        min_slots=args.duration,
+        max_slots=args.max_duration,
+    )
+
+def open_availability_store():
+    """Returns the local availability store, or None when it is disabled or cannot be opened."""
+    from utils.logger import logger
+    from config import settings
+
+    if not settings.AVAILABILITY_STORE_ENABLED:
+        return None
+    from services.availability_store import AvailabilityStore
+    try:
+        return AvailabilityStore()
+    except Exception as e:
+        logger.warning(f"Availability store unavailable: {e}")
+        return None
+
+def list_availability(args) -> None:
+    """Prints the availability grid for the requested day, one line per room."""
+    from core.date_utils import get_next_day_of_week
+    from models.booking_request import BookingRequest
+    from utils.logger import logger
+
+    try:
+        target_date = get_next_day_of_week(args.day)
+    except ValueError as e:
+        logger.error(f"Invalid input: {e}")
+        return
+
+    # Credentials are not needed to read the grid; the engine only uses the URL
+    booking_url = BookingRequest.booking_url
+    engine, driver_pool = build_engine(args.engine, batch_mode=False, booking_url=booking_url)
+    try:
+        index = engine.list_availability(booking_url, target_date)
+    except Exception as e:
+        logger.error(f"Could not load availability: {e}")
+        return
+    finally:
+        shutdown_engine(engine, driver_pool)
+
+    store = open_availability_store()
+    if store:
+        store.record([target_date], index.available_tiles())
+        store.close()
+
+    lines = index.format_summary(args.room)
+    if not lines:
+        logger.info(f"No available time slots found for {target_date}.")
+    for line in lines:
+        logger.info(line)
+
+def run_query(args, parser) -> None:
+    """
+    Answers availability questions from the local store without a browser:
+    what is free on --day (refreshed over HTTP when older than the TTL), or
+    with --history, when slots usually free up.
+    """
+    from core.date_utils import get_next_day_of_week
+    from models.booking_request import BookingRequest
+    from utils.logger import logger
+    from services.availability_store import AvailabilityStore
+
+    try:
+        store = AvailabilityStore()
+    except Exception as e:
+        logger.error(f"Could not open availability store: {e}")
+        return
+    try:
+        if args.compact:
+            dropped = store.compact()
+            logger.info(f"Compacted availability store: {dropped['tiles']} tile(s), {dropped['states']} state(s) dropped.")
+            if not args.day and not args.history:
+                return
+        if args.history:
+            patterns = store.release_patterns(args.room)
+            if not patterns["events"]:
+                logger.info("No slot has been seen freeing up yet; run --watch to collect history.")
+                return
+            logger.info(f"{patterns['events']} slot(s) seen freeing up{' in ' + args.room if args.room else ''}; "
+                        f"median {patterns['median_lead_hours']} h before the slot.")
+            for row in patterns["busiest"]:
+                logger.info(f"  {row['weekday']} {row['hour']:02d}:00-{row['hour']:02d}:59: {row['count']} time(s)")
+            return
+        if not args.day:
+            parser.error("query needs --day (or --history)")
+
+        try:
+            target_date = get_next_day_of_week(args.day)
+        except ValueError as e:
+            logger.error(f"Invalid input: {e}")
+            return
+
+        if args.refresh or not store.is_fresh(target_date, args.max_age):
+            from core.http_booking_engine import HttpBookingEngine
+            try:
+                index = HttpBookingEngine(browser_fallback=False).list_availability(BookingRequest.booking_url, target_date)
+                store.record([target_date], index.available_tiles())
+            except Exception as e:
+                if store.age_seconds(target_date) is None:
+                    logger.error(f"Could not load availability: {e}")
+                    return
+                logger.warning(f"Live refresh failed ({e}); showing cached availability.")
+        else:
+            logger.info(f"Using availability captured {store.age_seconds(target_date):.0f}s ago.")
+
+        lines = store.available(target_date, args.room).format_summary()
+        if not lines:
+            logger.info(f"No available time slots found for {target_date}.")
+        for line in lines:
+            logger.info(line)
+    finally:
+        store.close()
+
+def run_jobs(args) -> None:
+    """Runs every job in the --jobs file and streams results as JSON lines."""
+    from models.booking_request import BookingRequest
+    from utils.logger import logger
+    from config import settings
+    from core.job_runner import JobRunner, load_jobs
+
+    try:
+        jobs = load_jobs(args.jobs)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load jobs: {e}")
+        return
+
+    engine, driver_pool = build_engine(
+        args.engine,
+        batch_mode=settings.BATCH_BOOKING and not args.no_batch,
+        booking_url=BookingRequest.booking_url,
+        tab_mode=settings.TAB_MODE or args.tabs,
+    )
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        outcomes = JobRunner(engine, max_workers=args.workers, output=output).run(jobs)
+    finally:
+        if args.output:
+            output.close()
+        shutdown_engine(engine, driver_pool)
+
+    booked = sum(1 for o in outcomes if o.status == "booked")
+    logger.info(f"✅ {booked} of {len(outcomes)} job(s) fully booked")
+
+def watch_availability(engine, booking_request: "BookingRequest", rooms: str, dates: list) -> list:
+    """Runs the --watch loop for every comma-separated room and date until all slots are booked or Ctrl-C."""
+    from utils.logger import logger
+    from core.availability_watcher import AvailabilityWatcher
+
+    store = open_availability_store()
+    watcher = AvailabilityWatcher(
+        engine, booking_request,
+        rooms=[room.strip() for room in rooms.split(",") if room.strip()],
+        dates=dates,
+        store=store,
+    )
+    try:
+        return watcher.run()
+    except KeyboardInterrupt:
+        logger.info("Watch stopped.")
+        return []
+    finally:
+        if store:
+            store.close()
+
+def run_daemon(args) -> None:
+    """Runs the booking daemon in the foreground until Ctrl-C or `daemon --stop`."""
+    from models.booking_request import BookingRequest
+    from utils.logger import logger
+    from config import settings
+    from services.daemon_client import DaemonClient
+
+    client = DaemonClient()
+    if args.stop:
+        logger.info("Booking daemon stopping." if client.shutdown() else "No booking daemon is running.")
+        return
+    if client.is_running():
+        logger.error(f"A booking daemon is already running on {settings.DAEMON_HOST}:{settings.DAEMON_PORT}.")
+        return
+
+    from core.booking_daemon import BookingDaemon
+
+    # Keep a warm browser per worker even when DRIVER_POOL_SIZE leaves the pool off
+    engine, driver_pool = build_engine(
+        args.engine,
+        batch_mode=settings.BATCH_BOOKING and not args.no_batch,
+        booking_url=BookingRequest.booking_url,
+        tab_mode=settings.TAB_MODE or args.tabs,
+        pool_size=max(settings.DRIVER_POOL_SIZE, settings.DAEMON_MAX_WORKERS),
+    )
+    store = open_availability_store()
+    daemon = BookingDaemon(engine, store=store).start()
+    try:
+        daemon.wait()
+    except KeyboardInterrupt:
+        logger.info("Booking daemon interrupted.")
+    finally:
+        daemon.stop()
+        shutdown_engine(engine, driver_pool)
+        if store:
+            store.close()
+
+def forward_to_daemon(client, args, dates: list) -> list:
+    """Sends one job per date to the running daemon and collects the streamed results."""
+    from models.booking_result import BookingResult
+    from utils.logger import logger
+
+    logger.info(f"Forwarding to the booking daemon on {client.host}:{client.port}; it uses its own engine and settings.")
+    results = []
+    for date in dates:
+        job = {"date": date.isoformat(), "times": args.times, "room": args.room, "party_size": args.party_size}
+        try:
+            for event in client.book(job):
+                if event["event"] == "queued" and event["position"] > 1:
+                    logger.info(f"Queued behind {event['position'] - 1} other booking(s).")
+                elif event["event"] == "result":
+                    results.append(BookingResult(
+                        success=event["success"], booking_id=event["booking_id"], error_message=event["error_message"],
+                        timestamp=datetime.datetime.fromisoformat(event["timestamp"]), details=event["details"],
+                    ))
+        except (RuntimeError, OSError, ValueError) as e:
+            logger.error(f"Booking daemon did not book {date}: {e}")
+    return results
+
+def log_profile() -> None:
+    """
+    Logs per-stage timings (total and percentiles across attempts) for this
+    run together with the earlier runs whose spans are in the JSON log file.
+    """
+    from config import settings
+    from utils.logger import logger
+    from utils.tracing import read_logged_spans, tracer
+
+    spans = read_logged_spans(settings.LOG_FILE_PATH, exclude_run=tracer.run_id) + tracer.spans()
+    rows = tracer.summary(spans)
+    if not rows:
+        logger.info("Profile: no stages were timed.")
+        return
+    runs = len({span.run_id for span in spans})
+    logger.info(f"Profile across {runs} run(s) ({len(spans)} span(s), this run and {settings.LOG_FILE_PATH}):")
+    logger.info(f"{'Stage':<20}{'Attempts':>9}{'Total ms':>11}{'p50 ms':>10}{'p95 ms':>10}{'Max ms':>10}")
+    for row in rows:
+        logger.info(
+            f"{row['stage']:<20}{row['attempts']:>9}{row['total_ms']:>11.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['max_ms']:>10.1f}"
+        )
+
+def apply_setting_defaults(args) -> None:
+    """Fills in the options whose defaults come from settings, once a command needs them."""
+    from config import settings
+
+    if args.party_size is None:
+        args.party_size = settings.DEFAULT_PARTY_SIZE
+    if args.engine is None:
+        args.engine = settings.BOOKING_ENGINE
+    if args.workers is None:
+        args.workers = settings.JOB_MAX_WORKERS
 
 def main():
     parser = argparse.ArgumentParser(description="Yorba Linda Library Study Room Booking Bot")
-    parser.add_argument("--day", type=str, required=True, help="Day of the week to book (e.g., Saturday, Monday)")
-    parser.add_argument("--times", type=str, required=True, help='Comma-separated list of times (e.g., "10:00am,11:00am")')
-    parser.add_argument("--room", type=str, required=True, help='Room name (e.g., "Adult Rm. 1")')
-    parser.add_argument("--party-size", type=int, default=settings.DEFAULT_PARTY_SIZE, help="Number of people for the booking")
-    
+    parser.add_argument("--day", type=str, help="Day of the week to book (e.g., Saturday, Monday)")
+    parser.add_argument("--dates", type=str, help='Dates to book instead of --day: "2025-01-11", "2025-01-11..2025-01-18", "every Saturday" or "every Saturday for 3 weeks", comma-separated; up to BOOKING_HORIZON_DAYS ahead')
+    parser.add_argument("--times", type=str, help='Comma-separated list of times (e.g., "10:00am,11:00am")')
+    parser.add_argument("--room", type=str, help='Room name (e.g., "Adult Rm. 1"); with --list-availability, filters the listing')
+    parser.add_argument("--party-size", type=int, help="Number of people for the booking (default: DEFAULT_PARTY_SIZE setting)")
+    parser.add_argument("--engine", choices=["browser", "http"], help="Booking engine: Selenium browser or direct HTTP (default: BOOKING_ENGINE setting)")
+    parser.add_argument("--list-availability", action="store_true", help="List available time slots for --day instead of booking")
+    parser.add_argument("--at", type=str, help='Release time to book at, local time "YYYY-MM-DD HH:MM:SS"; warms up ahead and fires at that instant')
+    parser.add_argument("--jobs", type=str, help="JSON or YAML file with many booking jobs to run concurrently")
+    parser.add_argument("--workers", type=int, help="Concurrent jobs for --jobs (default: JOB_MAX_WORKERS setting)")
+    parser.add_argument("--output", type=str, help="With --jobs, write JSON-lines results to this file instead of stdout")
+    parser.add_argument("--tabs", action="store_true", help="Book time slots in parallel tabs of one logged-in browser")
+    parser.add_argument("--no-batch", action="store_true", help="Book each time slot in its own browser session instead of one batch")
+    parser.add_argument("--window", type=str, help='Book the best free block in this time window instead of fixed --times, e.g. "10:00am-4:00pm"; --room and --day may then list ranked alternatives')
+    parser.add_argument("--duration", type=int, default=1, help="With --window, the shortest acceptable block in slots (default: %(default)s)")
+    parser.add_argument("--max-duration", type=int, help="With --window, the longest block to book in slots (default: --duration)")
+    parser.add_argument("--watch", action="store_true", help="Poll availability and book the slots as soon as they free up; --room may list several rooms")
+    parser.add_argument("--no-daemon", action="store_true", help="Book in this process even when a booking daemon is running")
+    parser.add_argument("--dry-run", action="store_true", help="Resolve dates, build slot labels and check credentials, then stop without booking")
+    parser.add_argument("--profile", action="store_true", help="Report time spent in each booking stage (p50/p95 over this run and earlier runs in the JSON log file)")
+
+    subparsers = parser.add_subparsers(dest="command")
+    daemon_parser = subparsers.add_parser("daemon", help="Run a long-lived booking service with warm browsers and sessions; bookings are forwarded to it")
+    daemon_parser.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    query_parser = subparsers.add_parser("query", help="Answer availability questions from the local snapshot store (no browser)")
+    query_parser.add_argument("--day", type=str, help="Day to show free slots for")
+    query_parser.add_argument("--room", type=str, help="Only this room")
+    query_parser.add_argument("--history", action="store_true", help="Show when slots usually free up instead")
+    query_parser.add_argument("--max-age", type=float, help="Refresh live when the snapshot is older than this many seconds (default: AVAILABILITY_TTL_SECONDS)")
+    query_parser.add_argument("--refresh", action="store_true", help="Always refresh live over HTTP")
+    query_parser.add_argument("--compact", action="store_true", help="Drop data older than AVAILABILITY_RETENTION_DAYS and shrink the file")
+
     args = parser.parse_args()
+    try:
+        run(args, parser)
+    finally:
+        if args.profile:
+            log_profile()
 
-    auth_service = AuthenticationService()
+def run(args, parser) -> None:
+    """
+    Dispatches the parsed command line: query, daemon, job file, availability
+    listing or a booking. Arguments are checked before anything is loaded.
+    """
+    if args.command == "query":
+        run_query(args, parser)
+        return
+    if args.command == "daemon":
+        apply_setting_defaults(args)
+        run_daemon(args)
+        return
+
+    if args.jobs:
+        apply_setting_defaults(args)
+        run_jobs(args)
+        return
+
+    if not (args.day or args.dates):
+        parser.error("--day or --dates is required")
+    if args.day and args.dates:
+        parser.error("--day and --dates cannot be combined")
+
+    if args.list_availability:
+        if not args.day:
+            parser.error("--list-availability needs --day")
+        apply_setting_defaults(args)
+        list_availability(args)
+        return
+
+    if not (args.times or args.window) or not args.room:
+        parser.error("--room and --times (or --window) are required when booking")
+
+    if args.watch and args.at:
+        parser.error("--watch and --at cannot be combined")
+    if args.window and (args.watch or args.at):
+        parser.error("--window cannot be combined with --watch or --at")
+    if args.dates and args.at:
+        parser.error("--dates cannot be combined with --at")
+
+    release_at = None
+    if args.at:
+        try:
+            release_at = datetime.datetime.strptime(args.at, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            parser.error('--at must look like "YYYY-MM-DD HH:MM:SS"')
+
+    import dataclasses
+    from models.booking_request import BookingRequest
+    from services.authentication_service import AuthenticationService
+    from utils.logger import logger
+    from config import settings
+
+    apply_setting_defaults(args)
+    preferences = None
     try:
-        credentials = auth_service.load_credentials()
+        if args.window:
+            preferences = build_preferences(args)
+            dates, times_list, room_name = preferences.dates[:1], [], preferences.rooms[0]
+        else:
+            dates = target_dates(args)
+            times_list = [t.strip() for t in args.times.split(',')]
+            room_name = args.room
     except ValueError as e:
-        logger.error(f"Configuration error: {e}")
+        logger.error(f"Invalid input: {e}")
         return
+    target_date = dates[0]
+    if len(dates) > 1:
+        logger.info(f"Booking {len(dates)} date(s): {', '.join(d.isoformat() for d in dates)}")
+
+    if args.dry_run:
+        dry_run(args, dates, preferences)
+        return
+
+    if not (args.no_daemon or args.watch or release_at or preferences):
+        from services.daemon_client import DaemonClient
+
+        client = DaemonClient()
+        if client.is_running():
+            log_summary(forward_to_daemon(client, args, dates), args, dates, preferences)
+            return
 
+    auth_service = AuthenticationService()
     try:
-        target_date = get_next_day_of_week(args.day)
-        times_list = [t.strip() for t in args.times.split(',')]
+        credentials = auth_service.load_credentials()
     except ValueError as e:
-        logger.error(f"Invalid input: {e}")
+        logger.error(f"Configuration error: {e}")
         return
 
     booking_request = BookingRequest(
         target_date=target_date,
         time_slots=times_list,
-        room_name=args.room,
+        room_name=room_name,
         party_size=args.party_size,
-        user_credentials=credentials
+        user_credentials=credentials,
+        preferences=preferences,
+    )
+
+    engine, driver_pool = build_engine(
+        args.engine,
+        batch_mode=settings.BATCH_BOOKING and not args.no_batch,
+        booking_url=booking_request.booking_url,
+        tab_mode=settings.TAB_MODE or args.tabs,
     )
+    try:
+        if args.watch:
+            results = watch_availability(engine, booking_request, args.room, dates)
+        elif release_at:
+            from core.release_scheduler import ReleaseScheduler
+            results = ReleaseScheduler(release_at).run(engine, booking_request)
+        elif len(dates) > 1:
+            results = engine.execute_bookings([dataclasses.replace(booking_request, target_date=date) for date in dates])
+        else:
+            results = engine.execute_booking(booking_request)
+    finally:
+        shutdown_engine(engine, driver_pool)
+
+    log_summary(results, args, dates, preferences)
+
+def dry_run(args, dates: list, preferences=None) -> None:
+    """Checks a booking without loading any engine: the dates, slot labels, party size and credentials."""
+    from core.base_engine import generate_slot_labels, validate_booking_parameters
+    from models.booking_request import BookingRequest
+    from services.authentication_service import AuthenticationService
+    from utils.logger import logger
+
+    auth_service = AuthenticationService()
+    try:
+        credentials = auth_service.load_credentials()
+    except ValueError as e:
+        logger.error(f"Configuration error: {e}")
+        return
+
+    if preferences:
+        logger.info(f"Dry run: would plan among {', '.join(preferences.rooms)} on "
+                    f"{', '.join(d.isoformat() for d in preferences.dates)}, {preferences.window_start}-{preferences.window_end}, "
+                    f"{preferences.min_slots}-{preferences.max_slots or preferences.min_slots} slot(s).")
+        # The planner picks the times later; the window start stands in for them here
+        requests = [BookingRequest(target_date=preferences.dates[0], time_slots=[preferences.window_start], room_name=preferences.rooms[0],
+                                   party_size=args.party_size, user_credentials=credentials)]
+    else:
+        requests = [BookingRequest(target_date=date, time_slots=[t.strip() for t in args.times.split(",")], room_name=args.room,
+                                   party_size=args.party_size, user_credentials=credentials) for date in dates]
+    if not all(validate_booking_parameters(request, auth_service) for request in requests):
+        logger.error("❌ Dry run: the booking would be rejected")
+        return
+    for request in requests if not preferences else []:
+        for label in generate_slot_labels(request):
+            logger.info(f"Dry run: would book {label}")
+    logger.info(f"✅ Dry run passed for {len(requests)} date(s); nothing was booked")
 
-    engine = BookingEngine()
-    results = engine.execute_booking(booking_request)
+def log_summary(results: list, args, dates: list, preferences=None) -> None:
+    """Logs how many slots were booked and how many failed."""
+    from utils.logger import logger
 
-    # Summary logging only
+    target_date = dates[0]
     successful_bookings = [r for r in results if r.success]
     failed_bookings = [r for r in results if not r.success]
     
-    if successful_bookings:
-        logger.info(f"✅ Successfully booked {len(successful_bookings)} time slot(s) for {args.room} on {target_date}")
+    plan = next((r.details.get("plan") for r in results if r.details and "plan" in r.details), None) if preferences else None
+    if successful_bookings and preferences:
+        logger.info(f"✅ Successfully booked {len(successful_bookings)} time slot(s): {plan}")
+    elif successful_bookings:
+        on_dates = target_date if len(dates) == 1 else f"{len(dates)} date(s)"
+        logger.info(f"✅ Successfully booked {len(successful_bookings)} time slot(s) for {args.room} on {on_dates}")
     
     if failed_bookings:
         logger.error(f"❌ Failed to book {len(failed_bookings)} time slot(s)")
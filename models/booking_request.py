@@ -2,12 +2,24 @@ from dataclasses import dataclass
 import datetime
 from typing import List, Optional
 from dataclasses import dataclass
+from utils.urls import date_url
 
 @dataclass
 class Credentials:
     card_number: str
     pin: str
 
+@dataclass
+class BookingPreferences:
+    """Ranked alternatives: the planner books the best feasible block among them."""
+    rooms: List[str]               # Most preferred first
+    dates: List[datetime.date]     # Most preferred first
+    window_start: str = "12:00am"  # Earliest slot start, e.g. "10:00am"
+    window_end: str = "11:59pm"    # Latest slot end, e.g. "4:00pm"
+    min_slots: int = 1             # Shortest acceptable contiguous block
+    max_slots: Optional[int] = None  # Longest block to book (default: min_slots)
+    slot_minutes: int = 60
+
 @dataclass
 class BookingRequest:
     target_date: datetime.date
@@ -17,4 +29,11 @@ class BookingRequest:
     user_credentials: Credentials
     booking_url: str = "https://ylpl.libcal.com/spaces?lid=13172&gid=27150"
     # Optional: if specific slot labels are pre-computed
-    slot_labels_to_click: Optional[List[str]] = None
\ No newline at end of file
+    slot_labels_to_click: Optional[List[str]] = None
+    # Optional: ranked alternatives; room_name, target_date and time_slots are then chosen by the planner
+    preferences: Optional[BookingPreferences] = None
+
+    @property
+    def grid_url(self) -> str:
+        """booking_url opened straight on target_date's grid."""
+        return date_url(self.booking_url, self.target_date)
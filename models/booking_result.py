@@ -1,12 +1,21 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import datetime
 from typing import Optional
-from dataclasses import dataclass
 
 @dataclass
 class BookingResult:
     success: bool
     booking_id: Optional[str] = None
     error_message: Optional[str] = None
-    timestamp: datetime.datetime = datetime.datetime.now()
-    details: Optional[dict] = None # For any additional info, like confirmed slots
\ No newline at end of file
+    timestamp: datetime.datetime = field(default_factory=datetime.datetime.now)
+    details: Optional[dict] = None # For any additional info, like confirmed slots
+
+    def to_dict(self) -> dict:
+        """JSON-serializable form, e.g. for JSON-lines output."""
+        return {
+            "success": self.success,
+            "booking_id": self.booking_id,
+            "error_message": self.error_message,
+            "timestamp": self.timestamp.isoformat(),
+            "details": self.details,
+        }
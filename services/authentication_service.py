@@ -1,17 +1,29 @@
-from config import settings
+import dataclasses
+import json
+import os
+from pathlib import Path
+from typing import Optional
 from models.booking_request import Credentials
-from utils.logger import logger
+from utils.logger import log_fields, logger
 from config import settings
 
 class AuthenticationService:
-    def load_credentials(self) -> Credentials:
-        """Loads credentials from the configuration."""
-        card_number = settings.LIBRARY_CARD_NUMBER
-        pin = settings.LIBRARY_PIN
+    def load_credentials(self, profile: Optional[str] = None) -> Credentials:
+        """
+        Loads credentials from the configuration.
+        A named profile reads LIBRARY_CARD_NUMBER_<PROFILE> and LIBRARY_PIN_<PROFILE> instead.
+        """
+        if profile:
+            suffix = profile.strip().upper().replace("-", "_").replace(" ", "_")
+            card_var, pin_var = f"LIBRARY_CARD_NUMBER_{suffix}", f"LIBRARY_PIN_{suffix}"
+            card_number, pin = os.getenv(card_var), os.getenv(pin_var)
+        else:
+            card_var, pin_var = "LIBRARY_CARD_NUMBER", "LIBRARY_PIN"
+            card_number, pin = settings.LIBRARY_CARD_NUMBER, settings.LIBRARY_PIN
 
         if not card_number or not pin:
             logger.error("Library card number or PIN is not configured. Please check your .env file or environment variables.")
-            raise ValueError("Credentials not found. Set LIBRARY_CARD_NUMBER and LIBRARY_PIN.")
+            raise ValueError(f"Credentials not found. Set {card_var} and {pin_var}.")
         
         logger.info("Credentials loaded successfully.")
         return Credentials(card_number=card_number, pin=pin)
@@ -27,17 +39,52 @@ class AuthenticationService:
         logger.debug("Credentials format validated.")
         return True
 
+    def _get_fernet(self):
+        """
+        Returns a Fernet cipher keyed by CREDENTIAL_ENCRYPTION_KEY, or by a key file
+        generated on first use at ENCRYPTION_KEY_PATH (readable only by the owner).
+        Raises ValueError if the key file would sit in the session cache's directory.
+        """
+        from cryptography.fernet import Fernet
+
+        key = settings.CREDENTIAL_ENCRYPTION_KEY
+        if not key:
+            key_path = Path(settings.ENCRYPTION_KEY_PATH).expanduser()
+            if key_path.resolve().parent == Path(settings.SESSION_CACHE_PATH).resolve().parent:
+                raise ValueError("ENCRYPTION_KEY_PATH must not be in the session cache directory; "
+                                 "set CREDENTIAL_ENCRYPTION_KEY or move the key file.")
+            if key_path.exists():
+                if key_path.stat().st_mode & 0o077:
+                    logger.warning("Encryption key file is readable by other users; chmod 600 it.", extra=log_fields(path=str(key_path)))
+                key = key_path.read_text().strip()
+            else:
+                key = Fernet.generate_key().decode()
+                key_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+                # Created owner-only, so the key is never readable by others, even briefly
+                fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    f.write(key)
+                logger.info("Generated new encryption key.", extra=log_fields(path=str(key_path)))
+        return Fernet(key.encode() if isinstance(key, str) else key)
+
+    def encrypt_data(self, data: bytes) -> str:
+        """Encrypts arbitrary bytes (e.g. a session cache) into a URL-safe token."""
+        return self._get_fernet().encrypt(data).decode()
+
+    def decrypt_data(self, token: str) -> bytes:
+        """Reverses encrypt_data(). Raises ValueError if the token is corrupt or the key changed."""
+        from cryptography.fernet import InvalidToken
+
+        try:
+            return self._get_fernet().decrypt(token.encode())
+        except InvalidToken:
+            raise ValueError("Encrypted data could not be decrypted; it is corrupt or was written with another key.")
+
     def encrypt_credentials(self, credentials: Credentials) -> str:
-        """Placeholder for encrypting credentials. Not implemented for this version."""
-        logger.warning("Credential encryption is not implemented in this version.")
-        # TODO: Implement actual encryption using libraries like 'cryptography'
-        # Example: return Fernet(encryption_key).encrypt(json.dumps(dataclasses.asdict(credentials)).encode())
-        raise NotImplementedError("Credential encryption not implemented")
+        """Encrypts credentials with Fernet (AES-128-CBC + HMAC)."""
+        return self.encrypt_data(json.dumps(dataclasses.asdict(credentials)).encode())
 
     def decrypt_credentials(self, encrypted_data: str) -> Credentials:
-        """Placeholder for decrypting credentials. Not implemented for this version."""
-        logger.warning("Credential decryption is not implemented in this version.")
-        # TODO: Implement actual decryption using libraries like 'cryptography'
-        # Example: data = json.loads(Fernet(encryption_key).decrypt(encrypted_data.encode()).decode())
-        # return Credentials(**data)
-        raise NotImplementedError("Credential decryption not implemented")
\ No newline at end of file
+        """Decrypts credentials produced by encrypt_credentials()."""
+        data = json.loads(self.decrypt_data(encrypted_data).decode())
+        return Credentials(**data)
@@ -0,0 +1,205 @@
+# Local SQLite store of availability grid snapshots and their history
+import datetime
+import sqlite3
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.availability_index import AvailabilityIndex, AvailabilityTile
+from core.date_utils import format_dow_label, time_label_minutes
+from utils.logger import log_fields, logger
+from config import settings
+
+# Only changes are stored: a state row covers the span during which a tile kept
+# the same availability, from first_seen to last_seen (epoch seconds).
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tiles (
+    id INTEGER PRIMARY KEY,
+    room TEXT NOT NULL COLLATE NOCASE,
+    date TEXT NOT NULL,
+    time_label TEXT NOT NULL,
+    start_minute INTEGER NOT NULL,
+    current_state INTEGER,
+    UNIQUE (room, date, time_label)
+);
+CREATE INDEX IF NOT EXISTS tiles_by_date ON tiles (date, room, start_minute);
+CREATE TABLE IF NOT EXISTS states (
+    id INTEGER PRIMARY KEY,
+    tile_id INTEGER NOT NULL REFERENCES tiles (id),
+    available INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS states_by_tile ON states (tile_id, id);
+CREATE TABLE IF NOT EXISTS captures (
+    date TEXT PRIMARY KEY,
+    captured_at REAL NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+COMPACT_INTERVAL_SECONDS = 24 * 3600
+
+class AvailabilityStore:
+    """
+    Availability grids captured by --list-availability, --watch and `query`,
+    kept in SQLite. Each tile (room, date, time) has one row per availability
+    change, so months of polling stay small; captures record when each date
+    was last read, for the freshness TTL.
+    """
+
+    def __init__(self, path: str = settings.AVAILABILITY_STORE_PATH, ttl_seconds: int = settings.AVAILABILITY_TTL_SECONDS,
+                 retention_days: int = settings.AVAILABILITY_RETENTION_DAYS):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.retention_days = retention_days
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self.maybe_compact()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def record(self, dates: Iterable[datetime.date], tiles: Iterable[AvailabilityTile], captured_at: Optional[float] = None) -> int:
+        """
+        Records one capture of the grid for `dates`, in a single transaction.
+        `tiles` may list only the available tiles: known tiles on those dates
+        that are missing from it are recorded as unavailable. Returns the
+        number of tiles whose availability changed.
+        """
+        now = captured_at if captured_at is not None else time.time()
+        tiles = list(tiles)
+        day_keys = sorted({d.isoformat() for d in dates} | {t.date.isoformat() for t in tiles})
+        if not day_keys:
+            return 0
+        seen = {(t.room_name.lower(), t.date.isoformat(), t.time_label.lower()): t.available for t in tiles}
+        placeholders = ",".join("?" * len(day_keys))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tiles (room, date, time_label, start_minute) VALUES (?, ?, ?, ?)",
+                [(t.room_name, t.date.isoformat(), t.time_label.lower(), time_label_minutes(t.time_label)) for t in tiles],
+            )
+            rows = self._conn.execute(
+                f"SELECT t.id, t.room, t.date, t.time_label, s.id, s.available FROM tiles t "
+                f"LEFT JOIN states s ON s.id = t.current_state WHERE t.date IN ({placeholders})",
+                day_keys,
+            ).fetchall()
+
+            unchanged, changed = [], []
+            for tile_id, room, date, time_label, state_id, was_available in rows:
+                available = seen.get((room.lower(), date, time_label), False)
+                if state_id is not None and bool(was_available) == available:
+                    unchanged.append((now, state_id))
+                else:
+                    changed.append((tile_id, int(available), now, now))
+
+            self._conn.executemany("UPDATE states SET last_seen = ? WHERE id = ?", unchanged)
+            self._conn.executemany("INSERT INTO states (tile_id, available, first_seen, last_seen) VALUES (?, ?, ?, ?)", changed)
+            if changed:
+                changed_ids = [(tile_id,) for tile_id, *_ in changed]
+                self._conn.executemany(
+                    "UPDATE tiles SET current_state = (SELECT MAX(id) FROM states WHERE tile_id = ?1) WHERE id = ?1", changed_ids
+                )
+            self._conn.executemany(
+                "INSERT INTO captures (date, captured_at) VALUES (?, ?) "
+                "ON CONFLICT (date) DO UPDATE SET captured_at = excluded.captured_at, count = count + 1",
+                [(day, now) for day in day_keys],
+            )
+        logger.debug("Stored availability.", extra=log_fields(dates=list(day_keys), changed=len(changed)))
+        return len(changed)
+
+    def age_seconds(self, date: datetime.date) -> Optional[float]:
+        """Seconds since `date` was last captured, or None if it never was."""
+        with self._lock:
+            row = self._conn.execute("SELECT captured_at FROM captures WHERE date = ?", (date.isoformat(),)).fetchone()
+        return time.time() - row[0] if row else None
+
+    def is_fresh(self, date: datetime.date, max_age: Optional[float] = None) -> bool:
+        age = self.age_seconds(date)
+        return age is not None and age <= (self.ttl_seconds if max_age is None else max_age)
+
+    def available(self, date: datetime.date, room_name: Optional[str] = None) -> AvailabilityIndex:
+        """Tiles available at the latest capture of `date` (check is_fresh first)."""
+        query = ("SELECT t.room, t.time_label FROM tiles t JOIN states s ON s.id = t.current_state "
+                 "WHERE t.date = ? AND s.available = 1")
+        params: list = [date.isoformat()]
+        if room_name:
+            query += " AND t.room = ?"
+            params.append(room_name)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY t.room, t.start_minute", params).fetchall()
+        return AvailabilityIndex(
+            AvailabilityTile(aria_label=f"{time_label} {format_dow_label(date)} - {room} - Available",
+                             room_name=room, date=date, time_label=time_label, available=True)
+            for room, time_label in rows
+        )
+
+    def release_events(self, room_name: Optional[str] = None) -> List[Tuple[str, datetime.datetime, datetime.datetime]]:
+        """
+        (room, slot start, time it turned available) for every tile that freed up
+        after having been seen taken, e.g. a cancellation or a late release.
+        """
+        # States alternate per tile, so any available state that is not a tile's first follows a taken one
+        query = ("SELECT t.room, t.date, t.start_minute, s.first_seen FROM states s JOIN tiles t ON t.id = s.tile_id "
+                 "WHERE s.available = 1 AND EXISTS (SELECT 1 FROM states p WHERE p.tile_id = s.tile_id AND p.id < s.id)")
+        params: list = []
+        if room_name:
+            query += " AND t.room = ?"
+            params.append(room_name)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            (room, datetime.datetime.fromisoformat(date) + datetime.timedelta(minutes=minute), datetime.datetime.fromtimestamp(freed))
+            for room, date, minute, freed in rows
+        ]
+
+    def release_patterns(self, room_name: Optional[str] = None, top: int = 5) -> dict:
+        """
+        When slots usually free up: the most common (weekday, hour) of release,
+        and the median time between freeing up and the slot's start.
+        """
+        events = self.release_events(room_name)
+        by_hour: Dict[Tuple[str, int], int] = {}
+        for _, _, freed in events:
+            key = (freed.strftime("%A"), freed.hour)
+            by_hour[key] = by_hour.get(key, 0) + 1
+        lead_hours = [(start - freed).total_seconds() / 3600 for _, start, freed in events]
+        return {
+            "events": len(events),
+            "busiest": [{"weekday": day, "hour": hour, "count": count}
+                        for (day, hour), count in sorted(by_hour.items(), key=lambda item: -item[1])[:top]],
+            "median_lead_hours": round(statistics.median(lead_hours), 1) if lead_hours else None,
+        }
+
+    def compact(self) -> dict:
+        """Drops tiles for dates older than the retention period and reclaims the space."""
+        cutoff = (datetime.date.today() - datetime.timedelta(days=self.retention_days)).isoformat()
+        with self._lock:
+            with self._conn:
+                states = self._conn.execute(
+                    "DELETE FROM states WHERE tile_id IN (SELECT id FROM tiles WHERE date < ?)", (cutoff,)
+                ).rowcount
+                tiles = self._conn.execute("DELETE FROM tiles WHERE date < ?", (cutoff,)).rowcount
+                self._conn.execute("DELETE FROM captures WHERE date < ?", (cutoff,))
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_compacted', ?)", (str(time.time()),))
+            self._conn.execute("VACUUM")
+        if tiles:
+            logger.info("Compacted availability store.", extra=log_fields(tiles_dropped=tiles, states_dropped=states, before=str(cutoff)))
+        return {"tiles": tiles, "states": states}
+
+    def maybe_compact(self) -> None:
+        """Compacts at most once a day."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_compacted'").fetchone()
+        if row is None or time.time() - float(row[0]) > COMPACT_INTERVAL_SECONDS:
+            self.compact()
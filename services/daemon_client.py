@@ -0,0 +1,93 @@
+# Client for the local booking daemon (python main.py daemon)
+import http.client
+import json
+from pathlib import Path
+from typing import Iterator, Optional
+from urllib.parse import urlencode
+
+from config import settings
+
+class DaemonClient:
+    """
+    Talks to a BookingDaemon over its local HTTP API with the standard
+    library only, so forwarding a booking costs no heavy imports.
+    """
+
+    def __init__(self, host: str = settings.DAEMON_HOST, port: int = settings.DAEMON_PORT,
+                 timeout: Optional[float] = None, token_path: str = settings.DAEMON_TOKEN_PATH):
+        self.host = host
+        self.port = port
+        self.timeout = timeout  # None waits as long as a booking takes
+        self.token_path = Path(token_path).expanduser()
+
+    def _token(self) -> str:
+        """The running daemon's API token; read per request, as each daemon run writes a new one."""
+        try:
+            return self.token_path.read_text().strip()
+        except OSError:
+            return ""
+
+    def _request(self, method: str, path: str, payload: Optional[dict] = None, timeout: Optional[float] = None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=timeout or self.timeout)
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Authorization": f"Bearer {self._token()}"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        connection.request(method, path, body=body, headers=headers)
+        return connection, connection.getresponse()
+
+    def health(self, timeout: float = settings.DAEMON_CONNECT_TIMEOUT_SECONDS) -> Optional[dict]:
+        """The daemon's /health, or None when no daemon is listening."""
+        try:
+            connection, response = self._request("GET", "/health", timeout=timeout)
+        except OSError:
+            return None
+        try:
+            return json.loads(response.read()) if response.status == 200 else None
+        except ValueError:
+            return None
+        finally:
+            connection.close()
+
+    def is_running(self) -> bool:
+        return self.health() is not None
+
+    def book(self, job: dict) -> Iterator[dict]:
+        """
+        Submits a job mapping (as in --jobs files) and yields the streamed
+        events: queued, started, one result per slot, then done.
+        Raises RuntimeError when the daemon refuses the job.
+        """
+        connection, response = self._request("POST", "/bookings", job)
+        try:
+            if response.status != 200:
+                try:
+                    message = json.loads(response.read()).get("error")
+                except ValueError:
+                    message = None
+                raise RuntimeError(message or f"Daemon returned HTTP {response.status}")
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            connection.close()
+
+    def availability(self, date: str, room: Optional[str] = None) -> dict:
+        """Free slots for an ISO date from the daemon's warm availability store."""
+        query = urlencode({"date": date, **({"room": room} if room else {})})
+        connection, response = self._request("GET", f"/availability?{query}")
+        try:
+            payload = json.loads(response.read())
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise RuntimeError(payload.get("error") or f"Daemon returned HTTP {response.status}")
+        return payload
+
+    def shutdown(self) -> bool:
+        try:
+            connection, response = self._request("POST", "/shutdown", {}, timeout=settings.DAEMON_CONNECT_TIMEOUT_SECONDS)
+        except OSError:
+            return False
+        connection.close()
+        return response.status == 200
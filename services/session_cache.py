@@ -0,0 +1,92 @@
+# Encrypted on-disk cache of authenticated LibCal sessions
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from services.authentication_service import AuthenticationService
+from utils.logger import log_fields, logger
+from config import settings
+
+class SessionCache:
+    """
+    Stores the cookies and local storage of an authenticated LibCal session per
+    library card, so a later run can restore the session instead of logging in.
+
+    Entries are keyed by a SHA-256 hash of the card number, expire after
+    `ttl_seconds`, and the whole file is encrypted with AuthenticationService.
+    """
+
+    def __init__(self, path: str = settings.SESSION_CACHE_PATH, ttl_seconds: int = settings.SESSION_CACHE_TTL_SECONDS,
+                 auth_service: Optional[AuthenticationService] = None):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.auth_service = auth_service or AuthenticationService()
+        self.hits = 0       # Unexpired entry found
+        self.misses = 0     # No entry, or entry expired
+        self.stale = 0      # Entry found but LibCal no longer accepted it
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+
+    @staticmethod
+    def _key(card_number: str) -> str:
+        return hashlib.sha256(card_number.encode()).hexdigest()
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if self.path.exists():
+            try:
+                self._entries = json.loads(self.auth_service.decrypt_data(self.path.read_text()))
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable session cache.", extra=log_fields(path=str(self.path), error=str(e)))
+        return self._entries
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(self.auth_service.encrypt_data(json.dumps(self._entries).encode()))
+        os.chmod(tmp_path, 0o600)
+        tmp_path.replace(self.path)
+
+    def get(self, card_number: str) -> Optional[dict]:
+        """Returns the saved session state for the card, or None if missing or expired."""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(self._key(card_number))
+            if entry is None or entry["expires_at"] <= time.time():
+                self.misses += 1
+                if entry is not None:
+                    del entries[self._key(card_number)]
+                    self._write()
+                return None
+            self.hits += 1
+            return entry["state"]
+
+    def save(self, card_number: str, state: dict) -> None:
+        """Saves session state (cookies, local storage) for the card."""
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            # Drop other expired entries while we are rewriting the file anyway
+            for key in [k for k, v in entries.items() if v["expires_at"] <= now]:
+                del entries[key]
+            entries[self._key(card_number)] = {"state": state, "expires_at": now + self.ttl_seconds}
+            self._write()
+        logger.debug("Saved authenticated session to cache.")
+
+    def invalidate(self, card_number: str) -> None:
+        """Removes a session LibCal rejected."""
+        with self._lock:
+            entries = self._load()
+            if entries.pop(self._key(card_number), None) is not None:
+                self.stale += 1
+                self._write()
+        logger.info("Cached session was no longer valid; logging in again.")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale}
@@ -0,0 +1,211 @@
+# End-to-end booking benchmarks against the LibCal stand-in
+#
+#   python -m tests.benchmarks.bench_booking_engine [--engine browser|http] [--runs 5] [--slots 2]
+#       [--workers 1,2,4] [--jobs 8] [--latency 0.05] [--output bench.json] [--compare baseline.json]
+#
+# Measures end-to-end booking latency, time per pipeline stage, job throughput
+# at several worker counts, and memory. Results are written as JSON; with
+# --compare, metrics are checked against an earlier result file and the exit
+# status is 1 if any got worse by more than --threshold percent.
+# The browser engine needs Chrome; the HTTP engine runs anywhere.
+import argparse
+import datetime
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Iterator, List, Optional, Tuple
+
+from core.base_engine import BaseBookingEngine
+from core.job_runner import BookingJob, JobRunner
+from models.booking_request import BookingRequest, Credentials
+from tests.libcal_standin.server import DEFAULT_ROOMS, LibCalStandIn
+from utils.stats import percentile
+from utils.tracing import tracer
+
+FIRST_DAY = datetime.date(2025, 1, 11)
+GRID_DAYS = 14
+OPEN_HOUR, CLOSE_HOUR = 9, 20
+CREDENTIALS = Credentials(card_number="21234567890123", pin="1234")
+
+# Metrics compared by --compare; True when higher is better
+COMPARED_METRICS = {
+    "end_to_end.p50_ms": False,
+    "end_to_end.p95_ms": False,
+    "memory.python_peak_kb": False,
+    "memory.max_rss_kb": False,
+}
+
+def free_slots(slots_per_booking: int) -> Iterator[Tuple[datetime.date, str, List[str]]]:
+    """Yields (date, room, times) blocks that no earlier booking in the run has used."""
+    for day_offset in range(GRID_DAYS):
+        day = FIRST_DAY + datetime.timedelta(days=day_offset)
+        for room in DEFAULT_ROOMS.values():
+            for hour in range(OPEN_HOUR, CLOSE_HOUR - slots_per_booking + 1, slots_per_booking):
+                times = [datetime.datetime.combine(day, datetime.time(h)).strftime("%I:%M%p").lstrip("0").lower()
+                         for h in range(hour, hour + slots_per_booking)]
+                yield day, room, times
+
+def make_request(server: LibCalStandIn, block: Tuple[datetime.date, str, List[str]]) -> BookingRequest:
+    day, room, times = block
+    request = BookingRequest(target_date=day, time_slots=times, room_name=room, party_size=4, user_credentials=CREDENTIALS)
+    request.booking_url = server.booking_url
+    return request
+
+def build_engine(name: str, server: LibCalStandIn, pool_size: int):
+    """Returns the engine and its WebDriver pool (if any)."""
+    if name == "http":
+        from core.http_booking_engine import HttpBookingEngine
+        return HttpBookingEngine(browser_fallback=False), None
+    from core.booking_engine import BookingEngine
+    from core.web_driver_pool import WebDriverPool
+    pool = WebDriverPool(warm_url=server.booking_url, size=pool_size) if pool_size else None
+    return BookingEngine(driver_pool=pool), pool
+
+def bench_end_to_end(engine: BaseBookingEngine, server: LibCalStandIn, blocks: Iterator, runs: int) -> dict:
+    latencies, booked = [], 0
+    for _ in range(runs):
+        request = make_request(server, next(blocks))
+        started = time.perf_counter()
+        results = engine.execute_booking(request)
+        latencies.append((time.perf_counter() - started) * 1000)
+        booked += sum(1 for r in results if r.success)
+    return {
+        "runs": runs,
+        "slots_booked": booked,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "min_ms": round(min(latencies), 1),
+        "max_ms": round(max(latencies), 1),
+    }
+
+def bench_throughput(engine: BaseBookingEngine, server: LibCalStandIn, blocks: Iterator, workers: int, jobs: int) -> dict:
+    batch = [BookingJob(job_id=f"bench-{workers}-{i}", request=make_request(server, next(blocks))) for i in range(jobs)]
+    started = time.perf_counter()
+    outcomes = JobRunner(engine, max_workers=workers).run(batch)
+    elapsed = time.perf_counter() - started
+    latencies = [o.latency_seconds * 1000 for o in outcomes]
+    return {
+        "workers": workers,
+        "jobs": jobs,
+        "booked": sum(1 for o in outcomes if o.status == "booked"),
+        "jobs_per_min": round(jobs / elapsed * 60, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+    }
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(args) -> dict:
+    blocks = free_slots(args.slots)
+    with LibCalStandIn(latency=args.latency, grid_start=FIRST_DAY, grid_days=GRID_DAYS,
+                       open_hour=OPEN_HOUR, close_hour=CLOSE_HOUR) as server:
+        engine, pool = build_engine(args.engine, server, args.pool)
+        try:
+            tracer.reset()
+            end_to_end = bench_end_to_end(engine, server, blocks, args.runs)
+            per_step = tracer.summary()
+
+            # Separate pass: tracemalloc slows Python down too much to time the runs above
+            tracemalloc.start()
+            bench_end_to_end(engine, server, blocks, 1)
+            _, python_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            throughput = [bench_throughput(engine, server, blocks, workers, args.jobs) for workers in args.workers]
+        finally:
+            if pool:
+                pool.shutdown()
+
+    # ru_maxrss is in KB on Linux; children covers chromedriver/Chrome once they have exited
+    memory = {
+        "python_peak_kb": round(python_peak / 1024),  # During one booking
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children_max_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+    return {
+        "meta": {
+            "commit": current_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "engine": args.engine,
+            "python": platform.python_version(),
+            "runs": args.runs,
+            "slots_per_booking": args.slots,
+            "latency_s": args.latency,
+            "pool_size": args.pool,
+        },
+        "end_to_end": end_to_end,
+        "per_step": per_step,
+        "throughput": throughput,
+        "memory": memory,
+    }
+
+def flatten_metrics(report: dict) -> dict:
+    """Maps metric name -> (value, higher_is_better) for comparison."""
+    metrics = {}
+    for name, higher_is_better in COMPARED_METRICS.items():
+        section, key = name.split(".")
+        if key in report.get(section, {}):
+            metrics[name] = (report[section][key], higher_is_better)
+    for row in report.get("per_step", []):
+        metrics[f"per_step.{row['stage']}.p50_ms"] = (row["p50_ms"], False)
+    for row in report.get("throughput", []):
+        metrics[f"throughput.w{row['workers']}.jobs_per_min"] = (row["jobs_per_min"], True)
+    return metrics
+
+def compare(report: dict, baseline: dict, threshold_pct: float) -> List[str]:
+    """Prints each shared metric's change from the baseline and returns the regressed ones."""
+    current, previous = flatten_metrics(report), flatten_metrics(baseline)
+    regressions = []
+    print(f"Compared with {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('timestamp')}):", file=sys.stderr)
+    for name in sorted(set(current) & set(previous)):
+        value, higher_is_better = current[name]
+        old = previous[name][0]
+        change = (value - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > threshold_pct else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:<40} {old:>10} -> {value:>10} ({change:+.1f}%){flag}", file=sys.stderr)
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark booking engines against the LibCal stand-in.")
+    parser.add_argument("--engine", choices=["browser", "http"], default="browser")
+    parser.add_argument("--runs", type=int, default=5, help="Sequential bookings for the end-to-end latency")
+    parser.add_argument("--slots", type=int, default=2, help="Time slots per booking")
+    parser.add_argument("--workers", type=lambda v: [int(w) for w in v.split(",")], default=[1, 2, 4], help="Worker counts for throughput, e.g. 1,2,4")
+    parser.add_argument("--jobs", type=int, default=8, help="Jobs per throughput measurement")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in delay per request, in seconds")
+    parser.add_argument("--pool", type=int, default=0, help="WebDriver pool size for the browser engine (0 = none)")
+    parser.add_argument("--output", help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    args = parser.parse_args()
+
+    logging.getLogger("booking_system").setLevel(logging.WARNING)  # Keep engine chatter out of the results
+    report = run_benchmarks(args)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Compares page weight and time-to-interactive of the full and lean browser profiles
+#
+#   python -m tests.benchmarks.bench_browser_profile [--runs 5] [--url URL] [--asset-delay 0.1]
+#
+# Without --url it loads the LibCal stand-in, whose spaces page carries images,
+# a web font, a stylesheet and an analytics script. Needs Chrome.
+import argparse
+import json
+import statistics
+import time
+
+from core.web_driver import WebDriverService
+from tests.libcal_standin.server import LibCalStandIn
+
+# Bytes over the wire for the document and every sub-resource that was fetched
+_TRANSFER_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+return {
+    document_bytes: nav ? nav.transferSize : 0,
+    resource_bytes: resources.reduce(function (sum, r) { return sum + (r.transferSize || 0); }, 0),
+    resources: resources.length,
+    dom_interactive_ms: nav ? nav.domInteractive : null
+};
+"""
+
+def measure(profile: str, url: str, runs: int) -> dict:
+    service = WebDriverService(headless=True, profile=profile)
+    samples = []
+    try:
+        for _ in range(runs):
+            service.driver.delete_all_cookies()
+            started = time.perf_counter()
+            service.navigate_to_page(url)
+            returned_ms = (time.perf_counter() - started) * 1000
+            # get() returns at the load event (full) or DOMContentLoaded (lean); let late
+            # resources finish so the byte count covers everything the profile fetches
+            time.sleep(1.0)
+            stats = service.driver.execute_script(_TRANSFER_JS)
+            samples.append({**stats, "navigate_ms": returned_ms})
+            service.driver.get("about:blank")
+    finally:
+        service.close_driver()
+
+    return {
+        "profile": profile,
+        "runs": runs,
+        "navigate_ms": round(statistics.median(s["navigate_ms"] for s in samples), 1),
+        "dom_interactive_ms": round(statistics.median(s["dom_interactive_ms"] or 0 for s in samples), 1),
+        "bytes_transferred": int(statistics.median(s["document_bytes"] + s["resource_bytes"] for s in samples)),
+        "resources_fetched": int(statistics.median(s["resources"] for s in samples)),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the full vs lean browser profile.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--url", help="Page to load (default: LibCal stand-in spaces page).")
+    parser.add_argument("--asset-delay", type=float, default=0.1, help="Stand-in latency per page asset, in seconds.")
+    args = parser.parse_args()
+
+    if args.url:
+        report = [measure(profile, args.url, args.runs) for profile in ("full", "lean")]
+    else:
+        with LibCalStandIn(asset_delay=args.asset_delay) as server:
+            report = [measure(profile, server.booking_url, args.runs) for profile in ("full", "lean")]
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# CLI startup cost, measured with python -X importtime
+#
+#   python -m tests.benchmarks.bench_startup [--runs 5] [--budget 60] [--output startup.json]
+#
+# For each scenario (importing main, --help, a --dry-run booking, loading each
+# engine) reports the median wall time of the process and of its imports,
+# leaving out what a bare interpreter imports anyway, plus the slowest
+# modules. With --budget, the exit status is 1 if `import main` takes longer.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+
+SCENARIOS = {
+    "import_main": ["-c", "import main"],
+    "help": ["main.py", "--help"],
+    "dry_run": ["main.py", "--dry-run", "--day", "Saturday", "--times", "10:00am,11:00am", "--room", "Adult Rm. 1"],
+    "http_engine": ["-c", "import core.http_booking_engine"],
+    "browser_engine": ["-c", "import core.booking_engine"],
+}
+
+def run_importtime(args: List[str], env: Dict[str, str] = None) -> Tuple[Dict[str, int], float, subprocess.CompletedProcess]:
+    """
+    Runs python -X importtime with `args` from the repo root. Returns the
+    cumulative import time (microseconds) of each top-level import, the wall
+    time in ms, and the finished process.
+    """
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, capture_output=True, text=True,
+                               env={**os.environ, **(env or {})})
+    wall_ms = (time.perf_counter() - started) * 1000
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total, name = line.split("|")
+        if not name.startswith("  "):  # Nested imports are indented further
+            cumulative[name.strip()] = int(total)
+    return cumulative, wall_ms, completed
+
+def imported_modules(args: List[str], env: Dict[str, str] = None) -> List[str]:
+    """Every module imported by the run, nested ones included."""
+    completed = run_importtime(args, env)[2]
+    return [line.split("|")[-1].strip() for line in completed.stderr.splitlines()
+            if line.startswith("import time:") and "cumulative" not in line]
+
+def measure(args: List[str], runs: int, baseline: set, env: Dict[str, str]) -> dict:
+    samples = []
+    for _ in range(runs):
+        cumulative, wall_ms, _ = run_importtime(args, env)
+        own = {name: us for name, us in cumulative.items() if name not in baseline}
+        samples.append((wall_ms, sum(own.values()) / 1000, own))
+    slowest = sorted(samples[-1][2].items(), key=lambda item: -item[1])[:8]
+    return {
+        "wall_ms": round(statistics.median(s[0] for s in samples), 1),
+        "imports_ms": round(statistics.median(s[1] for s in samples), 1),
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in slowest},
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup and import time.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, help="Fail if importing main takes longer than this many ms")
+    parser.add_argument("--output", help="Write the JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    # Credentials so --dry-run gets as far as a real booking would, and a throwaway log file
+    env = {"LIBRARY_CARD_NUMBER": "21234567890123", "LIBRARY_PIN": "1234", "LOG_FILE_PATH": os.devnull}
+    baseline = set(run_importtime(["-c", "pass"])[0])
+    report = {name: measure(scenario, args.runs, baseline, env) for name, scenario in SCENARIOS.items()}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    if args.budget is not None and report["import_main"]["imports_ms"] > args.budget:
+        print(f"import main took {report['import_main']['imports_ms']} ms, over the {args.budget} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import datetime
+import time
+
+from core.availability_index import AvailabilityTile
+from services.availability_store import AvailabilityStore
+
+SATURDAY = datetime.date(2025, 1, 11)
+
+def tile(time_label: str, room: str = "Adult Rm. 1", date: datetime.date = SATURDAY, available: bool = True) -> AvailabilityTile:
+    return AvailabilityTile(aria_label=f"{time_label} - {room}", room_name=room, date=date, time_label=time_label, available=available)
+
+def test_only_changes_are_stored_and_missing_tiles_count_as_taken(tmp_path):
+    store = AvailabilityStore(path=str(tmp_path / "availability.db"), ttl_seconds=60)
+    started = time.time() - 3600
+
+    assert store.record([SATURDAY], [tile("10:00am"), tile("11:00am")], captured_at=started) == 2
+    assert store.record([SATURDAY], [tile("10:00am"), tile("11:00am")], captured_at=started + 30) == 0
+    # 11:00am no longer listed: someone booked it
+    assert store.record([SATURDAY], [tile("10:00am")], captured_at=started + 60) == 1
+    # ... and it comes back an hour before the slot
+    store.record([SATURDAY], [tile("10:00am"), tile("11:00am")], captured_at=started + 90)
+
+    assert store.available(SATURDAY).format_summary() == ["Adult Rm. 1 - Saturday, January 11, 2025: 10:00am, 11:00am"]
+    assert store._conn.execute("SELECT COUNT(*) FROM states").fetchone()[0] == 4
+    assert not store.is_fresh(SATURDAY)  # Last capture was almost an hour ago
+    assert store.is_fresh(SATURDAY, max_age=7200)
+
+    patterns = store.release_patterns("adult rm. 1")
+    assert patterns["events"] == 1
+    freed = datetime.datetime.fromtimestamp(started + 90)
+    assert patterns["busiest"] == [{"weekday": freed.strftime("%A"), "hour": freed.hour, "count": 1}]
+
+def test_compaction_drops_dates_past_retention(tmp_path):
+    store = AvailabilityStore(path=str(tmp_path / "availability.db"), retention_days=30)
+    old_day = datetime.date.today() - datetime.timedelta(days=60)
+    today = datetime.date.today()
+    store.record([old_day, today], [tile("10:00am", date=old_day), tile("10:00am", date=today)])
+
+    assert store.compact() == {"tiles": 1, "states": 1}
+    assert store.age_seconds(old_day) is None
+    assert len(store.available(today)) == 1
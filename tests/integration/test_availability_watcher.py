@@ -0,0 +1,65 @@
+import datetime
+
+from core.availability_watcher import AvailabilityWatcher, PollSchedule
+from core.http_booking_engine import HttpBookingEngine
+from models.booking_request import BookingRequest, Credentials
+from tests.libcal_standin.server import LibCalStandIn
+
+SATURDAY = datetime.date(2025, 1, 11)
+TEN_AM = datetime.datetime(2025, 1, 11, 10)
+
+def make_request(url: str) -> BookingRequest:
+    return BookingRequest(
+        target_date=SATURDAY,
+        time_slots=["10:00am"],
+        room_name="Adult Rm. 1",
+        party_size=2,
+        user_credentials=Credentials(card_number="21234567890123", pin="1234"),
+        booking_url=url,
+    )
+
+def test_cancelled_slot_is_booked_on_the_next_poll():
+    with LibCalStandIn(taken=[("Adult Rm. 1", TEN_AM)]) as server:
+        delays = []
+
+        def sleep(seconds):
+            delays.append(seconds)
+            if len(delays) == 2:
+                with server.lock:
+                    server.booked.clear()  # Someone cancels
+
+        watcher = AvailabilityWatcher(HttpBookingEngine(browser_fallback=False), make_request(server.booking_url),
+                                      rooms=["Adult Rm. 1"], dates=[SATURDAY], sleep=sleep,
+                                      schedule=PollSchedule(base_seconds=1, fast_seconds=1, release_times=[], min_interval=1))
+        results = watcher.run(max_polls=5)
+
+    assert [r.success for r in results] == [True]
+    assert watcher.polls == 3 and not watcher.pending
+    assert len(server.confirmed) == 1
+    # Warmed up (and logged in) before the slot freed up
+    assert server.request_log.index(("POST", "/spaces/auth")) < server.request_log.index(("POST", "/spaces/availability/booking/add"))
+
+def test_poll_errors_back_off_and_recover():
+    with LibCalStandIn(taken=[("Adult Rm. 1", TEN_AM)], failures={"/spaces/availability/grid": 3}) as server:
+        delays = []
+        watcher = AvailabilityWatcher(HttpBookingEngine(browser_fallback=False), make_request(server.booking_url),
+                                      rooms=["Adult Rm. 1"], dates=[SATURDAY], sleep=delays.append,
+                                      schedule=PollSchedule(base_seconds=1, fast_seconds=1, release_times=[], min_interval=0, max_backoff=60))
+        watcher.run(max_polls=5)
+
+    assert watcher.errors == 0 and watcher.snapshot
+    # Backoff ceilings of 1, 2 and 4 seconds, then the normal interval again
+    assert 2 <= delays[2] <= 4 and delays[3] <= 1.1
+
+def test_malformed_grid_counts_as_a_failed_poll(monkeypatch):
+    with LibCalStandIn() as server:
+        day_slots = server.day_slots
+        responses = iter([[{"itemId": 1}]])  # No start or end
+        monkeypatch.setattr(server, "day_slots", lambda day: next(responses, None) or day_slots(day))
+        watcher = AvailabilityWatcher(HttpBookingEngine(browser_fallback=False), make_request(server.booking_url),
+                                      rooms=["Adult Rm. 1"], dates=[SATURDAY], sleep=lambda seconds: None,
+                                      schedule=PollSchedule(base_seconds=1, fast_seconds=1, release_times=[], min_interval=0))
+        results = watcher.run(max_polls=3)
+
+    assert [r.success for r in results] == [True]
+    assert watcher.polls == 2 and not watcher.pending
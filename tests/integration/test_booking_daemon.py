@@ -0,0 +1,74 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from core.booking_daemon import BookingDaemon
+from core.http_booking_engine import HttpBookingEngine
+from services.daemon_client import DaemonClient
+from tests.libcal_standin.server import LibCalStandIn
+
+def test_streams_results_and_serializes_the_same_room(monkeypatch, tmp_path):
+    monkeypatch.setenv("LIBRARY_CARD_NUMBER_ROBOTICS", "21234567890123")
+    monkeypatch.setenv("LIBRARY_PIN_ROBOTICS", "1234")
+    token_path = str(tmp_path / "daemon.token")
+    with LibCalStandIn() as server, BookingDaemon(HttpBookingEngine(browser_fallback=False), port=0, max_workers=2,
+                                                  booking_url=server.booking_url, token_path=token_path) as daemon:
+        client = DaemonClient(port=daemon.server.server_address[1], timeout=30, token_path=token_path)
+        assert client.health()["workers"] == 2
+
+        def job(times):
+            return {"date": "2025-01-11", "times": times, "room": "Adult Rm. 1", "party_size": 4,
+                    "profile": "robotics"}
+
+        # Two overlapping requests for one room: run one after the other, so the second loses 11:00am cleanly
+        streams = {}
+        threads = [threading.Thread(target=lambda times=times: streams.__setitem__(times, list(client.book(job(times)))))
+                   for times in ("10:00am,11:00am", "11:00am,12:00pm")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        availability = client.availability("2025-01-11", "Adult Rm. 1")
+
+    for events in streams.values():
+        assert [e["event"] for e in events][:2] == ["queued", "started"]
+        assert events[-1]["event"] == "done"
+    results = [e for events in streams.values() for e in events if e["event"] == "result"]
+    assert sorted(r["success"] for r in results) == [False, True, True, True]
+    assert len(server.confirmed) == 2
+    assert "11:00am" not in availability["slots"][0]
+
+def test_api_needs_the_token_and_json_and_books_only_on_its_own_site(monkeypatch, tmp_path):
+    monkeypatch.setenv("LIBRARY_CARD_NUMBER", "21234567890123")
+    monkeypatch.setenv("LIBRARY_PIN", "1234")
+    token_path = tmp_path / "daemon.token"
+    job = {"date": "2025-01-11", "times": "10:00am", "room": "Adult Rm. 1"}
+    with LibCalStandIn() as server, LibCalStandIn() as elsewhere, \
+            BookingDaemon(HttpBookingEngine(browser_fallback=False), port=0, booking_url=server.booking_url,
+                          token_path=str(token_path)) as daemon:
+        port = daemon.server.server_address[1]
+        assert token_path.stat().st_mode & 0o777 == 0o600
+
+        def post(path, body, headers):
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            connection.request("POST", path, body=body, headers=headers)
+            status = connection.getresponse().status
+            connection.close()
+            return status
+
+        token = {"Authorization": f"Bearer {token_path.read_text()}"}
+        # A cross-site form or fetch: no token, and text/plain
+        assert post("/bookings", json.dumps(job), {"Content-Type": "text/plain"}) == 401
+        assert post("/shutdown", "{}", {"Content-Type": "application/json"}) == 401
+        assert post("/bookings", json.dumps(job), {**token, "Content-Type": "text/plain"}) == 415
+
+        client = DaemonClient(port=port, timeout=30, token_path=str(token_path))
+        with pytest.raises(RuntimeError, match="booking_url"):
+            list(client.book({**job, "booking_url": elsewhere.booking_url}))
+        assert client.health() is not None and not daemon._stopped.is_set()
+
+    assert elsewhere.request_log == []  # The card never left for the other site
+    assert not token_path.exists()
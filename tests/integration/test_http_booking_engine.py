@@ -0,0 +1,124 @@
+import dataclasses
+import datetime
+
+import pytest
+
+from core.http_booking_engine import HttpBookingEngine
+from core.retry import RetryPolicy
+from models.booking_request import BookingPreferences, BookingRequest, Credentials
+from tests.libcal_standin.server import LibCalStandIn
+
+TARGET_DATE = datetime.date(2025, 1, 11)
+CREDENTIALS = Credentials(card_number="21234567890123", pin="1234")
+
+@pytest.fixture
+def standin():
+    with LibCalStandIn(taken={("Adult Rm. 1", datetime.datetime(2025, 1, 11, 12))}) as server:
+        yield server
+
+def make_request(url: str, times, credentials: Credentials = CREDENTIALS) -> BookingRequest:
+    return BookingRequest(
+        target_date=TARGET_DATE,
+        time_slots=times,
+        room_name="Adult Rm. 1",
+        party_size=4,
+        user_credentials=credentials,
+        booking_url=url,
+    )
+
+def test_books_all_slots_in_one_submission(standin):
+    results = HttpBookingEngine(browser_fallback=False).execute_booking(make_request(standin.booking_url, ["10:00am", "11:00am"]))
+
+    assert [r.success for r in results] == [True, True]
+    assert len(standin.confirmed) == 1
+    assert standin.confirmed[0]["party_size"] == 4
+    assert len(standin.confirmed[0]["slots"]) == 2
+    assert results[0].booking_id == standin.confirmed[0]["book_id"]
+
+def test_taken_slot_fails_without_blocking_others(standin):
+    results = HttpBookingEngine(browser_fallback=False).execute_booking(make_request(standin.booking_url, ["12:00pm", "1:00pm"]))
+
+    by_slot = {r.details["slot"].split(" ")[0]: r for r in results}
+    assert not by_slot["12:00pm"].success
+    assert "Failed to select time slot" in by_slot["12:00pm"].error_message
+    assert by_slot["1:00pm"].success
+
+def test_bad_credentials_report_login_failure(standin):
+    request = make_request(standin.booking_url, ["10:00am"], Credentials(card_number="21234567890123", pin="9999"))
+    results = HttpBookingEngine(browser_fallback=False).execute_booking(request)
+
+    assert [r.error_message for r in results] == ["Login failed."]
+    assert standin.confirmed == []
+
+def test_protocol_error_without_fallback_fails_every_slot(standin):
+    results = HttpBookingEngine(browser_fallback=False).execute_booking(make_request(f"{standin.base_url}/missing?lid=1&gid=2", ["10:00am", "11:00am"]))
+
+    assert len(results) == 2
+    assert all(not r.success and r.error_message.startswith("HTTP booking failed") for r in results)
+
+def test_malformed_grid_fails_over_like_a_protocol_error(standin, monkeypatch):
+    monkeypatch.setattr(standin, "day_slots", lambda day: [{"itemId": "not-a-room"}])
+    fallbacks = []
+    engine = HttpBookingEngine()
+    monkeypatch.setattr(engine, "_fallback_to_browser", lambda request, labels, reason: fallbacks.append((labels, reason)) or [])
+
+    engine.execute_booking(make_request(standin.booking_url, ["10:00am", "11:00am"]))
+
+    [(labels, reason)] = fallbacks
+    assert len(labels) == 2 and "Malformed availability grid" in reason
+
+def test_list_availability_indexes_grid(standin):
+    index = HttpBookingEngine().list_availability(standin.booking_url, TARGET_DATE)
+
+    assert index.is_available("Adult Rm. 1", TARGET_DATE, "11:00am")
+    assert not index.is_available("Adult Rm. 1", TARGET_DATE, "12:00pm")
+    assert index.rooms() == ["Adult Rm. 1", "Adult Rm. 2", "Adult Rm. 3"]
+    assert index.format_summary("Adult Rm. 1")[0].startswith("Adult Rm. 1 - Saturday, January 11, 2025: 9:00am, 10:00am, 11:00am, 1:00pm")
+
+def test_transient_failure_is_retried_on_the_same_session(monkeypatch):
+    monkeypatch.setattr(RetryPolicy, "delay", lambda self, retry: 0.0)
+    with LibCalStandIn(failures={"/ajax/space/times": 2}) as server:
+        results = HttpBookingEngine(browser_fallback=False).execute_booking(make_request(server.booking_url, ["10:00am", "11:00am"]))
+
+    assert [r.success for r in results] == [True, True]
+    assert results[0].details["retried_steps"] == {"submit_times": 2}
+    # Resumed at Submit Times: the grid and cart were not loaded again
+    assert server.request_log.count(("POST", "/spaces/availability/grid")) == 1
+    assert server.request_log.count(("POST", "/spaces/availability/booking/add")) == 2
+
+def test_taken_slot_is_not_retried(monkeypatch):
+    monkeypatch.setattr(RetryPolicy, "delay", lambda self, retry: 0.0)
+    contested = [("Adult Rm. 1", datetime.datetime(2025, 1, 11, 10))]
+    with LibCalStandIn(contested=contested) as server:
+        results = HttpBookingEngine(browser_fallback=False).execute_booking(make_request(server.booking_url, ["10:00am"]))
+
+    assert not results[0].success
+    assert results[0].details["retries"] == 0
+    assert server.request_log.count(("POST", "/spaces/availability/booking/add")) == 1
+
+def test_preferences_fall_back_to_the_next_option_without_rereading_the_grid():
+    saturday = datetime.datetime(2025, 1, 11)
+    # The preferred room's only free block is lost to a rival as it is added to the cart
+    taken = [("Adult Rm. 1", saturday.replace(hour=h)) for h in (10, 11)]
+    contested = [("Adult Rm. 1", saturday.replace(hour=h)) for h in (12, 13)]
+    with LibCalStandIn(taken=taken, contested=contested) as server:
+        request = make_request(server.booking_url, [])
+        request.preferences = BookingPreferences(rooms=["Adult Rm. 1", "Adult Rm. 2"], dates=[TARGET_DATE],
+                                                 window_start="10:00am", window_end="2:00pm", min_slots=2)
+        results = HttpBookingEngine(browser_fallback=False).execute_booking(request)
+
+    booked = [r for r in results if r.success]
+    assert len(booked) == 2
+    assert booked[0].details["plan"] == "Adult Rm. 2 on 2025-01-11 from 10:00am (2 slots)"
+    assert booked[0].details["failed_options"] == ["Adult Rm. 1 on 2025-01-11 from 12:00pm (2 slots)"]
+    assert server.request_log.count(("POST", "/spaces/availability/grid")) == 1
+
+def test_several_dates_share_one_client_and_a_parallel_grid_prefetch(standin):
+    dates = [TARGET_DATE, TARGET_DATE + datetime.timedelta(days=7)]
+    requests = [dataclasses.replace(make_request(standin.booking_url, ["10:00am"]), target_date=date) for date in dates]
+    results = HttpBookingEngine(browser_fallback=False).execute_bookings(requests)
+
+    assert [r.success for r in results] == [True, True]
+    assert len(standin.confirmed) == 2
+    assert standin.request_log.count(("GET", "/spaces")) == 1
+    assert standin.request_log.count(("POST", "/spaces/availability/grid")) == 2
@@ -0,0 +1,31 @@
+import io
+import json
+
+from core.http_booking_engine import HttpBookingEngine
+from core.job_runner import JobRunner, load_jobs
+from tests.libcal_standin.server import LibCalStandIn
+
+def test_runs_jobs_concurrently_and_rejects_conflicts(tmp_path, monkeypatch):
+    monkeypatch.setenv("LIBRARY_CARD_NUMBER_ROBOTICS", "21234567890123")
+    monkeypatch.setenv("LIBRARY_PIN_ROBOTICS", "1234")
+    with LibCalStandIn() as server:
+        def job(room, times):
+            return {"date": "2025-01-11", "times": times, "room": room, "party_size": 4,
+                    "profile": "robotics", "booking_url": server.booking_url}
+        jobs_file = tmp_path / "jobs.json"
+        jobs_file.write_text(json.dumps({"jobs": [
+            job("Adult Rm. 1", "10:00am,11:00am"),
+            job("Adult Rm. 2", "10:00am"),
+            job("Adult Rm. 1", "10:00am,11:00am"),   # duplicate of job-1
+            job("Adult Rm. 1", "11:00am,12:00pm"),   # overlaps job-1
+            job("Adult Rm. 1", "3:00pm"),
+        ]}))
+
+        output = io.StringIO()
+        outcomes = JobRunner(HttpBookingEngine(browser_fallback=False), max_workers=3, output=output).run(load_jobs(str(jobs_file)))
+
+    statuses = {o.job.job_id: o.status for o in outcomes}
+    assert statuses == {"job-1": "booked", "job-2": "booked", "job-3": "duplicate", "job-4": "conflict", "job-5": "booked"}
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(line["job_id"] for line in lines) == sorted(statuses)
+    assert len(server.confirmed) == 3
@@ -0,0 +1,47 @@
+import datetime
+import time
+
+from core.http_booking_engine import HttpBookingEngine
+from models.booking_request import BookingRequest, Credentials
+from tests.libcal_standin.server import LibCalStandIn
+
+SATURDAY = datetime.date(2025, 1, 11)
+
+def make_request(url: str, times) -> BookingRequest:
+    return BookingRequest(
+        target_date=SATURDAY,
+        time_slots=times,
+        room_name="Adult Rm. 1",
+        party_size=2,
+        user_credentials=Credentials(card_number="21234567890123", pin="1234"),
+        booking_url=url,
+    )
+
+def test_rival_takes_contested_slot_at_add_to_cart():
+    contested = [("Adult Rm. 1", datetime.datetime(2025, 1, 11, 10))]
+    with LibCalStandIn(contested=contested) as server:
+        results = HttpBookingEngine(browser_fallback=False).execute_booking(make_request(server.booking_url, ["10:00am", "11:00am"]))
+
+    assert [r.success for r in results] == [False, True]
+    assert server.races_lost == 1
+
+def test_rival_takes_contested_slot_at_final_submit():
+    contested = [("Adult Rm. 1", datetime.datetime(2025, 1, 11, 11))]
+    with LibCalStandIn(contested=contested, race_at="book") as server:
+        results = HttpBookingEngine(browser_fallback=False).execute_booking(make_request(server.booking_url, ["10:00am", "11:00am"]))
+
+    assert not any(r.success for r in results)
+    assert "no longer available" in results[0].error_message
+    assert server.confirmed == []
+
+def test_latency_is_applied_per_endpoint_and_grid_is_rendered_for_the_date():
+    import requests
+
+    with LibCalStandIn(latency={"/spaces": 0.2}, taken=[("Adult Rm. 2", datetime.datetime(2025, 1, 12, 9))]) as server:
+        started = time.perf_counter()
+        page = requests.get(f"{server.booking_url}&date=2025-01-12").text
+        elapsed = time.perf_counter() - started
+
+    assert elapsed >= 0.2
+    assert "9:00am Sunday, January 12, 2025 - Adult Rm. 2 - Unavailable" in page
+    assert "9:00am Sunday, January 12, 2025 - Adult Rm. 1 - Available" in page
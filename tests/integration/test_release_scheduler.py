@@ -0,0 +1,53 @@
+import datetime
+
+from core.http_booking_engine import HttpBookingEngine
+from core.release_scheduler import ReleaseScheduler, measure_clock_offset
+from models.booking_request import BookingRequest, Credentials
+from tests.libcal_standin.server import LibCalStandIn
+
+def test_clock_offset_against_local_server_is_small():
+    with LibCalStandIn() as server:
+        assert abs(measure_clock_offset(server.booking_url)) < 0.5
+
+def test_fires_prepared_booking_at_release_time():
+    with LibCalStandIn() as server:
+        request = BookingRequest(
+            target_date=datetime.date(2025, 1, 11),
+            time_slots=["10:00am", "11:00am"],
+            room_name="Adult Rm. 1",
+            party_size=4,
+            user_credentials=Credentials(card_number="21234567890123", pin="1234"),
+            booking_url=server.booking_url,
+        )
+        release_at = (datetime.datetime.now() + datetime.timedelta(seconds=2)).replace(microsecond=0)
+
+        results = ReleaseScheduler(release_at, lead_seconds=1).run(HttpBookingEngine(browser_fallback=False), request)
+
+        assert [r.success for r in results] == [True, True]
+        timing = results[0].details["release_timing"]
+        assert 0 <= timing["fire_lateness_ms"] < 50
+        assert timing["first_click_ms"] <= timing["confirmation_ms"]
+        # The session logged in before the release, so booking skipped the login post
+        assert server.request_log.count(("POST", "/spaces/auth")) == 1
+        assert server.request_log.index(("POST", "/spaces/auth")) < server.request_log.index(("POST", "/spaces/availability/grid"))
+
+def test_prepared_booking_error_is_reported_as_a_failed_result(monkeypatch):
+    with LibCalStandIn() as server:
+        request = BookingRequest(
+            target_date=datetime.date(2025, 1, 11),
+            time_slots=["10:00am"],
+            room_name="Adult Rm. 1",
+            party_size=4,
+            user_credentials=Credentials(card_number="21234567890123", pin="1234"),
+            booking_url=server.booking_url,
+        )
+        engine = HttpBookingEngine(browser_fallback=False)
+        closed = []
+        monkeypatch.setattr(engine, "execute_prepared", lambda session, request: 1 / 0)
+        monkeypatch.setattr(engine, "close_session", closed.append)
+
+        results = ReleaseScheduler(datetime.datetime.now(), lead_seconds=0).run(engine, request)
+
+    assert [r.success for r in results] == [False]
+    assert results[0].error_message.startswith("Booking attempt failed: division by zero")
+    assert "release_timing" in results[0].details and len(closed) == 1
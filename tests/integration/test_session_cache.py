@@ -0,0 +1,71 @@
+import datetime
+
+import pytest
+
+from config import settings
+from core.http_booking_engine import HttpBookingEngine
+from models.booking_request import BookingRequest, Credentials
+from services.authentication_service import AuthenticationService
+from services.session_cache import SessionCache
+from tests.libcal_standin.server import LibCalStandIn
+
+CREDENTIALS = Credentials(card_number="21234567890123", pin="1234")
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY_PATH", str(tmp_path / "config" / "encryption.key"))
+    return SessionCache(path=str(tmp_path / "sessions.enc"), ttl_seconds=600)
+
+def make_request(url: str, time_slot: str) -> BookingRequest:
+    return BookingRequest(
+        target_date=datetime.date(2025, 1, 11),
+        time_slots=[time_slot],
+        room_name="Adult Rm. 1",
+        party_size=2,
+        user_credentials=CREDENTIALS,
+        booking_url=url,
+    )
+
+def test_second_booking_reuses_cached_session(cache):
+    with LibCalStandIn() as server:
+        first = HttpBookingEngine(browser_fallback=False, session_cache=cache).execute_booking(make_request(server.booking_url, "10:00am"))
+        # A new engine and cache object read the encrypted file written by the first run
+        reloaded = SessionCache(path=str(cache.path), ttl_seconds=600)
+        second = HttpBookingEngine(browser_fallback=False, session_cache=reloaded).execute_booking(make_request(server.booking_url, "11:00am"))
+
+    assert first[0].success and second[0].success
+    assert server.request_log.count(("POST", "/spaces/auth")) == 1
+    assert (cache.misses, reloaded.hits) == (1, 1)
+    assert CREDENTIALS.card_number.encode() not in cache.path.read_bytes()
+
+def test_rejected_cached_session_falls_back_to_login(cache):
+    with LibCalStandIn() as server:
+        HttpBookingEngine(browser_fallback=False, session_cache=cache).execute_booking(make_request(server.booking_url, "10:00am"))
+    # A restarted server has forgotten the session
+    with LibCalStandIn() as server:
+        results = HttpBookingEngine(browser_fallback=False, session_cache=cache).execute_booking(make_request(server.booking_url, "11:00am"))
+
+    assert results[0].success
+    assert cache.stats() == {"hits": 1, "misses": 1, "stale": 1}
+
+def test_credentials_round_trip_through_encryption(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY_PATH", str(tmp_path / ".key"))
+    auth_service = AuthenticationService()
+
+    token = auth_service.encrypt_credentials(CREDENTIALS)
+
+    assert CREDENTIALS.pin not in token
+    assert auth_service.decrypt_credentials(token) == CREDENTIALS
+
+def test_generated_key_is_owner_only_and_never_kept_beside_the_cache(tmp_path, monkeypatch):
+    key_path = tmp_path / "config" / "encryption.key"
+    monkeypatch.setattr(settings, "CREDENTIAL_ENCRYPTION_KEY", None)
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY_PATH", str(key_path))
+    monkeypatch.setattr(settings, "SESSION_CACHE_PATH", str(tmp_path / "cache" / "sessions.enc"))
+    AuthenticationService().encrypt_data(b"session")
+    assert key_path.stat().st_mode & 0o777 == 0o600
+
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY_PATH", str(tmp_path / "cache" / ".encryption_key"))
+    with pytest.raises(ValueError):
+        AuthenticationService().encrypt_data(b"session")
+    assert not (tmp_path / "cache" / ".encryption_key").exists()
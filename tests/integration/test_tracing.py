@@ -0,0 +1,62 @@
+import datetime
+import logging
+
+from core.http_booking_engine import HttpBookingEngine
+from models.booking_request import BookingRequest, Credentials
+from tests.libcal_standin.server import LibCalStandIn
+from utils.logger import JsonFormatter
+from utils.tracing import Tracer, read_logged_spans, tracer
+
+def make_request(url: str, times) -> BookingRequest:
+    return BookingRequest(
+        target_date=datetime.date(2025, 1, 11),
+        time_slots=times,
+        room_name="Adult Rm. 2",
+        party_size=3,
+        user_credentials=Credentials(card_number="21234567890123", pin="1234"),
+        booking_url=url,
+    )
+
+def test_each_attempt_is_traced_per_stage():
+    tracer.reset()
+    with LibCalStandIn() as server:
+        engine = HttpBookingEngine(browser_fallback=False)
+        engine.execute_booking(make_request(server.booking_url, ["10:00am", "11:00am"]))
+        engine.execute_booking(make_request(server.booking_url, ["1:00pm"]))
+
+    spans = tracer.spans()
+    assert [s.name for s in spans if s.trace_id == spans[0].trace_id] == [
+        "navigate", "grid", "select", "select", "submit_times", "login", "form_fill", "final_submit",
+    ]
+    assert all(s.status == "ok" and s.attributes["room"] == "Adult Rm. 2" for s in spans)
+    assert spans[2].attributes["slot"].startswith("10:00am Saturday")
+
+    rows = {row["stage"]: row for row in tracer.summary()}
+    assert list(rows)[:3] == ["navigate", "grid", "select"]
+    assert rows["select"]["attempts"] == 2  # Both selections of the first attempt count as one
+    assert rows["final_submit"]["total_ms"] >= rows["final_submit"]["max_ms"] > 0
+
+def test_profile_aggregates_spans_logged_by_earlier_runs(tmp_path):
+    formatter = JsonFormatter()
+    def log_lines(run: Tracer, durations) -> str:
+        lines = []
+        for duration in durations:
+            with run.trace(room="Adult Rm. 2"):
+                span = run.record("grid", duration)
+            record = logging.makeLogRecord({"msg": "span", "span": {**span.as_dict(), "run": span.run_id}})
+            lines.append(formatter.format(record))
+        return "\n".join(lines) + "\n"
+
+    earlier, previous, current = Tracer(), Tracer(), Tracer()
+    log_file = tmp_path / "booking.log"
+    (tmp_path / "booking.log.1").write_text(log_lines(earlier, [100.0, 300.0]))  # Rotated out, older
+    log_file.write_text(log_lines(previous, [200.0]) + '2025-01-11 10:00:00,000 - INFO - a text line\n'
+                        + log_lines(current, [999.0]))
+    current.record("grid", 400.0)  # Not logged yet; this run's spans come from memory, not the file
+
+    spans = read_logged_spans(str(log_file), exclude_run=current.run_id)
+    assert [s.duration_ms for s in spans] == [100.0, 300.0, 200.0]
+    assert spans[0].attributes == {"room": "Adult Rm. 2"}
+
+    grid, = current.summary(spans + current.spans())
+    assert grid["attempts"] == 5 and grid["max_ms"] == 999.0 and grid["total_ms"] == 1999.0
@@ -0,0 +1,422 @@
+# Local stand-in for the LibCal spaces endpoints, for offline engine tests
+import datetime
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+DEFAULT_ROOMS = {101: "Adult Rm. 1", 102: "Adult Rm. 2", 103: "Adult Rm. 3"}
+SESSION_COOKIE = "lc_standin_session"
+
+# Page assets referenced by spaces.html, sized roughly like the real site's: (content type, bytes)
+ASSETS = {
+    "/assets/library-logo.png": ("image/png", 60_000),
+    "/assets/study-room.jpg": ("image/jpeg", 180_000),
+    "/assets/lato.woff2": ("font/woff2", 45_000),
+    "/assets/libcal.css": ("text/css", 30_000),
+    "/gtag/js": ("application/javascript", 90_000),
+}
+
+def load_fixture(name: str) -> Template:
+    return Template((FIXTURES_DIR / name).read_text(encoding="utf-8"))
+
+def time_label(start: datetime.datetime) -> str:
+    return start.strftime("%I:%M%p").lstrip("0").lower()
+
+def tile_label(start: datetime.datetime, room_name: str, available: bool) -> str:
+    """The aria-label LibCal puts on a grid tile."""
+    status = "Available" if available else "Unavailable"
+    return f"{time_label(start)} {start:%A, %B} {start.day}, {start:%Y} - {room_name} - {status}"
+
+class LibCalStandIn:
+    """
+    In-process server mimicking the LibCal spaces flow used by LibCalClient and
+    the browser engine: spaces page with a script-rendered tile grid, add-to-cart,
+    Submit Times, login, booking form and confirmation.
+
+    `latency` delays every non-asset response (seconds, or {path: seconds}).
+    `contested` slots show as available but a rival patron takes them when they
+    are added to the cart (`race_at="add"`) or when the booking is submitted
+    (`race_at="book"`).
+
+    Usage:
+        with LibCalStandIn(taken={("Adult Rm. 1", datetime.datetime(2025, 1, 11, 10))}) as server:
+            request = BookingRequest(..., booking_url=server.booking_url)
+    """
+    lid = 13172
+    gid = 27150
+
+    def __init__(
+        self,
+        rooms: Optional[Dict[int, str]] = None,
+        taken: Iterable[Tuple[str, datetime.datetime]] = (),
+        card_number: str = "21234567890123",
+        pin: str = "1234",
+        open_hour: int = 9,
+        close_hour: int = 20,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        asset_delay: float = 0.0,
+        latency: Union[float, Dict[str, float]] = 0.0,
+        contested: Iterable[Tuple[str, datetime.datetime]] = (),
+        race_at: str = "add",
+        grid_start: Optional[datetime.date] = None,
+        grid_days: int = 7,
+        grid_render_delay: float = 0.0,
+        failures: Optional[Dict[str, int]] = None,
+    ):
+        self.asset_delay = asset_delay  # Seconds per page asset, to mimic CDN and tracker latency
+        self.latency = latency
+        self.race_at = race_at
+        self.grid_start = grid_start  # First day on the spaces page grid (default: today)
+        self.grid_days = grid_days
+        self.grid_render_delay = grid_render_delay  # Like LibCal's AJAX grid, tiles appear after the page
+        self.rooms = dict(rooms or DEFAULT_ROOMS)
+        self.card_number = card_number
+        self.pin = pin
+        self.open_hour = open_hour
+        self.close_hour = close_hour
+        self.lock = threading.Lock()
+        self.booked: Set[Tuple[int, datetime.datetime]] = set()
+        self.sessions: Dict[str, dict] = {}
+        self.confirmed: List[dict] = []
+        self.request_log: List[Tuple[str, str]] = []
+        room_ids = {name: eid for eid, name in self.rooms.items()}
+        for room_name, start in taken:
+            self.booked.add((room_ids[room_name], start))
+        self.contested: Set[Tuple[int, datetime.datetime]] = {(room_ids[name], start) for name, start in contested}
+        self.races_lost = 0  # Contested slots taken by the rival
+        self.failures = dict(failures or {})  # Path -> requests answered with HTTP 503 before it recovers
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def booking_url(self) -> str:
+        return f"{self.base_url}/spaces?lid={self.lid}&gid={self.gid}"
+
+    def start(self) -> "LibCalStandIn":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "LibCalStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -- Fake LibCal state --
+
+    def day_slots(self, day: datetime.date) -> List[dict]:
+        slots = []
+        for eid in self.rooms:
+            for hour in range(self.open_hour, self.close_hour):
+                start = datetime.datetime.combine(day, datetime.time(hour))
+                slot = {
+                    "start": start.strftime("%Y-%m-%d %H:%M:%S"),
+                    "end": (start + datetime.timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S"),
+                    "itemId": eid,
+                    "checksum": self.checksum(eid, start),
+                }
+                if (eid, start) in self.booked:
+                    slot["className"] = "s-lc-eq-checkout"
+                slots.append(slot)
+        return slots
+
+    def latency_for(self, path: str) -> float:
+        if isinstance(self.latency, dict):
+            return self.latency.get(path, 0.0)
+        return self.latency
+
+    def take_if_contested(self, keys: Iterable[Tuple[int, datetime.datetime]], stage: str) -> bool:
+        """Lets the rival take any contested slot among `keys` at `stage`. Returns True if one was taken."""
+        if stage != self.race_at:
+            return False
+        lost = [key for key in keys if key in self.contested]
+        for key in lost:
+            self.contested.discard(key)
+            self.booked.add(key)
+            self.races_lost += 1
+        return bool(lost)
+
+    def take_failure(self, path: str) -> bool:
+        """Returns True (and counts it) if this request to `path` should fail with HTTP 503."""
+        if self.failures.get(path, 0) <= 0:
+            return False
+        self.failures[path] -= 1
+        return True
+
+    def grid_tiles(self, first_day: datetime.date) -> List[dict]:
+        """Tiles shown on the spaces page, in the shape its grid script renders."""
+        tiles = []
+        for offset in range(self.grid_days):
+            day = first_day + datetime.timedelta(days=offset)
+            for eid, room_name in self.rooms.items():
+                for hour in range(self.open_hour, self.close_hour):
+                    start = datetime.datetime.combine(day, datetime.time(hour))
+                    available = (eid, start) not in self.booked
+                    tiles.append({
+                        "eid": eid,
+                        "start": start.strftime("%Y-%m-%d %H:%M"),
+                        "checksum": self.checksum(eid, start),
+                        "available": available,
+                        "label": tile_label(start, room_name, available),
+                    })
+        return tiles
+
+    @staticmethod
+    def checksum(eid: int, start: datetime.datetime) -> str:
+        return f"{eid:x}{start:%Y%m%d%H%M}"
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(StandInRequestHandler):
+            server_state = standin
+
+        return Handler
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real site
+    disable_nagle_algorithm = True  # Avoid 40 ms delayed-ACK stalls between header and body writes
+    server_state: LibCalStandIn = None
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+    # -- Plumbing --
+
+    def _session(self) -> dict:
+        self._new_session = False
+        cookies = self.headers.get("Cookie", "")
+        for part in cookies.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == SESSION_COOKIE and value in self.server_state.sessions:
+                self._session_id = value
+                return self.server_state.sessions[value]
+        self._session_id = secrets.token_hex(8)
+        self._new_session = True
+        session = {"cart": [], "times_submitted": False, "logged_in": False, "form_session": None}
+        self.server_state.sessions[self._session_id] = session
+        return session
+
+    def _form(self) -> Dict[str, List[str]]:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        return parse_qs(body, keep_blank_values=True)
+
+    def _send(self, status: int, body, content_type: str = "text/html; charset=utf-8", headers: Optional[dict] = None) -> None:
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if self._new_session:
+            self.send_header("Set-Cookie", f"{SESSION_COOKIE}={self._session_id}; Path=/")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, payload) -> None:
+        self._send(status, json.dumps(payload), "application/json")
+
+    @staticmethod
+    def _bookings_from_form(form: Dict[str, List[str]]) -> List[dict]:
+        entries: Dict[int, dict] = {}
+        for key, values in form.items():
+            if key.startswith("bookings["):
+                index, field = key[len("bookings["):].rstrip("]").split("][")
+                entries.setdefault(int(index), {})[field] = values[0]
+        return [entries[i] for i in sorted(entries)]
+
+    # -- Routing --
+
+    def _delay(self, path: str) -> None:
+        # Outside the lock, so slow responses overlap like they would on the real site
+        delay = self.server_state.latency_for(path)
+        if delay:
+            time.sleep(delay)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path in ASSETS:
+            self._get_asset(parsed.path)  # Outside the lock so slow assets do not stall the booking flow
+            return
+        self._delay(parsed.path)
+        with self.server_state.lock:
+            session = self._session()
+            self.server_state.request_log.append(("GET", parsed.path))
+            if self.server_state.take_failure(parsed.path):
+                self._send(503, "Service temporarily unavailable")
+            elif parsed.path == "/spaces":
+                self._get_spaces(parse_qs(parsed.query))
+            elif parsed.path == "/spaces/auth":
+                if session["logged_in"]:
+                    # Already signed in: LibCal goes straight on to the booking form
+                    self._send(302, "", headers={"Location": "/spaces/booking/form"})
+                else:
+                    self._send(200, load_fixture("login.html").substitute(error=""))
+            elif parsed.path == "/spaces/booking/form":
+                self._get_booking_form(session)
+            else:
+                self._send(404, "Not found")
+
+    def do_HEAD(self):
+        # Used for clock sync; send_response() adds the Date header
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        form = self._form()
+        self._delay(parsed.path)
+        with self.server_state.lock:
+            session = self._session()
+            self.server_state.request_log.append(("POST", parsed.path))
+            routes = {
+                "/spaces/availability/grid": self._post_grid,
+                "/spaces/availability/booking/add": self._post_add_to_cart,
+                "/ajax/space/times": self._post_submit_times,
+                "/spaces/auth": self._post_login,
+                "/ajax/space/book": self._post_book,
+            }
+            handler = routes.get(parsed.path)
+            if self.server_state.take_failure(parsed.path):
+                self._send_json(503, {"error": "Service temporarily unavailable."})
+            elif handler is None:
+                self._send(404, "Not found")
+            else:
+                handler(session, form)
+
+    # -- Endpoints --
+
+    def _get_asset(self, path: str):
+        with self.server_state.lock:
+            self.server_state.request_log.append(("GET", path))
+        self._new_session = False
+        if self.server_state.asset_delay:
+            time.sleep(self.server_state.asset_delay)
+        content_type, size = ASSETS[path]
+        self._send(200, b"\0" * size, content_type, headers={"Cache-Control": "no-store"})
+
+    def _get_spaces(self, query: Dict[str, List[str]]):
+        state = self.server_state
+        resources = "\n".join(
+            f'resources.push({{ id: "eid_{eid}", title: "{name}", capacity: 10 }});'
+            for eid, name in state.rooms.items()
+        )
+        if query.get("date"):
+            first_day = datetime.date.fromisoformat(query["date"][0])
+        else:
+            first_day = state.grid_start or datetime.date.today()
+        self._send(200, load_fixture("spaces.html").substitute(
+            resources=resources, lid=state.lid, gid=state.gid,
+            grid_tiles=json.dumps(state.grid_tiles(first_day)),
+            grid_delay_ms=int(state.grid_render_delay * 1000),
+        ))
+
+    def _render_booking_form(self, session: dict) -> str:
+        session["form_session"] = session["form_session"] or secrets.token_hex(6)
+        options = "\n".join(f'    <option value="{n}">{n}</option>' for n in range(1, 11))
+        return load_fixture("booking_form.html").substitute(session=session["form_session"], party_options=options)
+
+    def _get_booking_form(self, session: dict):
+        if not session["logged_in"]:
+            self._send(302, "", headers={"Location": "/spaces/auth"})
+            return
+        self._send(200, self._render_booking_form(session))
+
+    def _post_grid(self, session: dict, form):
+        day = datetime.date.fromisoformat(form["start"][0])
+        self._send_json(200, {"slots": self.server_state.day_slots(day), "isPreCreatedBooking": False})
+
+    def _post_add_to_cart(self, session: dict, form):
+        state = self.server_state
+        eid = int(form["add[eid]"][0])
+        start = datetime.datetime.strptime(form["add[start]"][0], "%Y-%m-%d %H:%M")
+        if eid not in state.rooms or form["add[checksum]"][0] != state.checksum(eid, start):
+            self._send_json(400, {"error": "Invalid slot."})
+            return
+        if (eid, start) in state.booked or state.take_if_contested([(eid, start)], "add"):
+            self._send_json(400, {"error": "Sorry, this time slot is no longer available."})
+            return
+        session["cart"].append({
+            "id": len(session["cart"]) + 1,
+            "eid": eid,
+            "gid": state.gid,
+            "lid": state.lid,
+            "start": start.strftime("%Y-%m-%d %H:%M:%S"),
+            "end": (start + datetime.timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S"),
+            "checksum": state.checksum(eid, start),
+        })
+        self._send_json(200, {"bookings": session["cart"]})
+
+    def _post_submit_times(self, session: dict, form):
+        if not self._bookings_from_form(form) or not session["cart"]:
+            self._send_json(400, {"error": "No times selected."})
+            return
+        session["times_submitted"] = True
+        self._send_json(200, {"redirect": "/spaces/auth"})
+
+    def _post_login(self, session: dict, form):
+        state = self.server_state
+        if form.get("username", [""])[0] != state.card_number or form.get("password", [""])[0] != state.pin:
+            error = '<div class="alert alert-danger">Invalid library card number or PIN.</div>'
+            self._send(200, load_fixture("login.html").substitute(error=error))
+            return
+        session["logged_in"] = True
+        # Like LibCal, a successful login lands on the booking form
+        self._send(200, self._render_booking_form(session))
+
+    def _post_book(self, session: dict, form):
+        state = self.server_state
+        if not session["logged_in"] or not session["times_submitted"]:
+            self._send_json(403, {"error": "Session expired. Please start again."})
+            return
+        if form.get("session", [""])[0] != session["form_session"]:
+            self._send_json(400, {"error": "Invalid form session."})
+            return
+        if form.get("formData[q14992[]]", [""])[0] != "I agree":
+            self._send_json(400, {"error": "You must agree to the terms."})
+            return
+        party_size = form.get("formData[q16700]", [""])[0]
+        if not party_size.isdigit() or not 1 <= int(party_size) <= 10:
+            self._send_json(400, {"error": "Please select the number of people."})
+            return
+
+        wanted = [(entry["eid"], datetime.datetime.strptime(entry["start"], "%Y-%m-%d %H:%M:%S")) for entry in session["cart"]]
+        if any(key in state.booked for key in wanted) or state.take_if_contested(wanted, "book"):
+            self._send_json(400, {"error": "Sorry, one or more of your times is no longer available."})
+            return
+        state.booked.update(wanted)
+
+        book_id = f"cs_{secrets.token_hex(4)}"
+        items = "\n".join(
+            f"    <li>{state.rooms[eid]}: {time_label(start)} {start:%A, %B} {start.day}, {start:%Y}</li>"
+            for eid, start in wanted
+        )
+        state.confirmed.append({"book_id": book_id, "party_size": int(party_size), "slots": wanted})
+        session.update({"cart": [], "times_submitted": False, "form_session": None})
+        html = load_fixture("booking_success.html").substitute(book_id=book_id, booking_items=items)
+        self._send_json(200, {"bookId": book_id, "html": html})
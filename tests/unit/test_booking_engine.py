@@ -0,0 +1,158 @@
+import datetime
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from core.availability_index import AvailabilityIndex
+from core.booking_engine import BookingEngine
+from models.booking_request import BookingPreferences, BookingRequest, Credentials
+
+SATURDAY = datetime.date(2025, 1, 11)
+
+class FakeDriverService:
+    """The WebDriverService calls the batch flow makes, scripted per test."""
+
+    def __init__(self, taken=(), confirmed=True, confirmation_text="", grids=None):
+        self.taken = set(taken)
+        self.grids = grids or {}  # URL date -> aria-labels that page's grid shows
+        self.url = None
+        self.confirmed = confirmed
+        self.confirmation_text = confirmation_text
+        self.selected = []
+        self.calls = []
+        self.last_error = None
+        self.login_skipped = False
+        self.session_restored = False
+
+    def wait_for_grid(self):
+        self.calls.append("grid")
+
+    def navigate_to_page(self, url):
+        self.url = url
+        self.calls.append("navigate")
+
+    def build_availability_index(self):
+        date = self.url and parse_qs(urlparse(self.url).query).get("date", [None])[0]
+        return AvailabilityIndex.from_labels(self.grids.get(date, []))
+
+    def reload_page(self):
+        self.calls.append("reload")
+
+    def select_time_slot(self, label):
+        if label.split(" ", 1)[0] in self.taken:
+            self.last_error = Exception("This slot is no longer available.")
+            return False
+        self.selected.append(label)
+        return True
+
+    def submit_times(self):
+        self.calls.append("submit_times")
+        return True
+
+    def perform_login(self, credentials):
+        self.calls.append("login")
+        return True
+
+    def fill_booking_form(self, party_size):
+        self.calls.append("form_fill")
+        return True
+
+    def submit_final_booking(self):
+        self.calls.append("final_submit")
+        return True
+
+    def check_booking_confirmation(self):
+        return self.confirmed
+
+    def get_confirmation_text(self):
+        return self.confirmation_text
+
+    def dump_devtools_trace(self, path):
+        pass
+
+    def close_driver(self):
+        self.calls.append("close")
+
+def make_request(times) -> BookingRequest:
+    return BookingRequest(target_date=SATURDAY, time_slots=times, room_name="Adult Rm. 1", party_size=2,
+                          user_credentials=Credentials(card_number="21234567890123", pin="1234"))
+
+@pytest.fixture
+def engine():
+    return BookingEngine(batch_mode=True, tab_mode=False)
+
+def book_batch(engine, monkeypatch, service, times):
+    monkeypatch.setattr(engine, "_acquire_driver", lambda url, credentials=None: service)
+    request = make_request(times)
+    return engine._book_slots_batch(request, engine._generate_slot_labels(request))
+
+def test_batch_selects_every_slot_and_submits_once(engine, monkeypatch):
+    service = FakeDriverService(confirmation_text="Booked: Adult Rm. 1, 10:00am - 11:00am, 11:00am - 12:00pm")
+
+    results, fallback = book_batch(engine, monkeypatch, service, ["10:00am", "11:00am"])
+
+    assert [r.success for r in results] == [True, True] and fallback == []
+    assert all(r.details["listed_on_confirmation"] for r in results)
+    assert len(service.selected) == 2
+    assert service.calls == ["grid", "submit_times", "login", "form_fill", "final_submit", "close"]
+
+def test_taken_slot_fails_while_the_rest_of_the_batch_is_booked(engine, monkeypatch):
+    service = FakeDriverService(taken={"10:00am"}, confirmation_text="11:00am - 12:00pm")
+
+    results, fallback = book_batch(engine, monkeypatch, service, ["10:00am", "11:00am"])
+
+    assert [r.success for r in results] == [False, True] and fallback == []
+    assert results[0].error_message.startswith("Failed to select time slot")
+    assert results[0].details["retried_steps"] == {}
+
+def test_partial_confirmation_fails_only_the_unlisted_slot(engine, monkeypatch):
+    service = FakeDriverService(confirmation_text="Your booking: Adult Rm. 1 at 10:00am")
+
+    results, fallback = book_batch(engine, monkeypatch, service, ["10:00am", "11:00am"])
+
+    assert [r.success for r in results] == [True, False] and fallback == []
+    assert results[1].error_message == "Slot not listed on booking confirmation."
+    assert results[1].details["listed_on_confirmation"] is False
+
+def test_missing_confirmation_fails_every_slot_without_a_fallback(engine, monkeypatch):
+    service = FakeDriverService(confirmed=False)
+
+    results, fallback = book_batch(engine, monkeypatch, service, ["10:00am", "11:00am"])
+
+    assert [r.success for r in results] == [False, False] and fallback == []
+    assert all(r.error_message == "Booking submitted but confirmation not verified." for r in results)
+    assert service.calls.count("final_submit") == 1
+
+def test_confirmation_times_are_matched_whole(engine):
+    labels = engine._generate_slot_labels(make_request(["1:00pm", "11:00am"]))
+
+    results = engine._results_from_confirmation("11:00pm - 12:00am, 11:00am - 12:00pm", labels)
+
+    assert [r.success for r in results] == [False, True]
+
+def test_confirmation_without_any_times_is_trusted_for_every_slot(engine):
+    labels = engine._generate_slot_labels(make_request(["10:00am", "11:00am"]))
+
+    results = engine._results_from_confirmation("Thank you! Your booking is confirmed.", labels)
+
+    assert [r.success for r in results] == [True, True]
+    assert not any(r.details["listed_on_confirmation"] for r in results)
+
+def test_planned_booking_reads_each_preferred_date_past_the_first_grid(engine, monkeypatch):
+    later = SATURDAY + datetime.timedelta(days=10)
+    free_later = "10:00am Tuesday, January 21, 2025 - Adult Rm. 1 - Available"
+    service = FakeDriverService(grids={
+        SATURDAY.isoformat(): ["10:00am Saturday, January 11, 2025 - Adult Rm. 1 - Unavailable"],
+        later.isoformat(): [free_later],
+    }, confirmation_text="10:00am")
+    monkeypatch.setattr(engine, "_acquire_driver", lambda url, credentials=None: service.navigate_to_page(url) or service)
+    request = make_request([])
+    request.booking_url = "https://example.libcal.com/spaces?lid=1"
+    request.preferences = BookingPreferences(rooms=["Adult Rm. 1"], dates=[later, SATURDAY])
+
+    results = engine._book_planned(request)
+
+    assert [r.success for r in results] == [True]
+    assert service.selected == [free_later]
+    # Opened on the earliest date, then on the later one; booked there without another load
+    assert service.calls.count("navigate") == 2
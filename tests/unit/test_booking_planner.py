@@ -0,0 +1,60 @@
+import datetime
+
+from core.availability_index import AvailabilityIndex
+from core.booking_planner import BookingPlanner
+from models.booking_request import BookingPreferences
+
+SATURDAY = datetime.date(2025, 1, 11)
+SUNDAY = datetime.date(2025, 1, 12)
+
+def grid(free):
+    """AvailabilityIndex from {(room, date): ["10:00am", ...]}."""
+    labels = []
+    for (room, date), times in free.items():
+        dow = date.strftime("%A, %B ") + f"{date.day}, {date.year}"
+        labels.extend(f"{t} {dow} - {room} - Available" for t in times)
+    return AvailabilityIndex.from_labels(labels)
+
+def preferences(**overrides):
+    values = dict(rooms=["Adult Rm. 1", "Adult Rm. 2"], dates=[SATURDAY, SUNDAY],
+                  window_start="10:00am", window_end="2:00pm", min_slots=2)
+    values.update(overrides)
+    return BookingPreferences(**values)
+
+def test_prefers_a_block_in_one_room_on_the_preferred_day():
+    index = grid({
+        ("Adult Rm. 1", SATURDAY): ["10:00am", "12:00pm", "1:00pm"],
+        ("Adult Rm. 2", SATURDAY): ["9:00am", "10:00am", "11:00am"],
+        ("Adult Rm. 1", SUNDAY): ["10:00am", "11:00am", "12:00pm"],
+    })
+    plan = BookingPlanner(preferences()).plan(index)
+
+    # Room 1 from noon ranks before room 2 (less preferred room); 9:00am is outside the window
+    assert [option.describe() for option in plan.options[:3]] == [
+        "Adult Rm. 1 on 2025-01-11 from 12:00pm (2 slots)",
+        "Adult Rm. 2 on 2025-01-11 from 10:00am (2 slots)",
+        "Adult Rm. 1 on 2025-01-12 from 10:00am (2 slots)",
+    ]
+    assert plan.options[0].slot_labels() == [
+        "12:00pm Saturday, January 11, 2025 - Adult Rm. 1 - Available",
+        "1:00pm Saturday, January 11, 2025 - Adult Rm. 1 - Available",
+    ]
+
+def test_changes_rooms_only_when_no_single_room_fits():
+    index = grid({
+        ("Adult Rm. 1", SATURDAY): ["10:00am"],
+        ("Adult Rm. 2", SATURDAY): ["11:00am"],
+    })
+    plan = BookingPlanner(preferences(dates=[SATURDAY, SUNDAY], max_slots=3)).plan(index)
+
+    assert plan.options[0].slots == [("Adult Rm. 1", "10:00am"), ("Adult Rm. 2", "11:00am")]
+    assert "Adult Rm. 1 on 2025-01-11: longest free block in the window is 1 slot(s), need 2" in plan.rejected
+    assert "2025-01-12: no free slots on the grid" in plan.rejected
+
+def test_dates_whose_grid_was_not_loaded_are_not_reported_as_fully_booked():
+    index = grid({("Adult Rm. 1", SATURDAY): ["10:00am", "11:00am"]})
+    plan = BookingPlanner(preferences()).plan(index, loaded_dates={SATURDAY})
+
+    assert plan.options[0].date == SATURDAY
+    assert "2025-01-12: availability grid could not be loaded" in plan.rejected
+    assert "2025-01-12: no free slots on the grid" not in plan.rejected
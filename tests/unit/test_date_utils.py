@@ -0,0 +1,26 @@
+import datetime
+
+import pytest
+
+from core.date_utils import expand_dates
+from utils.urls import date_url
+
+WEDNESDAY = datetime.date(2025, 1, 8)
+
+def test_expands_ranges_and_recurrences_up_to_the_horizon():
+    assert expand_dates("every Saturday for 3 weeks", today=WEDNESDAY) == [
+        datetime.date(2025, 1, 11), datetime.date(2025, 1, 18), datetime.date(2025, 1, 25),
+    ]
+    assert expand_dates("every Saturday", today=WEDNESDAY, horizon_days=14) == [
+        datetime.date(2025, 1, 11), datetime.date(2025, 1, 18),
+    ]
+    # Ranges are clipped to today..horizon and merged with the other terms
+    assert expand_dates("2025-01-06..2025-01-10, Sunday", today=WEDNESDAY, horizon_days=14) == [
+        datetime.date(2025, 1, 8), datetime.date(2025, 1, 9), datetime.date(2025, 1, 10), datetime.date(2025, 1, 12),
+    ]
+    with pytest.raises(ValueError):
+        expand_dates("2025-02-01", today=WEDNESDAY, horizon_days=14)
+
+def test_date_url_replaces_the_date_parameter():
+    url = date_url("https://ylpl.libcal.com/spaces?lid=13172&gid=27150&date=2024-12-01", datetime.date(2025, 1, 11))
+    assert url == "https://ylpl.libcal.com/spaces?lid=13172&gid=27150&date=2025-01-11"
@@ -0,0 +1,73 @@
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import BoundedQueueHandler, JsonFormatter, TextFormatter, correlation, log_fields
+
+def make_record(message: str, level: int = logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("booking_system", level, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+def drain(log_queue: queue.Queue) -> list:
+    records = []
+    while not log_queue.empty():
+        records.append(log_queue.get_nowait())
+    return records
+
+def test_full_queue_drops_info_records_and_reports_how_many():
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, overflow="drop")
+
+    for i in range(4):
+        handler.handle(make_record(f"info {i}"))
+    assert handler.dropped == 2
+    assert [r.getMessage() for r in drain(log_queue)] == ["info 0", "info 1"]
+
+    handler.handle(make_record("after"))
+    after, notice = drain(log_queue)
+    assert after.getMessage() == "after"
+    assert notice.levelno == logging.WARNING and notice.fields == {"dropped": 2}
+    assert "Dropped 2 log record(s)" in notice.getMessage()
+
+def test_full_queue_keeps_warnings_by_waiting_for_room():
+    log_queue = queue.Queue(maxsize=1)
+    handler = BoundedQueueHandler(log_queue, overflow="drop")
+    handler.handle(make_record("info"))
+
+    freed = threading.Timer(0.05, log_queue.get_nowait)
+    freed.start()
+    handler.handle(make_record("warning", logging.WARNING))
+    freed.join()
+
+    assert handler.dropped == 0
+    assert [r.getMessage() for r in drain(log_queue)] == ["warning"]
+
+def test_records_carry_the_correlation_id_of_the_context_that_logged_them():
+    log_queue = queue.Queue()
+    handler = BoundedQueueHandler(log_queue)
+
+    def book(job_id: str) -> None:
+        with correlation(job_id):
+            handler.handle(make_record("booking", **log_fields(slot="10:00am")))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(book, ["job-a", "job-b"]))
+    handler.handle(make_record("outside"))
+
+    ids = sorted(str(r.correlation_id) for r in drain(log_queue))
+    assert ids == ["None", "job-a", "job-b"]
+
+def test_structured_fields_become_json_keys_and_text_key_values():
+    record = make_record("Slot NOT added to cart.", logging.WARNING, correlation_id="job-a",
+                         **log_fields(slot="10:00am Saturday", step="select", delay_s=0.5, error=None))
+
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["correlation_id"] == "job-a"
+    assert payload["slot"] == "10:00am Saturday" and payload["step"] == "select" and payload["delay_s"] == 0.5
+    assert payload["message"] == "Slot NOT added to cart."
+
+    text = TextFormatter("%(levelname)s - %(correlation)s%(message)s").format(record)
+    assert text == "WARNING - [job-a] Slot NOT added to cart. slot='10:00am Saturday' step=select delay_s=0.5"
@@ -0,0 +1,59 @@
+import pytest
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+from core.page_waits import AdaptiveTimeouts, PageErrorState, PageWaiter
+
+class ScriptedDriver:
+    """Answers execute_async_script with queued results (or raises queued exceptions)."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+def test_timeout_is_learned_from_recent_latencies():
+    timeouts = AdaptiveTimeouts(factor=3, min_seconds=1, max_seconds=30, min_samples=3, history_size=10)
+    assert timeouts.timeout_for("grid") == 30  # Not enough samples yet
+
+    for seconds in (0.4, 0.5, 0.8):
+        timeouts.record("grid", seconds)
+    assert timeouts.timeout_for("grid") == pytest.approx(2.4)
+
+    timeouts.record("grid", 0.1)
+    timeouts.record("form", 0.01)
+    assert timeouts.timeout_for("grid") == pytest.approx(2.4)  # p99 still the slow sample
+    assert timeouts.timeout_for("form") == 30
+
+    for _ in range(3):
+        timeouts.record("form", 0.01)
+    assert timeouts.timeout_for("form") == 1  # Clamped to the minimum
+
+def test_wait_survives_navigation_and_records_latency():
+    timeouts = AdaptiveTimeouts(min_samples=1)
+    driver = ScriptedDriver(
+        JavascriptException("javascript error: document unloaded while waiting for result"),
+        {"state": "ready", "element": "form-element"},
+    )
+    assert PageWaiter(driver, timeouts).wait_for("booking_form", ("id", "q16700")) == "form-element"
+    assert driver.calls == 2
+    assert "booking_form" in timeouts.snapshot()
+
+def test_error_banner_fails_wait_at_once():
+    timeouts = AdaptiveTimeouts()
+    driver = ScriptedDriver({"state": "error", "text": "Invalid library card number or PIN."})
+    with pytest.raises(PageErrorState, match="Invalid library card"):
+        PageWaiter(driver, timeouts).wait_for("booking_form", ("id", "q16700"))
+    assert timeouts.snapshot() == {}
+
+    driver = ScriptedDriver({"state": "timeout"})
+    with pytest.raises(TimeoutException):
+        PageWaiter(driver, timeouts).wait_for("booking_form", ("id", "q16700"), timeout=0.5)
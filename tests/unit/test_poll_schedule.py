@@ -0,0 +1,19 @@
+import datetime
+
+from core.availability_watcher import PollSchedule, diff_snapshots
+
+def test_polls_fast_near_release_times_and_after_changes():
+    schedule = PollSchedule(base_seconds=30, fast_seconds=5, release_times=["00:00"], hot_window_minutes=5, min_interval=2)
+    quiet = datetime.datetime(2025, 1, 10, 14, 0)
+
+    assert 27 <= schedule.next_delay(quiet) <= 33
+    assert schedule.next_delay(datetime.datetime(2025, 1, 10, 23, 58)) <= 5.5  # Window wraps around midnight
+    assert schedule.next_delay(quiet, last_change=quiet - datetime.timedelta(minutes=1)) <= 5.5
+    assert schedule.next_delay(quiet, errors=10) <= 300
+
+def test_diff_reports_only_changed_tiles():
+    day = datetime.date(2025, 1, 11)
+    previous = {("adult rm. 1", day, "10:00am"): False, ("adult rm. 1", day, "11:00am"): True}
+    current = {("adult rm. 1", day, "10:00am"): True, ("adult rm. 1", day, "11:00am"): True}
+
+    assert diff_snapshots(previous, current) == {("adult rm. 1", day, "10:00am"): True}
@@ -0,0 +1,57 @@
+import pytest
+import requests
+from selenium.common.exceptions import TimeoutException
+
+from core.libcal_client import LibCalError
+from core.page_waits import PageErrorState
+from core.retry import FATAL, TRANSIENT, RetryPolicy, StepRetrier, classify_failure
+
+def test_failures_are_classified_by_step_and_cause():
+    assert classify_failure("submit_times", TimeoutException("not ready")) == TRANSIENT
+    assert classify_failure("select", LookupError("Slot no longer available: 10:00am")) == FATAL
+    assert classify_failure("form_fill", PageErrorState("booking_form", "Invalid library card number or PIN.")) == FATAL
+    assert classify_failure("confirmation", TimeoutException("not ready")) == FATAL
+    assert classify_failure("final_submit", TimeoutException("stale after click")) == FATAL
+    assert classify_failure("submit_times", LibCalError("/ajax/space/add failed (HTTP 400): booking limit exceeded", status_code=400)) == FATAL
+
+def test_connection_errors_and_server_errors_are_transient_whatever_their_message():
+    refused = requests.exceptions.ConnectionError(
+        "HTTPSConnectionPool(host='yorbalindalibrary.libcal.com', port=443): Max retries exceeded with url: "
+        "/r/accessible/availability (Caused by NewConnectionError('Failed to establish a new connection'))")
+    assert classify_failure("grid", refused) == TRANSIENT
+    assert classify_failure("login", requests.exceptions.ReadTimeout("Read timed out.")) == TRANSIENT
+    assert classify_failure("select", LibCalError("/ajax/space/add failed (HTTP 503): not available", status_code=503)) == TRANSIENT
+
+def test_backoff_grows_exponentially_with_jitter_up_to_the_cap():
+    policy = RetryPolicy(max_retries=5, base_delay=1.0, max_delay=4.0)
+    for retry, ceiling in [(1, 1.0), (2, 2.0), (3, 4.0), (5, 4.0)]:
+        assert ceiling / 2 <= policy.delay(retry) <= ceiling
+
+def test_transient_failure_resumes_at_the_failed_step():
+    sleeps, outcomes, recovered = [], [False, False, True], []
+    retrier = StepRetrier(RetryPolicy(max_retries=3, base_delay=0.1, max_delay=1.0), sleep=sleeps.append)
+
+    assert retrier.run("grid", lambda: True)
+    assert retrier.run("submit_times", lambda: outcomes.pop(0), recover=lambda: recovered.append(True),
+                       last_error=lambda: TimeoutException("not ready"))
+
+    assert len(sleeps) == 2 and len(recovered) == 2
+    assert retrier.checkpoint.completed == ["grid", "submit_times"]
+    details = retrier.checkpoint.as_details()
+    assert details["retries"] == 2 and details["failure_kind"] is None
+    assert details["time_saved_s"] >= 0
+
+def test_fatal_failure_and_exhausted_retries_stop():
+    retrier = StepRetrier(RetryPolicy(max_retries=2), sleep=lambda seconds: None)
+    assert not retrier.run("login", lambda: False, last_error=lambda: PageErrorState("login", "Invalid library card number or PIN."))
+    assert retrier.fatal and retrier.checkpoint.retries == {}
+
+    calls = []
+    def fetch_grid():
+        calls.append(1)
+        raise requests.exceptions.ConnectionError(
+            "HTTPSConnectionPool(host='yorbalindalibrary.libcal.com', port=443): Max retries exceeded with url: /spaces")
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        retrier.call("grid", fetch_grid)
+    assert len(calls) == 3 and not retrier.fatal
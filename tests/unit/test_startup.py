@@ -0,0 +1,29 @@
+from tests.benchmarks.bench_startup import imported_modules, run_importtime
+
+# Cumulative import time of `import main`; about 10 ms on a laptop, so this only trips on a real regression
+IMPORT_BUDGET_MS = 60
+HEAVY_MODULES = ("selenium", "requests", "dotenv", "config.settings", "utils.logger", "core.booking_engine", "core.http_booking_engine")
+
+def heavy(modules):
+    return sorted({m for m in modules for prefix in HEAVY_MODULES if m == prefix or m.startswith(prefix + ".")})
+
+def test_import_main_stays_within_budget():
+    best_ms = min(run_importtime(["-c", "import main"])[0]["main"] for _ in range(3)) / 1000
+    assert best_ms < IMPORT_BUDGET_MS
+
+def test_help_and_argument_errors_load_no_settings_logger_or_engine(tmp_path):
+    log_file = tmp_path / "logs" / "booking.log"
+    env = {"LOG_FILE_PATH": str(log_file)}
+    assert heavy(imported_modules(["main.py", "--help"], env)) == []
+    assert heavy(imported_modules(["main.py", "--day", "Saturday"], env)) == []  # Missing --room and --times
+    assert not log_file.parent.exists()
+
+def test_dry_run_checks_the_booking_without_the_browser_stack(tmp_path):
+    env = {"LIBRARY_CARD_NUMBER": "21234567890123", "LIBRARY_PIN": "1234", "LOG_FILE_PATH": str(tmp_path / "booking.log")}
+    args = ["main.py", "--dry-run", "--dates", "every Saturday for 2 weeks", "--times", "10:00am", "--room", "Adult Rm. 1"]
+    completed = run_importtime(args, env)[2]
+
+    assert completed.returncode == 0
+    assert completed.stdout.count("Dry run: would book 10:00am Saturday") == 2
+    modules = [line.split("|")[-1].strip() for line in completed.stderr.splitlines() if line.startswith("import time:")]
+    assert [m for m in heavy(modules) if m.startswith(("selenium", "requests", "core."))] == []
@@ -0,0 +1,164 @@
+import datetime
+
+import pytest
+
+from core.page_waits import AdaptiveTimeouts
+from core.tabbed_booking import TabbedBookingRunner, TabTask
+from models.booking_request import BookingRequest, Credentials
+
+class RecordingDriver:
+    """Just enough of a WebDriver to open tabs and record what each one loads."""
+
+    def __init__(self):
+        self.window_handles = ["tab-0"]
+        self.current_window_handle = "tab-0"
+        self.loaded = []
+        self.switch_to = self
+
+    def window(self, handle):
+        self.current_window_handle = handle
+
+    def execute_script(self, script, *args):
+        if script.startswith("window.open("):
+            self.window_handles.append(f"tab-{len(self.window_handles)}")
+            url = args[0] if args else "about:blank"
+        else:
+            url = args[0]
+        if url != "about:blank":
+            self.loaded.append(url)
+
+class StubService:
+    def __init__(self, lean: bool):
+        self.driver = RecordingDriver()
+        self.lean = lean
+
+    def apply_network_blocking(self):
+        pass
+
+    def perform_login(self, credentials):
+        return True
+
+@pytest.mark.parametrize("lean", [False, True])
+def test_extra_tabs_open_on_the_target_date_past_the_default_grid_window(lean):
+    target = datetime.date.today() + datetime.timedelta(days=20)
+    request = BookingRequest(target_date=target, time_slots=["10:00am", "11:00am", "1:00pm"], room_name="Adult Rm. 1",
+                             party_size=2, user_credentials=Credentials(card_number="21234567890123", pin="1234"))
+    service = StubService(lean)
+
+    TabbedBookingRunner(service, request)._open_tabs([TabTask(labels=[label]) for label in ("a", "b", "c")])
+
+    assert service.driver.loaded == [request.grid_url] * 2
+    assert f"date={target.isoformat()}" in request.grid_url
+
+class Element:
+    def __init__(self, click=None):
+        self.click = click
+
+    def is_enabled(self):
+        return True
+
+    def get_attribute(self, name):
+        return ""
+
+class TabbedDriver:
+    """One page state per tab, advanced by the runner's clicks and the service's actions."""
+
+    def __init__(self, stuck_tabs=()):
+        self.pages = {"tab-0": "grid"}
+        self.stuck_tabs = set(stuck_tabs)  # Tabs whose grid never renders
+        self.current_window_handle = "tab-0"
+        self.switch_to = self
+        self.logged_in = False
+        self.refreshes = 0
+        self.closed = []
+
+    @property
+    def window_handles(self):
+        return list(self.pages)
+
+    def window(self, handle):
+        self.current_window_handle = handle
+
+    @property
+    def page(self):
+        return self.pages[self.current_window_handle]
+
+    @page.setter
+    def page(self, value):
+        self.pages[self.current_window_handle] = value
+
+    def execute_script(self, script, *args):
+        handle = f"tab-{len(self.pages)}"
+        self.pages[handle] = "loading" if handle in self.stuck_tabs else "grid"
+
+    def refresh(self):
+        self.refreshes += 1
+        if self.page == "login" and self.logged_in:
+            self.page = "form"
+
+    def close(self):
+        self.closed.append(self.current_window_handle)
+
+    def find_elements(self, by, value):
+        page = self.page
+        if value == "a.s-lc-eq-avail" and page == "grid":
+            return [Element()]
+        if "Submit Times" in value and page == "selected":
+            return [Element(click=lambda: setattr(self, "page", "login"))]
+        if value == "username" and page == "login":
+            return [Element()]
+        if value == "q16700" and page == "form":
+            return [Element()]
+        if "s-lc-eq-success-title" in value and page == "confirmed":
+            return [Element()]
+        return []
+
+class TabbedService:
+    def __init__(self, driver):
+        self.driver = driver
+        self.lean = False
+        self.logins = 0
+
+    def build_availability_index(self):
+        pass
+
+    def select_time_slot(self, label):
+        self.driver.page = "selected"
+        return True
+
+    def perform_login(self, credentials):
+        self.logins += 1
+        self.driver.logged_in = True
+        self.driver.page = "form"
+        return True
+
+    def fill_booking_form(self, party_size):
+        return True
+
+    def submit_final_booking(self):
+        self.driver.page = "confirmed"
+        return True
+
+    def get_confirmation_text(self):
+        return ""
+
+def test_tabs_log_in_once_and_a_timed_out_tab_falls_back():
+    driver = TabbedDriver(stuck_tabs={"tab-2"})
+    service = TabbedService(driver)
+    request = BookingRequest(target_date=datetime.date(2025, 1, 11), time_slots=["10:00am", "11:00am", "1:00pm"],
+                             room_name="Adult Rm. 1", party_size=2,
+                             user_credentials=Credentials(card_number="21234567890123", pin="1234"))
+    authenticated = []
+    runner = TabbedBookingRunner(service, request, step_timeout=0.2, poll_interval=0.01,
+                                 on_authenticated=lambda: authenticated.append(True))
+    runner.timeouts = AdaptiveTimeouts()
+
+    tasks = runner.run([["a"], ["b"], ["c"]])
+
+    booked, handed_off, timed_out = tasks
+    assert [r.success for r in booked.results] == [True] and [r.success for r in handed_off.results] == [True]
+    assert timed_out.step == "grid" and timed_out.results == [] and timed_out.fallback == ["c"]
+    # Only the first tab logged in; the second waited, then reloaded onto the booking form
+    assert service.logins == 1 and authenticated == [True]
+    assert runner.login_owner is booked and handed_off.login_retried and driver.refreshes == 1
+    assert driver.closed == ["tab-1", "tab-2"] and driver.current_window_handle == "tab-0"
@@ -0,0 +1,88 @@
+import itertools
+
+import pytest
+
+from core.web_driver_pool import WebDriverPool
+
+class FakeService:
+    """Stands in for WebDriverService: a browser that can crash or fail to load a page."""
+    ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self.ids)
+        self.crashed = False
+        self.fail_navigation = False
+        self.closed = False
+        self.current_page_url = None
+        self.page_loaded_at = None
+        self.loads = 0
+        self.imported = None
+
+    def import_session(self, state):
+        self.imported = (state, self.loads)  # How many pages had loaded when the session arrived
+        return True
+
+    def navigate_to_page(self, url):
+        if self.crashed or self.fail_navigation:
+            raise RuntimeError("chrome not reachable")
+        self.loads += 1
+        self.current_page_url = url
+
+    def is_alive(self):
+        return not self.crashed
+
+    def get_js_heap_mb(self):
+        return None
+
+    def reset_session(self):
+        return True
+
+    def close_driver(self):
+        self.closed = True
+
+def make_pool(size=1, broken_launches=0):
+    launched = []
+    def factory():
+        launched.append(FakeService())
+        launched[-1].fail_navigation = len(launched) <= broken_launches
+        return launched[-1]
+    return WebDriverPool("https://example.test/spaces", size=size, warmup=False, driver_factory=factory), launched
+
+def test_crashed_idle_browser_is_replaced_instead_of_losing_its_slot():
+    pool, launched = make_pool()
+    first = pool.checkout(timeout=1)
+    pool.checkin(first)
+    first.crashed = True
+
+    second = pool.checkout(timeout=1)
+
+    assert second is not first and first.closed
+    assert pool.metrics.recycled == 1 and len(launched) == 2
+    pool.checkin(second)
+    assert pool.checkout(timeout=1) is second
+
+def test_browser_failing_to_load_the_page_is_recycled_and_another_tried():
+    pool, launched = make_pool()
+    first = pool.checkout(timeout=1)
+    pool.checkin(first)
+    first.fail_navigation = True  # Alive, but the page load raises
+
+    second = pool.checkout("https://example.test/spaces?date=2025-01-11", timeout=1)
+
+    assert second is not first and first.closed and second.loads == 1
+
+def test_new_browser_failing_its_page_load_raises_and_frees_the_slot():
+    pool, launched = make_pool(broken_launches=1)
+    with pytest.raises(RuntimeError):
+        pool.checkout(timeout=1)
+
+    assert launched[0].closed
+    assert pool.checkout(timeout=1) is launched[1]
+
+def test_cached_session_is_restored_before_the_only_page_load():
+    pool, _ = make_pool()
+    url = "https://example.test/spaces?date=2025-01-11"
+
+    service = pool.checkout(url, timeout=1, before_navigate=lambda s: s.import_session({"cookies": []}))
+
+    assert service.imported == ({"cookies": []}, 0) and service.loads == 1
@@ -1,24 +1,180 @@
 # Logging configuration
-import logging
-import sys
+import contextvars
 import json
-from logging.handlers import RotatingFileHandler
+import logging
 import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Set per booking request (job id or trace id) and stamped on every record logged under it
+_correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+# One reusable encoder; json.dumps builds a new one whenever it gets options
+_encode = json.JSONEncoder(default=str, ensure_ascii=False).encode
+
+def log_fields(**fields) -> dict:
+    """
+    Structured fields for a record, as `extra`:
+
+        logger.warning("Slot not available.", extra=log_fields(slot=label, step="select"))
+
+    The JSON log keeps them as keys; text formats append them as key=value.
+    """
+    return {"fields": fields}
+
+def current_correlation_id() -> Optional[str]:
+    return _correlation_id.get()
 
-from config import settings
+@contextmanager
+def correlation(correlation_id: str) -> Iterator[str]:
+    """Tags every record logged inside the block (and in contexts copied from it) with `correlation_id`."""
+    token = _correlation_id.set(correlation_id)
+    try:
+        yield correlation_id
+    finally:
+        _correlation_id.reset(token)
+
+def _render_fields(record: logging.LogRecord) -> str:
+    fields = getattr(record, "fields", None)
+    if not fields:
+        return ""
+    # Strings are quoted only when they hold spaces, so values stay one token each; unset ones are left out
+    pairs = [f"{key}={value!r}" if isinstance(value, str) and " " in value else f"{key}={value}"
+             for key, value in fields.items() if value is not None]
+    return " " + " ".join(pairs) if pairs else ""
 
 class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the span, structured fields and correlation id as keys."""
+
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._second_text = ""
+
+    def _timestamp(self, record: logging.LogRecord) -> str:
+        # Same text as formatTime(), with the strftime done once per second rather than per record
+        second = int(record.created)
+        if second != self._second:
+            self._second_text = time.strftime("%Y-%m-%d %H:%M:%S", self.converter(second))
+            self._second = second
+        return f"{self._second_text},{int(record.msecs):03d}"
+
     def format(self, record):
         log_record = {
-            "timestamp": self.formatTime(record, self.datefmt),
+            "timestamp": self._timestamp(record),
             "level": record.levelname,
             "message": record.getMessage()
         }
+        correlation_id = getattr(record, "correlation_id", None)
+        if correlation_id is not None:
+            log_record["correlation_id"] = correlation_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            for key, value in fields.items():
+                log_record.setdefault(key, value)
+        span = getattr(record, "span", None)
+        if span is not None:
+            log_record["span"] = span
         if record.exc_info:
             log_record['exc_info'] = self.formatException(record.exc_info)
-        return json.dumps(log_record)
+        elif record.exc_text:
+            log_record['exc_info'] = record.exc_text
+        return _encode(log_record)
+
+class TextFormatter(logging.Formatter):
+    """A plain format string, followed by the record's structured fields as key=value."""
+
+    def format(self, record):
+        record.correlation = f"[{record.correlation_id}] " if getattr(record, "correlation_id", None) else ""
+        text = super().format(record)
+        fields = _render_fields(record)
+        if not fields:
+            return text
+        # Fields belong to the message line, ahead of any traceback
+        first, newline, rest = text.partition("\n")
+        return first + fields + newline + rest
+
+def _not_a_span(record: logging.LogRecord) -> bool:
+    return not hasattr(record, "span")
+
+class BoundedQueueHandler(logging.Handler):
+    """
+    Does what logging.handlers.QueueHandler does (that module is only
+    imported once logging is set up): hands records to a QueueListener
+    instead of writing them on the calling thread. When the queue is full,
+    the "drop" policy discards DEBUG and INFO records (and later logs how
+    many) while warnings and errors wait for room, so they are never lost;
+    "block" makes every record wait.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop"):
+        super().__init__()
+        self.queue = log_queue
+        self.overflow = overflow
+        self.dropped = 0
+        self._unreported = 0
+        self._drop_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the cheap, thread-bound work happens here; formatting is left to the listener
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, "correlation_id"):
+            record.correlation_id = _correlation_id.get()
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block" or record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+        if self._unreported:
+            self._report_drops()
+
+    def _report_drops(self) -> None:
+        with self._drop_lock:
+            count, self._unreported = self._unreported, 0
+        if not count:
+            return
+        notice = logging.makeLogRecord({
+            "name": "booking_system", "levelno": logging.WARNING, "levelname": "WARNING",
+            "msg": f"Dropped {count} log record(s) while the log queue was full.",
+            "fields": {"dropped": count}, "correlation_id": None,
+        })
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            with self._drop_lock:
+                self._unreported += count
+
+_listener = None
 
 def setup_logger():
+    import atexit
+    from logging.handlers import QueueListener, RotatingFileHandler
+    from config import settings
+
+    global _listener
+
     # Create logs directory if it doesn't exist
     log_dir = os.path.dirname(settings.LOG_FILE_PATH)
     if log_dir and not os.path.exists(log_dir):
@@ -27,10 +183,6 @@ def setup_logger():
     logger = logging.getLogger("booking_system")
     logger.setLevel(settings.LOG_LEVEL)
 
-    # Prevent duplicate handlers if logger is already configured
-    if logger.hasHandlers():
-        logger.handlers.clear()
-
     # File Handler
     file_handler = RotatingFileHandler(
         settings.LOG_FILE_PATH, 
@@ -40,17 +192,72 @@ def setup_logger():
     if settings.LOG_FORMAT == 'json':
         file_formatter = JsonFormatter()
     else:
-        file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_formatter = TextFormatter('%(asctime)s - %(levelname)s - %(correlation)s%(message)s')
     file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
 
     # Console Handler
     console_handler = logging.StreamHandler(sys.stdout)
     # Simple console format for better readability
-    console_formatter = logging.Formatter('%(message)s')
+    console_formatter = TextFormatter('%(message)s')
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    console_handler.addFilter(_not_a_span) # Span records only go to the file log
+
+    # Booking threads only enqueue records; one background thread formats and writes them
+    if _listener is not None:
+        _listener.stop()
+    else:
+        atexit.register(flush_logs)
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = BoundedQueueHandler(log_queue, settings.LOG_QUEUE_OVERFLOW)
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    # Replaces any earlier handlers; a new list, as the first record may still be iterating the old one
+    logger.handlers = [queue_handler]
     
     return logger
 
-logger = setup_logger()
\ No newline at end of file
+def flush_logs() -> None:
+    """Writes out every queued record and stops the background writer (run at exit)."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                pass  # The stream was closed before exit (e.g. a captured stdout)
+
+class _SetupOnFirstRecord(logging.Handler):
+    """
+    Stands in for the real handlers until the first record is logged, so
+    importing this module reads no settings and creates no log file. That
+    record runs setup_logger() and is then handled as if it had been
+    configured all along.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._setup_lock = threading.Lock()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        with self._setup_lock:
+            if self in _logger.handlers:
+                setup_logger()
+        # Levels were unknown until now; drop what the configured level filters out
+        if not _logger.isEnabledFor(record.levelno):
+            return False
+        for handler in _logger.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        pass
+
+_logger = logging.getLogger("booking_system")
+if not _logger.handlers:
+    _logger.setLevel(logging.DEBUG)  # Let every record reach the stand-in; setup_logger() sets the real level
+    _logger.addHandler(_SetupOnFirstRecord())
+logger = _logger
@@ -0,0 +1,14 @@
+# Small statistics helpers for timing reports
+import math
+from typing import Sequence
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """
+    Nearest-rank percentile, e.g. percentile(latencies, 95).
+    Returns 0.0 for an empty sequence.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
@@ -0,0 +1,190 @@
+# Lightweight span tracing for the booking pipeline
+import contextvars
+import functools
+import glob
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+from utils.logger import correlation, current_correlation_id
+from utils.stats import percentile
+from config import settings
+
+# Pipeline stages in flow order, for reports
+STAGES = ["driver_start", "navigate", "grid", "select", "submit_times", "login", "form_fill", "final_submit", "confirmation"]
+
+# Span records are logged here; utils.logger keeps them out of the console
+trace_logger = logging.getLogger("booking_system.trace")
+
+@dataclass
+class Span:
+    name: str
+    trace_id: Optional[str]
+    attributes: Dict[str, object]
+    duration_ms: float = 0.0
+    status: str = "ok"  # "ok", "failed" (step returned False) or "error" (raised)
+    run_id: Optional[str] = None  # The process that recorded it; trace ids restart with each run
+
+    def as_dict(self) -> dict:
+        return {"span": self.name, "trace_id": self.trace_id, "duration_ms": round(self.duration_ms, 2),
+                "status": self.status, **self.attributes}
+
+@dataclass
+class Trace:
+    """One booking attempt; its attributes (room, slots, ...) are added to every span inside it."""
+    trace_id: str
+    attributes: Dict[str, object] = field(default_factory=dict)
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+class Tracer:
+    """
+    Times pipeline stages as spans. Each finished span is logged as a structured
+    record and kept (up to `max_spans`) for the --profile summary.
+    """
+
+    def __init__(self, max_spans: int = settings.TRACE_MAX_SPANS):
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.run_id = uuid.uuid4().hex[:8]
+
+    @property
+    def current_trace(self) -> Optional[Trace]:
+        return _current_trace.get()
+
+    @contextmanager
+    def trace(self, **attributes) -> Iterator[Trace]:
+        """
+        Starts a new attempt; spans inside it share its trace id and attributes.
+        Outside a job (which has its own correlation id) the trace id also tags its log records.
+        """
+        trace = Trace(trace_id=f"attempt-{next(self._ids)}", attributes=attributes)
+        token = _current_trace.set(trace)
+        try:
+            with correlation(current_correlation_id() or trace.trace_id):
+                yield trace
+        finally:
+            _current_trace.reset(token)
+
+    def _new_span(self, name: str, attributes: dict) -> Span:
+        trace = _current_trace.get()
+        return Span(name=name, trace_id=trace.trace_id if trace else None,
+                    attributes={**(trace.attributes if trace else {}), **attributes}, run_id=self.run_id)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = self._new_span(name, attributes)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000
+            self._finish(span)
+
+    def record(self, name: str, duration_ms: float, status: str = "ok", **attributes) -> Span:
+        """Adds a span timed by the caller, e.g. a step spread over several polls."""
+        span = self._new_span(name, attributes)
+        span.duration_ms = duration_ms
+        span.status = status
+        self._finish(span)
+        return span
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+        if settings.TRACE_LOG_SPANS:
+            trace_logger.info(f"span {span.name} {span.duration_ms:.1f} ms {span.status}", extra={"span": {**span.as_dict(), "run": span.run_id}})
+
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self, spans: Optional[List[Span]] = None) -> List[dict]:
+        """
+        Per-stage totals and percentiles across attempts: a stage's time in one
+        attempt is the sum of its spans there (e.g. several slot selections).
+        Summarizes `spans` (e.g. with read_logged_spans() from earlier runs) or
+        else the spans this process recorded.
+        """
+        per_attempt: Dict[str, Dict[tuple, float]] = {}
+        for i, span in enumerate(self.spans() if spans is None else spans):
+            attempt = per_attempt.setdefault(span.name, {})
+            key = (span.run_id, span.trace_id or f"untraced-{i}")
+            attempt[key] = attempt.get(key, 0.0) + span.duration_ms
+
+        order = {name: i for i, name in enumerate(STAGES)}
+        rows = []
+        for name in sorted(per_attempt, key=lambda n: (order.get(n, len(STAGES)), n)):
+            durations = list(per_attempt[name].values())
+            rows.append({
+                "stage": name,
+                "attempts": len(durations),
+                "total_ms": round(sum(durations), 1),
+                "p50_ms": round(percentile(durations, 50), 1),
+                "p95_ms": round(percentile(durations, 95), 1),
+                "max_ms": round(max(durations), 1),
+            })
+        return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+tracer = Tracer()
+
+def read_logged_spans(path: str = settings.LOG_FILE_PATH, exclude_run: Optional[str] = None) -> List[Span]:
+    """
+    Span records from a JSON log file and its rotated backups (oldest first),
+    leaving out those of `exclude_run`. Text-format logs hold no spans.
+    """
+    # RotatingFileHandler keeps booking.log.1 (newest) to booking.log.N (oldest)
+    backups = [p for p in glob.glob(glob.escape(path) + ".*") if p.rsplit(".", 1)[1].isdigit()]
+    backups.sort(key=lambda p: -int(p.rsplit(".", 1)[1]))
+    spans: List[Span] = []
+    for log_path in [*backups, path]:
+        try:
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    if '"span": {' not in line:
+                        continue
+                    try:
+                        record = json.loads(line)["span"]
+                        span = Span(name=record.pop("span"), trace_id=record.pop("trace_id"),
+                                    duration_ms=float(record.pop("duration_ms")), status=record.pop("status", "ok"),
+                                    run_id=record.pop("run", None), attributes=record)
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue
+                    if exclude_run is None or span.run_id != exclude_run:
+                        spans.append(span)
+        except OSError:
+            continue
+    return spans
+
+def traced(name: str, attributes: Optional[Callable[..., dict]] = None):
+    """
+    Decorator timing a call as a span. A False return marks the span "failed",
+    matching the bool-returning step methods. `attributes` maps the call's
+    arguments to extra span attributes.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            extra = attributes(*args, **kwargs) if attributes else {}
+            with tracer.span(name, **extra) as span:
+                result = func(*args, **kwargs)
+                if result is False:
+                    span.status = "failed"
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,13 @@
+# Booking page URL helpers
+import datetime
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+def date_url(booking_url: str, target_date: datetime.date) -> str:
+    """
+    Return `booking_url` opened on `target_date`'s grid through LibCal's
+    `date` query parameter, instead of paging the grid to it.
+    """
+    parsed = urlparse(booking_url)
+    query = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True) if key != "date"]
+    query.append(("date", target_date.isoformat()))
+    return urlunparse(parsed._replace(query=urlencode(query)))